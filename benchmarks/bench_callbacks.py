@@ -0,0 +1,61 @@
+# coding=utf-8
+'''
+    Compares the cost of calling a method callback wrapped by
+    _weak_callback with the closure it previously built, which dereferenced
+    two weak references and forwarded generic arguments on every call.
+
+    Run from the repository root:
+
+        PYTHONPATH=src/main/python python benchmarks/bench_callbacks.py
+'''
+
+from __future__ import print_function
+
+import timeit
+import weakref
+
+from fysom import Fysom, _weak_callback
+
+
+def previous_weak_callback(method):
+    '''
+        The wrapper previously built by _weak_callback, for comparison.
+    '''
+    obj_ref = weakref.ref(method.__self__)
+    func_ref = weakref.ref(method.__func__)
+
+    def _callback(*args, **kwargs):
+        obj = obj_ref()
+        func = func_ref()
+        if (obj is None) or (func is None):
+            return
+        return func(obj, *args, **kwargs)
+    return _callback
+
+
+class Listener(object):
+
+    def on_event(self, e):
+        pass
+
+
+def main(number=1000000):
+    listener = Listener()
+    for name, callback in [
+            ('bound method', listener.on_event),
+            ('previous wrapper', previous_weak_callback(listener.on_event)),
+            ('_weak_callback', _weak_callback(listener.on_event))]:
+        seconds = min(timeit.repeat(lambda: callback(None), number=number,
+                                    repeat=5))
+        print('%-20s %6.1f ns/call' % (name, seconds / number * 1e9))
+
+    fsm = Fysom(initial='a', events=[('tick', 'a', '=')],
+                callbacks={'onreentera': listener.on_event,
+                           'ontick': listener.on_event})
+    number //= 10
+    seconds = min(timeit.repeat(fsm.tick, number=number, repeat=5))
+    print('%-20s %6.1f us/event' % ('Fysom event', seconds / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
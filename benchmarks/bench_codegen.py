@@ -0,0 +1,56 @@
+# coding=utf-8
+'''
+    Compares firing events on a dynamic Fysom machine with a class generated
+    by fysom.codegen for the same specification.
+
+    Run from the repository root:
+
+        PYTHONPATH=src/main/python python benchmarks/bench_codegen.py
+'''
+
+from __future__ import print_function
+
+import timeit
+
+from fysom import Fysom
+from fysom.codegen import build_class
+
+CFG = {
+    'initial': 'green',
+    'events': [
+        {'name': 'warn', 'src': 'green', 'dst': 'yellow'},
+        {'name': 'panic', 'src': 'yellow', 'dst': 'red'},
+        {'name': 'calm', 'src': 'red', 'dst': 'yellow'},
+        {'name': 'clear', 'src': 'yellow', 'dst': 'green'},
+    ],
+}
+
+
+def on_state(e):
+    pass
+
+
+def cycle(fsm):
+    fsm.warn()
+    fsm.panic()
+    fsm.calm()
+    fsm.clear()
+
+
+def main(number=100000):
+    callbacks = {'onyellow': on_state, 'onchangestate': on_state}
+    Generated = build_class(CFG, class_name='Light',
+                            callback_names=list(callbacks))
+    for name, factory in [
+            ('Fysom', lambda: Fysom(CFG, callbacks=callbacks)),
+            ('generated', lambda: Generated(callbacks=callbacks))]:
+        fsm = factory()
+        seconds = min(timeit.repeat(lambda: cycle(fsm), number=number,
+                                    repeat=3))
+        build = min(timeit.repeat(factory, number=number // 10, repeat=3))
+        print('%-10s %6.2f us/event %8.2f us/instance' % (
+            name, seconds / number / 4 * 1e6, build / number * 10 * 1e6))
+
+
+if __name__ == '__main__':
+    main()
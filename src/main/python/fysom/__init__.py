@@ -27,12 +27,27 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 #
 
-import collections
-import functools
+import os
 import weakref
 import types
 import sys
 
+# collections and functools dominate the import time of fysom, so Mapping
+# and partial come from the modules they are implemented in when possible.
+# _collections_abc is already loaded by the interpreter at startup.
+try:
+    from _collections_abc import Mapping
+except ImportError:  # pragma: no cover
+    try:
+        from collections.abc import Mapping
+    except ImportError:
+        from collections import Mapping
+
+try:
+    from _functools import partial
+except ImportError:  # pragma: no cover
+    from functools import partial
+
 __author__ = 'Mansour Behabadi'
 __copyright__ = 'Copyright 2011, Mansour Behabadi and Jake Gordon'
 __credits__ = ['Mansour Behabadi', 'Jake Gordon']
@@ -45,6 +60,57 @@ __email__ = 'mansour@oxplot.com'
 WILDCARD = '*'
 SAME_DST = '='
 
+# Event dispatch primitives, from the C accelerator when it is compiled.
+if os.environ.get('FYSOM_PURE_PYTHON'):  # pragma: no cover
+    from fysom._core import lookup, call_first, call_first_global
+    SPEEDUPS = False
+else:  # pragma: no cover
+    try:
+        from fysom._speedups import lookup, call_first, call_first_global
+        SPEEDUPS = True
+    except ImportError:
+        from fysom._core import lookup, call_first, call_first_global
+        SPEEDUPS = False
+
+_CALLBACK_PREFIXES = {
+    'before': ('onbefore', 'on_before_'),
+    'after': ('onafter', 'on', 'on_after_', 'on_'),
+    'leave': ('onleave', 'on_leave_'),
+    'enter': ('onenter', 'on', 'on_enter_', 'on_'),
+    'reenter': ('onreenter', 'on_reenter_'),
+}
+_CHANGE_STATE_NAMES = ('onchangestate', 'on_change_state')
+_callback_names_cache = {}
+
+
+def _callback_names(kind, name):
+    '''
+    Returns the names of the callbacks of the given kind for an event or a
+    state, in lookup order. Names are built once and cached.
+    '''
+    key = (kind, name)
+    names = _callback_names_cache.get(key)
+    if names is None:
+        names = _callback_names_cache[key] = tuple(
+            prefix + name for prefix in _CALLBACK_PREFIXES[kind])
+    return names
+
+
+def _is_member(value):
+    return hasattr(type(value), '__members__')
+
+
+def _name(value):
+    '''
+    Returns the name of an enum member used as a state or an event, or value
+    itself otherwise. Members of str enums are names already.
+    '''
+    if type(value) is str:  # plain names, the common case, stay cheap
+        return value
+    if _is_member(value) and not isinstance(value, str):
+        return value.name
+    return value
+
 
 class FysomError(Exception):
 
@@ -67,53 +133,452 @@ class Canceled(FysomError):
     '''
 
 
-def _weak_callback(func):
+class InvalidDefinition(FysomError):
+
+    '''
+        Raised when a definition compiled with validate='strict' has
+        problems, listed in its problems attribute.
+    '''
+
+    def __init__(self, msg, problems=()):
+        super(InvalidDefinition, self).__init__(msg)
+        self.problems = list(problems)
+
+
+class TriggerResult(object):
+
+    '''
+        Result codes returned by the non-raising try_trigger() API.
+    '''
+    OK = 'ok'
+    INVALID = 'invalid'
+    CANCELED = 'canceled'
+    PENDING = 'pending'
+
+
+_NO_EVENT = object()
+
+
+def _weak_callback(func, weak=True, on_dead=None):
     '''
     Store a weak reference to a callback or method.
+    With weak set to False, the callback is stored as is and keeps its
+    object alive. on_dead is called with the weak reference to the object
+    of a method once that object is collected; the returned wrapper then
+    exposes that reference as its obj_ref attribute.
     '''
-    if isinstance(func, types.MethodType):
+    if weak and isinstance(func, types.MethodType) and \
+            func.__self__ is not None:
         # Don't hold a reference to the object, otherwise we might create
         # a cycle.
         # Reference: http://stackoverflow.com/a/6975682
-        # Tell coveralls to not cover this if block, as the Python 2.x case
-        # doesn't test the 3.x code and vice versa.
-        if sys.version_info[0] < 3:  # pragma: no cover
-            # Python 2.x case
-            obj_ref = weakref.ref(func.im_self)
-            func_ref = weakref.ref(func.im_func)
-        else:  # pragma: no cover
-            # Python 3.x case
-            obj_ref = weakref.ref(func.__self__)
-            func_ref = weakref.ref(func.__func__)
-        func = None
-
-        def _callback(*args, **kwargs):
+        # Only the object is weakly referenced, the function itself does not
+        # refer to it, so a call dereferences a single weak reference.
+        obj_ref = weakref.ref(func.__self__, on_dead)
+        func = func.__func__
+
+        def _callback(e=_NO_EVENT, *args, **kwargs):
             obj = obj_ref()
-            func = func_ref()
-            if (obj is None) or (func is None):
+            if obj is None:
                 return
-            return func(obj, *args, **kwargs)
+            # Callbacks are called with the sole event object, avoid
+            # forwarding empty argument containers in that case.
+            if args or kwargs or e is _NO_EVENT:
+                if e is not _NO_EVENT:
+                    args = (e,) + args
+                return func(obj, *args, **kwargs)
+            return func(obj, e)
+        _callback.obj_ref = obj_ref
         return _callback
     else:
         # We should be safe enough holding callback functions ourselves.
         return func
 
 
+def _drop_dead_callback(target_ref, name, obj_ref):
+    '''
+    Finalizer of weak callbacks: removes the callback registered as name,
+    whose object just died, from its definition or machine.
+    '''
+    target = target_ref()
+    if target is not None:
+        target._drop_callback(name, obj_ref)
+
+
+def _is_dead_callback(callback, obj_ref):
+    '''
+    Returns if callback is the weak callback of the given dead object.
+    '''
+    return getattr(callback, 'obj_ref', None) is obj_ref
+
+
+def _timeout_callback(ref, event):
+    '''
+    Fires a timed event, unless the machine is gone or the event became
+    inappropriate.
+    '''
+    fsm = ref()
+    if fsm is not None:
+        fsm.try_trigger(event)
+
+
+def _fork_event(event):
+    def fn(self, *args, **kwargs):
+        self._fire(event, args, kwargs, True)
+
+    fn.__name__ = str(event)
+    fn.__doc__ = ("Event handler for an {event} event of a forked "
+                  "machine.".format(event=event))
+    return fn
+
+
+# Attributes set on every fork, the others being read from its parent.
+_FORK_STATE = frozenset(['_fork_parent', '_definition', '_final', '_map',
+                         '_timers', '_timeouts', 'current'])
+
+# Fork classes by machine class and event names, shared by the definitions
+# compiled for each machine built from a cfg dictionary.
+_FORK_CLASSES = {}
+
+
+class _Forked(object):
+    '''
+        Base of the fork classes: the callbacks and other instance attributes
+        a fork does not set itself are looked up on the machine it was forked
+        from. A pending transition of that machine is not.
+    '''
+    _fork_parent = None
+
+    def __getattr__(self, name):
+        parent = self._fork_parent
+        if parent is not None and name != 'transition' and \
+                not name.startswith('__'):
+            return getattr(parent, name)
+        raise AttributeError(name)
+
+
+class FysomDefinition(object):
+
+    '''
+        Compiled form of a state machine specification.
+
+        Normalizes the configuration accepted by Fysom and FysomGlobal,
+        flattens hierarchical states into a plain event to state transitions
+        map and caches the exit/entry paths between states. A definition is
+        never modified once built, so it can be passed in place of the cfg
+        dictionary to share the compiled form between many machines.
+    '''
+
+    def __init__(self, cfg={}, initial=None, events=None, callbacks=None,
+                 final=None, substates=None, weak_callbacks=None,
+                 validate=None):
+        '''
+        Compile a machine specification.
+
+        Takes the same arguments as Fysom, plus:
+
+            substates   a dictionary mapping a parent state to the list of
+                        its child states. Children can be parents themselves.
+                        Events whose source is a parent state can be fired
+                        from any of its descendants, unless a descendant
+                        defines its own transition for that event.
+
+            weak_callbacks
+                        when False, callbacks that are bound methods are
+                        stored as is instead of through a wrapper holding a
+                        weak reference to their object, keeping that object
+                        alive. Defaults to True.
+
+            validate    'strict' to raise InvalidDefinition, or 'warn' to
+                        issue a fysom.validation.DefinitionWarning, for
+                        every (event, source) pair given several
+                        destinations, final state no event leads to and
+                        state unreachable from the initial state. Off by
+                        default.
+
+        An event can also have an 'after' key, a delay in seconds: the event
+        is then fired automatically once the machine stayed that long in one
+        of its source states. Timed events need a TimerWheel, see the
+        fysom.timers module.
+
+        States and events can be given as enum members, which stand for
+        their names, and the 'state_enum' and 'event_enum' keys of cfg can
+        hold enum classes every state and event must be a member of.
+        '''
+        cfg = dict(cfg)
+        # override cfg with named arguments
+        events_list = list(cfg.get('events', ()))
+        callbacks_map = dict(cfg.get('callbacks', {}))
+        substates_map = dict(cfg.get('substates', {}))
+        if initial:
+            cfg['initial'] = initial
+        if final:
+            cfg['final'] = final
+        if events:
+            events_list.extend(list(events))
+        if callbacks:
+            callbacks_map.update(dict(callbacks))
+        if substates:
+            substates_map.update(dict(substates))
+
+        # States and events can be enum members, which are replaced by their
+        # names.
+        init = cfg.get('initial')
+        if self._is_base_string(init) or _is_member(init):
+            init = {'state': init}
+        elif init:
+            init = dict(init)
+        if init:
+            init['state'] = _name(init['state'])
+            init['event'] = _name(init.get('event', 'startup'))
+        self.initial = init
+        self.final = _name(cfg.get('final'))
+
+        self.parents = {}
+        for parent, children in substates_map.items():
+            for child in children:
+                self.parents[_name(child)] = _name(parent)
+
+        # Consider initial state as any other state that can have transition
+        # from none to initial value on occurance of startup / init event
+        # ( if specified).
+        self.events = []
+        if init:
+            self.events.append({'name': init['event'], 'src': ['none'],
+                                'dst': init['state']})
+        for e in events_list:
+            # convert 3-tuples in the event specification to dicts
+            if isinstance(e, Mapping):
+                e = dict(e)
+            elif hasattr(e, '__iter__'):
+                name, src, dst = list(e)[:3]
+                e = {'name': name, 'src': src, 'dst': dst}
+            else:
+                continue
+            if 'src' not in e:
+                e['src'] = [WILDCARD]
+            elif self._is_base_string(e['src']) or _is_member(e['src']):
+                e['src'] = [_name(e['src'])]
+            else:
+                e['src'] = [_name(src) for src in e['src']]
+            e['name'] = _name(e['name'])
+            e['dst'] = _name(e['dst'])
+            if isinstance(e.get('cond'), list):
+                e['cond'] = [
+                    dict(cond, **{'else': _name(cond['else'])})
+                    if isinstance(cond, dict) and 'else' in cond else cond
+                    for cond in e['cond']]
+            self.events.append(e)
+
+        if weak_callbacks is None:
+            weak_callbacks = cfg.get('weak_callbacks', True)
+        self.weak_callbacks = weak_callbacks
+        # Machines sharing the weak callbacks of this definition, to remove
+        # the callbacks from them once their objects are collected.
+        self._machines = weakref.WeakValueDictionary()
+        self_ref = weakref.ref(self)
+        self.callbacks = dict(
+            (name, _weak_callback(cb, weak_callbacks, partial(
+                _drop_dead_callback, self_ref, name)))
+            for name, cb in callbacks_map.items())
+
+        self.states = set(['none'])
+        self.states.update(self.parents)
+        self.states.update(self.parents.values())
+        if self.final:
+            self.states.add(self.final)
+        raw = {}
+        for e in self.events:
+            dsts = raw.setdefault(e['name'], {})
+            for s in e['src']:
+                dsts[s] = e['dst']
+                if s != WILDCARD:
+                    self.states.add(s)
+            if e['dst'] != SAME_DST:
+                self.states.add(e['dst'])
+        self._check_enums(cfg.get('state_enum'), cfg.get('event_enum'))
+
+        self.map = dict((name, self.flatten(dsts))
+                        for name, dsts in raw.items())
+
+        # Timed transitions: for every source state, the (delay, event)
+        # pairs to schedule when the state is entered.
+        timeouts = {}
+        for e in self.events:
+            if e.get('after') is None:
+                continue
+            if WILDCARD in e['src']:
+                raise FysomError(
+                    'timed event %s needs explicit source states' % e['name'])
+            for s in e['src']:
+                timeouts.setdefault(s, []).append((e['after'], e['name']))
+        self.timeouts = dict((s, tuple(t)) for s, t in timeouts.items())
+
+        self._paths = {}
+        self._fork_classes = {}
+
+        if validate is None:
+            validate = cfg.get('validate')
+        self.validate = validate
+        if validate:
+            from fysom import validation
+            if validate not in validation.MODES:
+                raise FysomError('unknown validation mode %r' % (validate,))
+            validation.report(validation.check(self), validate)
+
+    def _check_enums(self, state_enum, event_enum):
+        if state_enum is not None:
+            unknown = self.states - set(
+                _name(member) for member in state_enum) - set(['none'])
+            if unknown:
+                raise FysomError('states not in %s: %s' % (
+                    state_enum.__name__, ', '.join(sorted(unknown))))
+        if event_enum is not None:
+            names = set(_name(member) for member in event_enum)
+            if self.initial:
+                names.add(self.initial['event'])
+            unknown = set(e['name'] for e in self.events) - names
+            if unknown:
+                raise FysomError('events not in %s: %s' % (
+                    event_enum.__name__, ', '.join(sorted(unknown))))
+
+    # Caches and machine registrations are per process; they are left out of
+    # pickles, so that compiled definitions can be stored (fysom.loader).
+    _TRANSIENT = ('_machines', '_paths', '_fork_classes')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self._TRANSIENT:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._machines = weakref.WeakValueDictionary()
+        self._paths = {}
+        self._fork_classes = {}
+
+    def fork_class(self, cls):
+        '''
+            Returns the class of the forks of the cls machines using this
+            definition, which holds their event methods.
+        '''
+        fork_cls = self._fork_classes.get(cls)
+        if fork_cls is None:
+            key = (cls, frozenset(self.map))
+            fork_cls = _FORK_CLASSES.get(key)
+            if fork_cls is None:
+                namespace = {'_fork_base': cls}
+                for event in self.map:
+                    namespace[event] = _fork_event(event)
+                fork_cls = _FORK_CLASSES[key] = type(
+                    cls.__name__, (_Forked, cls), namespace)
+            self._fork_classes[cls] = fork_cls
+        return fork_cls
+
+    def share_callbacks(self, machine):
+        '''
+            Registers a machine using the callbacks of this definition, so
+            that dead weak callbacks get removed from it as well.
+        '''
+        for callback in self.callbacks.values():
+            if hasattr(callback, 'obj_ref'):
+                self._machines[id(machine)] = machine
+                break
+
+    def _drop_callback(self, name, obj_ref):
+        if _is_dead_callback(self.callbacks.get(name), obj_ref):
+            del self.callbacks[name]
+        for machine in list(self._machines.values()):
+            machine._drop_callback(name, obj_ref)
+
+    def flatten(self, transitions):
+        '''
+            Returns a copy of a {source state: transition} dictionary where
+            every descendant of a source state inherits the transition of its
+            nearest ancestor, so that firing an event is a single lookup.
+        '''
+        flat = dict(transitions)
+        for state in self.parents:
+            if state in transitions:
+                continue
+            parent = self.parents[state]
+            while parent is not None and parent not in transitions:
+                parent = self.parents.get(parent)
+            if parent is not None:
+                flat[state] = transitions[parent]
+        return flat
+
+    def ancestors(self, state):
+        '''
+            Returns the state followed by all of its parents, innermost first.
+        '''
+        chain = [state]
+        while state in self.parents:
+            state = self.parents[state]
+            chain.append(state)
+        return chain
+
+    def expand(self, states):
+        '''
+            Returns the given source states together with all their descendants.
+        '''
+        expanded = set(states)
+        for state in self.parents:
+            if set(self.ancestors(state)) & expanded:
+                expanded.add(state)
+        return expanded
+
+    def path(self, src, dst):
+        '''
+            Returns a tuple (exited states, entered states) for a transition
+            from src to dst. States are exited innermost first and entered
+            outermost first; common ancestors are neither left nor entered.
+        '''
+        key = (src, dst)
+        if key in self._paths:
+            return self._paths[key]
+        if self.parents:
+            src_chain = self.ancestors(src)
+            dst_chain = self.ancestors(dst)
+            common = set(src_chain) & set(dst_chain)
+            exits = tuple(s for s in src_chain if s not in common)
+            enters = tuple(reversed([s for s in dst_chain
+                                     if s not in common]))
+        else:
+            exits, enters = (src,), (dst,)
+        self._paths[key] = (exits, enters)
+        return exits, enters
+
+    @staticmethod
+    def _is_base_string(object):  # pragma: no cover
+        try:
+            return isinstance(object, basestring)  # noqa
+        except NameError:
+            return isinstance(object, str)  # noqa
+
+
 class Fysom(object):
 
     '''
         Wraps the complete finite state machine operations.
     '''
 
+    # fysom.history.History when enabled, recorded into through _history
+    # since an event named history replaces the public attribute.
+    history = _history = None
+
     def __init__(self, cfg={}, initial=None, events=None, callbacks=None,
-                 final=None, **kwargs):
+                 final=None, substates=None, timers=None, weak_callbacks=None,
+                 history=None, profiler=None, validate=None, **kwargs):
         '''
         Construct a Finite State Machine.
 
         Arguments:
 
             cfg         finite state machine specification,
-                        a dictionary with keys 'initial', 'events', 'callbacks', 'final'
+                        a dictionary with keys 'initial', 'events', 'callbacks', 'final',
+                        'substates', or a FysomDefinition shared between machines
 
             initial     initial state
 
@@ -125,7 +590,26 @@ class Fysom(object):
 
             final       a state of the FSM where its is_finished() method returns True
 
-        Named arguments override configuration dictionary.
+            substates   a dictionary mapping parent states to their child states
+
+            timers      a fysom.timers.TimerWheel scheduling the timed events
+
+            weak_callbacks
+                        set to False to hold bound method callbacks strongly,
+                        when their lifetime is managed elsewhere
+
+            history     number of transitions to keep in the history
+                        attribute, a fysom.history.History
+
+            profiler    a fysom.profiling.SamplingProfiler timing the
+                        callbacks of a sample of the transitions
+
+            validate    'strict' or 'warn' to check the definition when it
+                        is compiled, see FysomDefinition
+
+        Named arguments override configuration dictionary. When cfg is a
+        FysomDefinition, only callbacks can be given and they are added to
+        the ones of the definition for this machine only.
 
         Example:
 
@@ -142,36 +626,28 @@ class Fysom(object):
         '''
         if (sys.version_info[0] >= 3):
             super().__init__(**kwargs)
-        cfg = dict(cfg)
-        # override cfg with named arguments
-        if "events" not in cfg:
-            cfg["events"] = []
-        if "callbacks" not in cfg:
-            cfg["callbacks"] = {}
-        if initial:
-            cfg["initial"] = initial
-        if final:
-            cfg["final"] = final
-        if events:
-            cfg["events"].extend(list(events))
-        if callbacks:
-            cfg["callbacks"].update(dict(callbacks))
-        # convert 3-tuples in the event specification to dicts
-        events_dicts = []
-        for e in cfg["events"]:
-            if isinstance(e, collections.Mapping):
-                events_dicts.append(e)
-            elif hasattr(e, "__iter__"):
-                name, src, dst = list(e)[:3]
-                events_dicts.append({"name": name, "src": src, "dst": dst})
-        cfg["events"] = events_dicts
-        self._apply(cfg)
+        self._timers = timers
+        if history:
+            from fysom.history import History
+            self._history = self.history = History(history)
+        if profiler is not None:
+            profiler.attach(self)
+        if isinstance(cfg, FysomDefinition):
+            if initial or events or final or substates or \
+                    weak_callbacks is not None or validate:
+                raise FysomError(
+                    'a compiled definition cannot be overridden')
+            self._apply(cfg, callbacks)
+        else:
+            self._apply(FysomDefinition(cfg, initial, events, callbacks,
+                                        final, substates, weak_callbacks,
+                                        validate))
 
     def isstate(self, state):
         '''
             Returns if the given state is the current state.
         '''
-        return self.current == state
+        return self.current == _name(state)
 
     is_state = isstate
 
@@ -179,6 +655,7 @@ class Fysom(object):
         '''
             Returns if the given event be fired in the current machine state.
         '''
+        event = _name(event)
         return (
             event in self._map and
             ((self.current in self._map[event]) or WILDCARD in self._map[event]) and not
@@ -196,47 +673,22 @@ class Fysom(object):
         '''
         return self._final and (self.current == self._final)
 
-    def _apply(self, cfg):
+    def _apply(self, definition, callbacks=None):
         '''
             Does the heavy lifting of machine construction. More notably:
              >> Sets up the initial and finals states.
              >> Sets the event methods and callbacks into the same object namespace.
-             >> Prepares the event to state transitions map.
+             >> Shares the compiled event to state transitions map.
         '''
-        init = cfg['initial'] if 'initial' in cfg else None
-        if self._is_base_string(init):
-            init = {'state': init}
-
-        self._final = cfg['final'] if 'final' in cfg else None
-
-        events = cfg['events'] if 'events' in cfg else []
-        callbacks = cfg['callbacks'] if 'callbacks' in cfg else {}
-        tmap = {}
-        self._map = tmap
-
-        def add(e):
-            '''
-                Adds the event into the machine map.
-            '''
-            if 'src' in e:
-                src = [e['src']] if self._is_base_string(
-                    e['src']) else e['src']
-            else:
-                src = [WILDCARD]
-            if e['name'] not in tmap:
-                tmap[e['name']] = {}
-            for s in src:
-                tmap[e['name']][s] = e['dst']
-
-        # Consider initial state as any other state that can have transition from none to
-        # initial value on occurance of startup / init event ( if specified).
-        if init:
-            if 'event' not in init:
-                init['event'] = 'startup'
-            add({'name': init['event'], 'src': 'none', 'dst': init['state']})
-
-        for e in events:
-            add(e)
+        init = definition.initial
+        self._definition = definition
+        self._final = definition.final
+        self._map = tmap = definition.map
+        self._timeouts = None
+        if definition.timeouts:
+            if getattr(self, '_timers', None) is None:
+                raise FysomError('timed events require a timer wheel')
+            self._timeouts = {}
 
         # For all the events as present in machine map, construct the event
         # handler.
@@ -245,8 +697,15 @@ class Fysom(object):
 
         # For all the callbacks, register them into the current object
         # namespace.
-        for name in callbacks:
-            setattr(self, name, _weak_callback(callbacks[name]))
+        for name in definition.callbacks:
+            setattr(self, name, definition.callbacks[name])
+        definition.share_callbacks(self)
+        if callbacks:
+            self_ref = weakref.ref(self)
+            for name in callbacks:
+                setattr(self, name, _weak_callback(
+                    callbacks[name], definition.weak_callbacks,
+                    partial(_drop_dead_callback, self_ref, name)))
 
         self.current = 'none'
 
@@ -261,117 +720,159 @@ class Fysom(object):
             registers the same into current object namespace.
         '''
         def fn(*args, **kwargs):
+            self._fire(event, args, kwargs, True)
+
+        fn.__name__ = str(event)
+        fn.__doc__ = ("Event handler for an {event} event. This event can be " +
+                      "fired if the machine is in {states} states.".format(
+                          event=event, states=self._map[event].keys()))
 
-            if hasattr(self, 'transition'):
+        return fn
+
+    class _e_obj(object):
+        pass
+
+    def _fire(self, event, args, kwargs, strict):
+        '''
+            Runs a single event through the machine.
+            With strict set, invalid and canceled events raise FysomError and
+            Canceled; otherwise a TriggerResult code is returned instead and no
+            exception or message is ever built.
+        '''
+        if hasattr(self, 'transition'):
+            if strict:
                 raise FysomError(
                     "event %s inappropriate because previous transition did not complete" % event)
-
-            # Check if this event can be triggered in the current state.
-            if not self.can(event):
+            return TriggerResult.INVALID
+
+        # On event occurence, source will always be the current state.
+        src = self.current
+        # Finds the destination state, after this event is completed.
+        dst = lookup(self._map, event, src)
+        if dst is None:
+            if strict:
                 raise FysomError(
-                    "event %s inappropriate in current state %s" % (event, self.current))
-
-            # On event occurence, source will always be the current state.
-            src = self.current
-            # Finds the destination state, after this event is completed.
-            dst = ((src in self._map[event] and self._map[event][src]) or
-                   WILDCARD in self._map[event] and self._map[event][WILDCARD])
-            if dst == SAME_DST:
-                dst = src
-
-            # Prepares the object with all the meta data to be passed to
-            # callbacks.
-            class _e_obj(object):
-                pass
-            e = _e_obj()
-            e.fsm, e.event, e.src, e.dst = self, event, src, dst
-            for k in kwargs:
-                setattr(e, k, kwargs[k])
-
-            setattr(e, 'args', args)
-
-            # Try to trigger the before event, unless it gets canceled.
-            if self._before_event(e) is False:
+                    "event %s inappropriate in current state %s" % (event, src))
+            return TriggerResult.INVALID
+
+        # Prepares the object with all the meta data to be passed to
+        # callbacks.
+        e = self._e_obj()
+        e.fsm, e.event, e.src, e.dst = self, event, src, dst
+        for k in kwargs:
+            setattr(e, k, kwargs[k])
+
+        setattr(e, 'args', args)
+
+        # Try to trigger the before event, unless it gets canceled.
+        if self._before_event(e) is False:
+            if strict:
                 raise Canceled(
                     "Cannot trigger event {0} because the onbefore{0} handler returns False".format(e.event))
-
-            # Wraps the activities that must constitute a single successful
-            # transaction.
-            if self.current != dst:
-                def _tran():
-                    delattr(self, 'transition')
-                    self.current = dst
-                    self._enter_state(e)
-                    self._change_state(e)
-                    self._after_event(e)
-                self.transition = _tran
-
-                # Hook to perform asynchronous transition.
-                if self._leave_state(e) is not False:
-                    self.transition()
-            else:
-                self._reenter_state(e)
+            return TriggerResult.CANCELED
+
+        # Wraps the activities that must constitute a single successful
+        # transaction.
+        if self.current != dst:
+            exits, enters = self._definition.path(src, dst)
+
+            def _tran():
+                delattr(self, 'transition')
+                self.current = dst
+                if self._history is not None:
+                    self._history.record(event, src, dst)
+                if self._timeouts is not None:
+                    self._update_timeouts(exits, enters)
+                for state in enters:
+                    self._enter_state(e, state)
+                self._change_state(e)
                 self._after_event(e)
+            self.transition = _tran
+
+            # Hook to perform asynchronous transition. Every exited state is
+            # left, the transition is on hold if any of them returns False.
+            pending = False
+            for state in exits:
+                if self._leave_state(e, state) is False:
+                    pending = True
+            if pending:
+                return TriggerResult.PENDING
+            self.transition()
+        else:
+            if self._history is not None:
+                self._history.record(event, src, dst)
+            self._reenter_state(e)
+            self._after_event(e)
+        return TriggerResult.OK
+
+    def _drop_callback(self, name, obj_ref):
+        '''
+            Removes the callback registered as name if it is the weak
+            callback of the given dead object.
+        '''
+        if _is_dead_callback(self.__dict__.get(name), obj_ref):
+            delattr(self, name)
 
-        fn.__name__ = str(event)
-        fn.__doc__ = ("Event handler for an {event} event. This event can be " +
-                      "fired if the machine is in {states} states.".format(
-                          event=event, states=self._map[event].keys()))
-
-        return fn
+    def _update_timeouts(self, exits, enters):
+        '''
+            Cancels the timed events of the states being left and schedules
+            the ones of the states being entered.
+        '''
+        pending = self._timeouts
+        for state in exits:
+            for timer in pending.pop(state, ()):
+                timer.cancel()
+        timeouts = self._definition.timeouts
+        for state in enters:
+            if state in timeouts:
+                ref = weakref.ref(self)
+                pending[state] = [
+                    self._timers.schedule(
+                        delay, partial(_timeout_callback, ref, event))
+                    for delay, event in timeouts[state]]
 
     def _before_event(self, e):
         '''
             Checks to see if the callback is registered before this event can be triggered.
         '''
-        for fnname in ['onbefore' + e.event, 'on_before_' + e.event]:
-            if hasattr(self, fnname):
-                return getattr(self, fnname)(e)
+        return call_first(self, _callback_names('before', e.event), e)
 
     def _after_event(self, e):
         '''
             Checks to see if the callback is registered for, after this event is completed.
         '''
-        for fnname in ['onafter' + e.event, 'on' + e.event,
-                       'on_after_' + e.event, 'on_' + e.event]:
-            if hasattr(self, fnname):
-                return getattr(self, fnname)(e)
+        return call_first(self, _callback_names('after', e.event), e)
 
-    def _leave_state(self, e):
+    def _leave_state(self, e, state=None):
         '''
             Checks to see if the machine can leave the current state and perform the transition.
             This is helpful if the asynchronous job needs to be completed before the machine can
-            leave the current state.
+            leave the current state. For hierarchical states, state is the exited parent state.
         '''
-        for fnname in ['onleave' + e.src, 'on_leave_' + e.src]:
-            if hasattr(self, fnname):
-                return getattr(self, fnname)(e)
+        state = e.src if state is None else state
+        return call_first(self, _callback_names('leave', state), e)
 
-    def _enter_state(self, e):
+    def _enter_state(self, e, state=None):
         '''
             Executes the callback for onenter_state_ or on_state_.
+            For hierarchical states, state is the entered parent state.
         '''
-        for fnname in ['onenter' + e.dst, 'on' + e.dst,
-                       'on_enter_' + e.dst, 'on_' + e.dst]:
-            if hasattr(self, fnname):
-                return getattr(self, fnname)(e)
+        state = e.dst if state is None else state
+        return call_first(self, _callback_names('enter', state), e)
 
-    def _reenter_state(self, e):
+    def _reenter_state(self, e, state=None):
         '''
             Executes the callback for onreenter_state_.
             This allows callbacks following reflexive transitions (i.e. where src == dst)
         '''
-        for fnname in ['onreenter' + e.dst, 'on_reenter_' + e.dst]:
-            if hasattr(self, fnname):
-                return getattr(self, fnname)(e)
+        state = e.dst if state is None else state
+        return call_first(self, _callback_names('reenter', state), e)
 
     def _change_state(self, e):
         '''
             A general change state callback. This gets triggered at the time of state transition.
         '''
-        for fnname in ['onchangestate', 'on_change_state']:
-            if hasattr(self, fnname):
-                return getattr(self, fnname)(e)
+        return call_first(self, _CHANGE_STATE_NAMES, e)
 
     def _is_base_string(self, object):  # pragma: no cover
         '''
@@ -389,21 +890,88 @@ class Fysom(object):
             but this method will come in handy if the event is determined dynamically and you have
             the event name to trigger as a string.
         '''
+        event = _name(event)
         if not hasattr(self, event):
             raise FysomError(
                 "There isn't any event registered as %s" % event)
         return getattr(self, event)(*args, **kwargs)
 
+    def fork(self):
+        '''
+            Returns a new machine in the current state of this one, to try
+            events on without affecting it. The fork shares the compiled
+            definition and reads the callbacks of this machine until it sets
+            its own, so forking does not depend on the number of events or
+            callbacks. Other instance attributes, such as those of Fysom
+            subclasses, are read from this machine too until the fork sets
+            them. Forks do not schedule timed events nor record history.
+        '''
+        if hasattr(self, 'transition'):
+            raise FysomError(
+                'a machine cannot be forked during a pending transition')
+        parent = self
+        if isinstance(self, _Forked) and \
+                _FORK_STATE.issuperset(vars(self)):
+            # Nothing written on the fork yet: fork from the same machine.
+            parent = self._fork_parent
+        cls = self._definition.fork_class(
+            getattr(type(self), '_fork_base', type(self)))
+        fork = cls.__new__(cls)
+        fork.__dict__.update({
+            '_fork_parent': parent,
+            '_definition': self._definition,
+            '_final': self._final,
+            '_map': self._map,
+            '_timers': None,
+            '_timeouts': None,
+            'current': self.current,
+        })
+        return fork
+
+    def try_trigger(self, event, *args, **kwargs):
+        '''
+            Triggers the given event without raising for unknown, inappropriate
+            or canceled events.
+            Returns one of the TriggerResult codes: OK when the transition
+            completed, PENDING when an onleave handler deferred it, CANCELED when
+            an onbefore handler returned False and INVALID when the event cannot
+            be fired in the current state. Exceptions raised by callbacks are
+            still propagated.
+        '''
+        return self._fire(_name(event), args, kwargs, False)
+
+    fire_if_possible = try_trigger
+
 
 class FysomGlobalMixin(object):
     GSM = None  # global state machine instance, override this
 
+    def __init_subclass__(cls, **kwargs):
+        '''
+            Checks that the conditions of a validated GSM are callbacks or
+            methods of the model class (Python 3.6 and later).
+        '''
+        super(FysomGlobalMixin, cls).__init_subclass__(**kwargs)
+        gsm = cls.__dict__.get('GSM')
+        if gsm is not None and gsm._definition.validate:
+            from fysom import validation
+            validation.report(
+                validation.missing_conditions(
+                    gsm._definition, gsm._callbacks, cls),
+                gsm._definition.validate, cls.__name__)
+
     def __init__(self, *args, **kwargs):
         super(FysomGlobalMixin, self).__init__(*args, **kwargs)
+        gsm = self.GSM
         if self.is_state('none'):
-            _initial = self.GSM._initial
+            _initial = gsm._initial
             if _initial and not _initial.get('defer'):
                 self.trigger(_initial['event'])
+        elif gsm._metrics is not None:
+            # Constructed in a saved state: counted without a transition.
+            gsm._metrics.move('none', gsm.current(self))
+        if gsm._index is not None:
+            gsm._index.add(self, gsm.current(self))
 
     def __getattribute__(self, attr):
         '''
@@ -415,7 +983,7 @@ class FysomGlobalMixin(object):
             if not attr.startswith('_'):
                 gsm_attr = getattr(self.GSM, attr)
                 if callable(gsm_attr):
-                    return functools.partial(gsm_attr, self)
+                    return partial(gsm_attr, self)
             raise  # pragma: no cover
 
     @property
@@ -427,7 +995,15 @@ class FysomGlobalMixin(object):
 
     @current.setter
     def current(self, state):
-        setattr(self, self.GSM.state_field, state)
+        state = _name(state)
+        gsm = self.GSM
+        if gsm._index is not None or gsm._metrics is not None:
+            src = gsm.current(self)
+            if gsm._index is not None:
+                gsm._index.move(self, src, state)
+            if gsm._metrics is not None:
+                gsm._metrics.move(src, state)
+        gsm._write(self, state)
 
 
 class FysomGlobal(object):
@@ -436,12 +1012,56 @@ class FysomGlobal(object):
     '''
 
     def __init__(self, cfg={}, initial=None, events=None, callbacks=None,
-                 final=None, state_field=None, **kwargs):
+                 final=None, state_field=None, substates=None, timers=None,
+                 weak_callbacks=None, store=None, history=None, metrics=None,
+                 index=False, profiler=None, validate=None, state_codes=None,
+                 **kwargs):
         '''
         Construct a Global Finite State Machine.
 
         Takes same arguments as Fysom and an additional state_field
         to specify which field holds the state to be processed.
+        Pending timed events of an object are kept in its _fysom_timeouts
+        attribute.
+
+        With a store (see fysom.stores), the machine handles keys instead of
+        objects: states are read from and written to the store, unknown keys
+        being in the initial state, and callbacks get a StoredEntity with a
+        key attribute as e.obj. state_field then defaults to 'state'.
+
+        With history set, the last history transitions of each object are
+        recorded in a fysom.history.History kept in its _fysom_history
+        attribute and returned by the history() method.
+
+        metrics, True or a fysom.metrics.GlobalMetrics, enables the counters
+        of the metrics attribute: population per state, transitions,
+        cancellations and invalid events. An event named metrics replaces
+        the attribute but not the counters, still updated in the instance
+        given.
+
+        With index set, the index attribute is a fysom.index.StateIndex of
+        the objects per state, kept up to date by transitions and by
+        FysomGlobalMixin objects, and sweep() fires an event on all the
+        objects of a state, even when an event named index replaces the
+        attribute.
+
+        profiler is a fysom.profiling.SamplingProfiler timing the callbacks
+        and conditions of a sample of the transitions.
+
+        With state_codes, the state field holds small integers instead of
+        state names, while the methods keep taking and returning names:
+        state_names lists the states by code, 'none' being 0, and
+        state_code(), state_name() and the state_enum IntEnum convert them.
+        state_codes is True to number the states in alphabetical order, or
+        the sequence of all the state names, to keep their codes stable
+        when states are added to the definition. The members of an IntEnum
+        keep their values as codes, which must run from 0, the code of
+        'none', to the number of states minus one.
+
+        validate, 'strict' or 'warn', checks the definition as Fysom does,
+        and also reports conditions that cannot be evaluated and, on Python
+        3.6 and later, conditions missing from the callbacks and from the
+        class of FysomGlobalMixin models.
 
         Difference with Fysom:
 
@@ -498,50 +1118,59 @@ class FysomGlobal(object):
         '''
         if sys.version_info[0] >= 3:
             super().__init__(**kwargs)
-        cfg = dict(cfg)
 
         # state_field is required for global machine
         if not state_field:
-            raise FysomError('state_field required for global machine')
+            if store is None:
+                raise FysomError('state_field required for global machine')
+            state_field = 'state'
         self.state_field = state_field
 
-        if "events" not in cfg:
-            cfg["events"] = []
-        if "callbacks" not in cfg:
-            cfg["callbacks"] = {}
-        if initial:
-            cfg['initial'] = initial
-        if events:
-            cfg["events"].extend(list(events))
-        if callbacks:
-            cfg["callbacks"].update(dict(callbacks))
-        if final:
-            cfg["final"] = final
-        # convert 3-tuples in the event specification to dicts
-        events_dicts = []
-        for e in cfg["events"]:
-            if isinstance(e, collections.Mapping):
-                events_dicts.append(e)
-            elif hasattr(e, "__iter__"):
-                name, src, dst = list(e)[:3]
-                events_dicts.append({"name": name, "src": src, "dst": dst})
-        cfg["events"] = events_dicts
-
-        self._map = {}  # different with Fysom's _map attribute
+        if isinstance(cfg, FysomDefinition):
+            if initial or events or final or substates or \
+                    weak_callbacks is not None or validate:
+                raise FysomError(
+                    'a compiled definition cannot be overridden')
+            definition = cfg
+        else:
+            definition = FysomDefinition(cfg, initial, events, callbacks,
+                                         final, substates, weak_callbacks,
+                                         validate)
+            callbacks = None
+
+        self._map = {}  # {event: {source state: transition}}
+        self._table = {}  # {(source state, event): transition}
         self._callbacks = {}
         self._initial = None
         self._final = None
-        self._apply(cfg)
-
-    def _apply(self, cfg):
-        def add(e):
-            if 'src' in e:
-                src = [e['src']] if self._is_base_string(
-                    e['src']) else e['src']
-            else:
-                src = [WILDCARD]
-
-            _e = {'src': set(src), 'dst': e['dst']}
+        self._timers = timers
+        self._history = history
+        if metrics is True:
+            from fysom.metrics import GlobalMetrics
+            metrics = GlobalMetrics()
+        if index:
+            if store is not None:
+                raise FysomError('a store cannot be indexed by objects')
+            from fysom.index import StateIndex
+            index = StateIndex()
+        # Public aliases of _index, _metrics and _store, which events named
+        # index, metrics or store replace.
+        self._index = self.index = index or None
+        self._metrics = self.metrics = metrics or None
+        self.store = store
+        self._apply(definition, callbacks)
+        self.state_names = self._codes = self._state_enum = None
+        if state_codes:
+            self._use_codes(state_codes)
+        self._store = None
+        if store is not None:
+            self._use_store(store)
+        if profiler is not None:
+            profiler.attach(self)
+
+    def _apply(self, definition, callbacks=None):
+        def transition(e):
+            _e = {'dst': e['dst']}
             conditions = e.get('cond')
             if conditions:
                 _e['cond'] = _c = []
@@ -553,95 +1182,274 @@ class FysomGlobal(object):
                             _c.append({True: cond})
                         else:
                             _c.append(cond)
-            self._map[e['name']] = _e
+            return _e
+
+        self._definition = definition
+        self._initial = definition.initial
+        self._final = definition.final
+        if definition.timeouts and self._timers is None:
+            raise FysomError('timed events require a timer wheel')
+
+        # Like Fysom, every source state of an event has its own transition
+        # (destination and conditions), later definitions overriding earlier
+        # ones. _table compiles them by (state, event) for firing.
+        raw = {}
+        for e in definition.events:
+            _e = transition(e)
+            sources = raw.setdefault(e['name'], {})
+            for src in e['src']:
+                sources[src] = _e
+        for event, sources in raw.items():
+            self._map[event] = sources = definition.flatten(sources)
+            for src, _e in sources.items():
+                self._table[(src, event)] = _e
 
-        initial = cfg['initial'] if 'initial' in cfg else None
-        if self._is_base_string(initial):
-            initial = {'state': initial}
-        if initial:
-            if 'event' not in initial:
-                initial['event'] = 'startup'
-            self._initial = initial
-            add({'name': initial['event'],
-                 'src': 'none', 'dst': initial['state']})
+        for event in self._map:
+            setattr(self, event, self._build_event(event))
+
+        self._callbacks.update(definition.callbacks)
+        definition.share_callbacks(self)
+        if callbacks:
+            self_ref = weakref.ref(self)
+            for name, callback in callbacks.items():
+                self._callbacks[name] = _weak_callback(
+                    callback, definition.weak_callbacks,
+                    partial(_drop_dead_callback, self_ref, name))
+
+        if definition.validate:
+            from fysom import validation
+            validation.report(
+                validation.invalid_conditions(definition),
+                definition.validate)
+
+    def _use_codes(self, state_codes):
+        states = set(self._definition.states)
+        for sources in self._map.values():
+            for transition in sources.values():
+                for cond in transition.get('cond', ()):
+                    if 'else' in cond:
+                        states.add(cond['else'])
+        if state_codes is True:
+            names = ['none'] + sorted(states - set(['none']))
+        else:
+            if hasattr(state_codes, '__members__') and \
+                    issubclass(state_codes, int):
+                names = self._enum_codes(state_codes)
+            else:
+                names = [_name(state) for state in state_codes]
+                if 'none' not in names:
+                    names.insert(0, 'none')
+            if len(set(names)) != len(names):
+                raise FysomError('state codes must be unique')
+            missing = states - set(names)
+            if missing:
+                raise FysomError('states without code: %s'
+                                 % ', '.join(sorted(missing)))
+        self.state_names = tuple(names)
+        self._codes = dict((name, code) for code, name in enumerate(names))
 
-        if 'final' in cfg:
-            self._final = cfg['final']
+    @staticmethod
+    def _enum_codes(enum_class):
+        # Members of an IntEnum keep their values as codes, which must number
+        # the states from 0, 'none' being 0 when it is not a member.
+        codes = dict((name, int(member))
+                     for name, member in enum_class.__members__.items())
+        codes.setdefault('none', 0)
+        names = [None] * len(codes)
+        for name, code in codes.items():
+            if not 0 <= code < len(names) or names[code] is not None:
+                raise FysomError('codes of %s must be unique and from 0 to %d'
+                                 % (enum_class.__name__, len(names) - 1))
+            names[code] = name
+        if names[0] != 'none':
+            raise FysomError("the code of state 'none' must be 0")
+        return names
+
+    def state_code(self, state):
+        '''
+            Returns the integer code of a state name.
+        '''
+        try:
+            return self._codes[_name(state)]
+        except KeyError:
+            raise FysomError('unknown state %s' % (state,))
+        except TypeError:
+            raise FysomError('states of this machine are not encoded')
 
-        for e in cfg['events']:
-            add(e)
+    def state_name(self, code):
+        '''
+            Returns the name of the state of an integer code.
+        '''
+        if self.state_names is None:
+            raise FysomError('states of this machine are not encoded')
+        return self.state_names[code]
 
-        for event in self._map:
-            setattr(self, event, self._build_event(event))
+    @property
+    def state_enum(self):
+        '''
+            IntEnum of the encoded states, generated on first use.
+        '''
+        if self._state_enum is None:
+            if self.state_names is None:
+                raise FysomError('states of this machine are not encoded')
+            import enum
+            self._state_enum = enum.IntEnum('State', [
+                (name, code) for code, name in enumerate(self.state_names)])
+        return self._state_enum
+
+    def _write(self, obj, state):
+        if self._codes is not None:
+            state = self.state_code(state)
+        setattr(obj, self.state_field, state)
+
+    def _use_store(self, store):
+        from fysom.stores import entity_class
+        if self._definition.timeouts:
+            raise FysomError('timed events are not supported with a store')
+        if self._history:
+            raise FysomError('histories are not supported with a store')
+        initial = self._initial
+        if initial and not initial.get('defer'):
+            self._store_default = initial['state']
+        else:
+            self._store_default = 'none'
+        if self._codes is not None:
+            self._store_default = self._codes[self._store_default]
+        self._entity_class = entity_class(self.state_field)
+        self._pending = {}
+        self._store = store
+
+    def entity(self, key):
+        '''
+            Returns the stand-in object of a key of the store, the one
+            awaiting the end of its transition if there is one.
+        '''
+        entity = self._pending.get(key)
+        if entity is None:
+            entity = self._entity_class(self, key)
+        return entity
 
-        for name, callback in cfg['callbacks'].items():
-            self._callbacks[name] = _weak_callback(callback)
+    def _target(self, obj):
+        if self._store is None or isinstance(obj, self._entity_class):
+            return obj
+        return self.entity(obj)
 
     def _build_event(self, event):
         def fn(obj, *args, **kwargs):
-            if not self.can(obj, event):
-                raise FysomError(
-                    'event %s inappropriate in current state %s'
-                    % (event, self.current(obj)))
-
-            # Prepare the event object with all the meta data to pas through.
-            # On event occurrence, source will always be the current state.
-            e = self._e_obj()
-            e.fsm, e.obj, e.event, e.src, e.dst = (
-                self, obj, event, self.current(obj), self._map[event]['dst'])
-            setattr(e, 'args', args)
-            setattr(e, 'kwargs', kwargs)
-            for k, v in kwargs.items():
-                setattr(e, k, v)
-
-            # check conditions first, event dst may change during
-            # checking conditions
-            for c in self._map[event].get('cond', ()):
-                target = True in c
-                cond = c[target]
-                _c_r = self._check_condition(obj, cond, target, e)
-                if not _c_r:
-                    if 'else' in c:
-                        e.dst = c['else']
-                        break
-                    else:
-                        raise Canceled(
-                            'Cannot trigger event {0} because the {1} '
-                            'condition not returns {2}'.format(
-                                event, cond, target), e
-                        )
-
-            # try to trigger the before event, unless it gets cancelled.
-            if self._before_event(obj, e) is False:
-                raise Canceled(
-                    'Cannot trigger event {0} because the onbefore{0} '
-                    'handler returns False'.format(event), e)
-
-            # wraps the activities that must constitute a single transaction
-            if self.current(obj) != e.dst:
-                def _trans():
-                    delattr(obj, 'transition')
-                    setattr(obj, self.state_field, e.dst)
-                    self._enter_state(obj, e)
-                    self._change_state(obj, e)
-                    self._after_event(obj, e)
-                obj.transition = _trans
-
-                # Hook to perform asynchronous transition
-                if self._leave_state(obj, e) is not False:
-                    obj.transition()
-            else:
-                self._reenter_state(obj, e)
-                self._after_event(obj, e)
+            self._fire(obj, event, args, kwargs, True)
 
         fn.__name__ = str(event)
         fn.__doc__ = (
             "Event handler for an {event} event. This event can be "
             "fired if the machine is in {states} states.".format(
-                event=event, states=self._map[event]['src']))
+                event=event, states=sorted(self._map[event])))
 
         return fn
 
+    def _transition(self, obj, src, event):
+        if hasattr(obj, 'transition'):
+            return None
+        transition = self._table.get((src, event))
+        if transition is None:
+            transition = self._table.get((WILDCARD, event))
+        return transition
+
+    def _fire(self, obj, event, args, kwargs, strict):
+        if self._store is not None:
+            obj = self._target(obj)
+        src = self.current(obj)
+        transition = self._transition(obj, src, event)
+        if transition is None:
+            if self._metrics is not None:
+                self._metrics.invalid(event)
+            if strict:
+                raise FysomError(
+                    'event %s inappropriate in current state %s'
+                    % (event, src))
+            return TriggerResult.INVALID
+
+        # Prepare the event object with all the meta data to pas through.
+        # On event occurrence, source will always be the current state.
+        dst = transition['dst']
+        e = self._e_obj()
+        e.fsm, e.obj, e.event, e.src, e.dst = (
+            self, obj, event, src, src if dst == SAME_DST else dst)
+        setattr(e, 'args', args)
+        setattr(e, 'kwargs', kwargs)
+        for k, v in kwargs.items():
+            setattr(e, k, v)
+
+        # check conditions first, event dst may change during
+        # checking conditions
+        for c in transition.get('cond', ()):
+            target = True in c
+            cond = c[target]
+            _c_r = self._check_condition(obj, cond, target, e)
+            if not _c_r:
+                if 'else' in c:
+                    e.dst = c['else']
+                    break
+                if self._metrics is not None:
+                    self._metrics.cancel(event, cond)
+                if strict:
+                    raise Canceled(
+                        'Cannot trigger event {0} because the {1} '
+                        'condition not returns {2}'.format(
+                            event, cond, target), e
+                    )
+                else:
+                    return TriggerResult.CANCELED
+
+        # try to trigger the before event, unless it gets cancelled.
+        if self._before_event(obj, e) is False:
+            if self._metrics is not None:
+                self._metrics.cancel(event)
+            if strict:
+                raise Canceled(
+                    'Cannot trigger event {0} because the onbefore{0} '
+                    'handler returns False'.format(event), e)
+            return TriggerResult.CANCELED
+
+        # wraps the activities that must constitute a single transaction
+        if self.current(obj) != e.dst:
+            exits, enters = self._definition.path(e.src, e.dst)
+
+            def _trans():
+                delattr(obj, 'transition')
+                self._write(obj, e.dst)
+                if self._history:
+                    self._record(obj, e)
+                if self._metrics is not None:
+                    self._metrics.transition(event, e.src, e.dst)
+                if self._index is not None:
+                    self._index.move(obj, e.src, e.dst)
+                if self._definition.timeouts:
+                    self._update_timeouts(obj, exits, enters)
+                for state in enters:
+                    self._enter_state(obj, e, state)
+                self._change_state(obj, e)
+                self._after_event(obj, e)
+            obj.transition = _trans
+
+            # Hook to perform asynchronous transition
+            pending = False
+            for state in exits:
+                if self._leave_state(obj, e, state) is False:
+                    pending = True
+            if pending:
+                if self._store is not None and hasattr(obj, 'transition'):
+                    self._pending[obj.key] = obj
+                return TriggerResult.PENDING
+            obj.transition()
+        else:
+            if self._history:
+                self._record(obj, e)
+            if self._metrics is not None:
+                self._metrics.transition(event, e.src, e.dst)
+            self._reenter_state(obj, e)
+            self._after_event(obj, e)
+        return TriggerResult.OK
+
     class _e_obj(object):
         pass
 
@@ -652,57 +1460,96 @@ class FysomGlobal(object):
         except NameError:
             return isinstance(object, str)  # noqa
 
-    def _do_callbacks(self, obj, callbacks, *args, **kwargs):
-        for cb in callbacks:
-            if cb in self._callbacks:
-                return self._callbacks[cb](*args, **kwargs)
-            if hasattr(obj, cb):
-                return getattr(obj, cb)(*args, **kwargs)
+    def _drop_callback(self, name, obj_ref):
+        if _is_dead_callback(self._callbacks.get(name), obj_ref):
+            del self._callbacks[name]
+
+    def _record(self, obj, e):
+        history = getattr(obj, '_fysom_history', None)
+        if history is None:
+            from fysom.history import History
+            history = obj._fysom_history = History(self._history)
+        history.record(e.event, e.src, e.dst)
+
+    def history(self, obj):
+        '''
+            Returns the fysom.history.History of obj, None if it has no
+            recorded transition.
+        '''
+        return getattr(obj, '_fysom_history', None)
+
+    def _update_timeouts(self, obj, exits, enters):
+        pending = getattr(obj, '_fysom_timeouts', None)
+        if pending is None:
+            pending = obj._fysom_timeouts = {}
+        for state in exits:
+            for timer in pending.pop(state, ()):
+                timer.cancel()
+        timeouts = self._definition.timeouts
+        for state in enters:
+            if state in timeouts:
+                try:
+                    ref = weakref.ref(obj)
+                except TypeError:
+                    ref = lambda: obj  # noqa
+                pending[state] = [
+                    self._timers.schedule(
+                        delay, partial(self._timeout, ref, event))
+                    for delay, event in timeouts[state]]
+
+    def _timeout(self, ref, event):
+        obj = ref()
+        if obj is not None:
+            self.try_trigger(obj, event)
 
     def _check_condition(self, obj, func, target, e):
         if callable(func):
             return func(e) is target
-        return self._do_callbacks(obj, [func], e) is target
+        return call_first_global(self._callbacks, obj, (func,), e) is target
 
     def _before_event(self, obj, e):
-        callbacks = ['onbefore' + e.event, 'on_before_' + e.event]
-        return self._do_callbacks(obj, callbacks, e)
+        callbacks = _callback_names('before', e.event)
+        return call_first_global(self._callbacks, obj, callbacks, e)
 
     def _after_event(self, obj, e):
-        callbacks = ['onafter' + e.event, 'on' + e.event,
-                     'on_after_' + e.event, 'on_' + e.event]
-        return self._do_callbacks(obj, callbacks, e)
+        callbacks = _callback_names('after', e.event)
+        return call_first_global(self._callbacks, obj, callbacks, e)
 
-    def _leave_state(self, obj, e):
-        callbacks = ['onleave' + e.src, 'on_leave_' + e.src]
-        return self._do_callbacks(obj, callbacks, e)
+    def _leave_state(self, obj, e, state=None):
+        state = e.src if state is None else state
+        callbacks = _callback_names('leave', state)
+        return call_first_global(self._callbacks, obj, callbacks, e)
 
-    def _enter_state(self, obj, e):
-        callbacks = ['onenter' + e.dst, 'on' + e.dst,
-                     'on_enter_' + e.dst, 'on_' + e.dst]
-        return self._do_callbacks(obj, callbacks, e)
+    def _enter_state(self, obj, e, state=None):
+        state = e.dst if state is None else state
+        callbacks = _callback_names('enter', state)
+        return call_first_global(self._callbacks, obj, callbacks, e)
 
     def _reenter_state(self, obj, e):
-        callbacks = ['onreenter' + e.dst, 'on_reenter_' + e.dst]
-        return self._do_callbacks(obj, callbacks, e)
+        callbacks = _callback_names('reenter', e.dst)
+        return call_first_global(self._callbacks, obj, callbacks, e)
 
     def _change_state(self, obj, e):
-        callbacks = ['onchangestate', 'on_change_state']
-        return self._do_callbacks(obj, callbacks, e)
+        return call_first_global(self._callbacks, obj, _CHANGE_STATE_NAMES, e)
 
     def current(self, obj):
-        return getattr(obj, self.state_field) or 'none'
+        if self._store is not None:
+            obj = self._target(obj)
+        state = getattr(obj, self.state_field)
+        if self.state_names is not None and state is not None:
+            return self.state_names[state]
+        return state or 'none'
 
     def isstate(self, obj, state):
-        return self.current(obj) == state
+        return self.current(obj) == _name(state)
 
     is_state = isstate
 
     def can(self, obj, event):
-        if event not in self._map or hasattr(obj, 'transition'):
-            return False
-        src = self._map[event]['src']
-        return self.current(obj) in src or WILDCARD in src
+        if self._store is not None:
+            obj = self._target(obj)
+        return self._transition(
+            obj, self.current(obj), _name(event)) is not None
 
     def cannot(self, obj, event):
         return not self.can(obj, event)
@@ -711,7 +1558,73 @@ class FysomGlobal(object):
         return self._final and (self.current(obj) == self._final)
 
     def trigger(self, obj, event, *args, **kwargs):
+        event = _name(event)
         if not hasattr(self, event):
             raise FysomError(
                 "There isn't any event registered as %s" % event)
         return getattr(self, event)(obj, *args, **kwargs)
+
+    def try_trigger(self, obj, event, *args, **kwargs):
+        '''
+            Non-raising counterpart of trigger(), see Fysom.try_trigger.
+        '''
+        return self._fire(obj, _name(event), args, kwargs, False)
+
+    def sweep(self, state, event, *args, **kwargs):
+        '''
+            Tries to trigger event on every indexed object in state, and
+            returns a dictionary counting the TriggerResult codes.
+        '''
+        if self._index is None:
+            raise FysomError('sweep requires an index')
+        results = {}
+        event = _name(event)
+        for obj in self._index.members(_name(state)):
+            result = self._fire(obj, event, args, kwargs, False)
+            results[result] = results.get(result, 0) + 1
+        return results
+
+    fire_if_possible = try_trigger
+
+
+# Optional subsystems are only imported on first access, so that
+# "from fysom import Fysom" stays cheap (PEP 562, Python 3.7 and later;
+# earlier versions need an explicit "import fysom.regions").
+_LAZY_ATTRIBUTES = {
+    'codegen': ('fysom.codegen', None),
+    'coalesce': ('fysom.coalesce', None),
+    'history': ('fysom.history', None),
+    'index': ('fysom.index', None),
+    'loader': ('fysom.loader', None),
+    'metrics': ('fysom.metrics', None),
+    'pool': ('fysom.pool', None),
+    'profiling': ('fysom.profiling', None),
+    'regions': ('fysom.regions', None),
+    'simulate': ('fysom.simulate', None),
+    'stores': ('fysom.stores', None),
+    'stream': ('fysom.stream', None),
+    'timers': ('fysom.timers', None),
+    'validation': ('fysom.validation', None),
+    'Coalescer': ('fysom.coalesce', 'Coalescer'),
+    'FysomRegions': ('fysom.regions', 'FysomRegions'),
+    'MachinePool': ('fysom.pool', 'MachinePool'),
+    'StreamProcessor': ('fysom.stream', 'StreamProcessor'),
+    'TimerWheel': ('fysom.timers', 'TimerWheel'),
+}
+
+
+def __getattr__(name):
+    try:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+    import importlib
+    module = importlib.import_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
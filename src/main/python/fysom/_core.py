@@ -0,0 +1,83 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Pure Python implementation of the event dispatch primitives.
+
+    fysom/_speedups.c implements the same functions in C; fysom uses it
+    when it is compiled and falls back to this module otherwise.
+'''
+
+WILDCARD = '*'
+SAME_DST = '='
+
+
+def lookup(tmap, event, src):
+    '''
+        Returns the destination of event from src in an event to
+        {source: destination} map, with the '*' and '=' symbols resolved, or
+        None if the event cannot be fired from src.
+    '''
+    dsts = tmap.get(event)
+    if dsts is None:
+        return None
+    if src in dsts:
+        dst = dsts[src]
+    else:
+        dst = dsts.get(WILDCARD)
+    if not dst:
+        return None
+    if dst == SAME_DST:
+        return src
+    return dst
+
+
+def call_first(target, names, e):
+    '''
+        Calls the first attribute of target found among names with e and
+        returns its result, or None if there is none.
+    '''
+    for name in names:
+        callback = getattr(target, name, None)
+        if callback is not None:
+            return callback(e)
+
+
+def call_first_global(callbacks, obj, names, e):
+    '''
+        Same as call_first, looking up every name in the callbacks dictionary
+        before the attributes of obj.
+    '''
+    for name in names:
+        if name in callbacks:
+            return callbacks[name](e)
+        callback = getattr(obj, name, None)
+        if callback is not None:
+            return callback(e)
@@ -0,0 +1,268 @@
+/*
+ *
+ * fysom - pYthOn Finite State Machine - this is a port of Jake
+ *         Gordon's javascript-state-machine to python
+ *         https://github.com/jakesgordon/javascript-state-machine
+ *
+ * Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+ *                                        and other contributors
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining
+ * a copy of this software and associated documentation files (the
+ * "Software"), to deal in the Software without restriction, including
+ * without limitation the rights to use, copy, modify, merge, publish,
+ * distribute, sublicense, and/or sell copies of the Software, and to
+ * permit persons to whom the Software is furnished to do so, subject to
+ * the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be
+ * included in all copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+ * EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+ * MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+ * IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+ * CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+ * TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+ * SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+ */
+
+/*
+ * C implementation of the event dispatch primitives of fysom/_core.py.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#if PY_VERSION_HEX < 0x03070000
+#error "fysom._speedups requires Python 3.7 or later"
+#endif
+
+#if PY_VERSION_HEX < 0x03090000
+#define PyObject_CallOneArg(callable, arg) \
+    PyObject_CallFunctionObjArgs((callable), (arg), NULL)
+#endif
+
+static PyObject *wildcard;
+static PyObject *same_dst;
+
+/*
+ * Gets an attribute, returning NULL without an exception if it is missing.
+ * Callbacks are usually missing, so this avoids creating an AttributeError
+ * for every name probed where the interpreter allows it.
+ */
+static PyObject *
+get_optional_attr(PyObject *target, PyObject *name)
+{
+    PyObject *value;
+#if PY_VERSION_HEX >= 0x030D0000
+    if (PyObject_GetOptionalAttr(target, name, &value) < 0)
+        return NULL;
+#elif PY_VERSION_HEX >= 0x03070000
+    if (_PyObject_LookupAttr(target, name, &value) < 0)
+        return NULL;
+#else
+    value = PyObject_GetAttr(target, name);
+    if (value == NULL && PyErr_ExceptionMatches(PyExc_AttributeError))
+        PyErr_Clear();
+#endif
+    return value;
+}
+
+static int
+check_nargs(const char *name, Py_ssize_t nargs, Py_ssize_t expected)
+{
+    if (nargs == expected)
+        return 1;
+    PyErr_Format(PyExc_TypeError, "%s() takes exactly %zd arguments (%zd given)",
+                 name, expected, nargs);
+    return 0;
+}
+
+/* Gets a mapping item, returning NULL without an exception if it is missing. */
+static PyObject *
+get_optional_item(PyObject *mapping, PyObject *key)
+{
+    PyObject *value;
+
+    if (PyDict_CheckExact(mapping)) {
+        value = PyDict_GetItemWithError(mapping, key);
+        Py_XINCREF(value);
+        return value;
+    }
+    value = PyObject_GetItem(mapping, key);
+    if (value == NULL && PyErr_ExceptionMatches(PyExc_KeyError))
+        PyErr_Clear();
+    return value;
+}
+
+static PyObject *
+lookup(PyObject *self, PyObject *const *args, Py_ssize_t nargs)
+{
+    PyObject *tmap, *event, *src, *dsts, *dst;
+    int truth;
+
+    if (!check_nargs("lookup", nargs, 3))
+        return NULL;
+    tmap = args[0];
+    event = args[1];
+    src = args[2];
+    if (PyDict_CheckExact(tmap)) {
+        dsts = PyDict_GetItemWithError(tmap, event);
+        if (dsts == NULL) {
+            if (PyErr_Occurred())
+                return NULL;
+            Py_RETURN_NONE;
+        }
+        Py_INCREF(dsts);
+    }
+    else {
+        dsts = PyObject_CallMethod(tmap, "get", "O", event);
+        if (dsts == NULL)
+            return NULL;
+        if (dsts == Py_None)
+            return dsts;
+    }
+    dst = get_optional_item(dsts, src);
+    if (dst == NULL && !PyErr_Occurred())
+        dst = get_optional_item(dsts, wildcard);
+    Py_DECREF(dsts);
+    if (dst == NULL) {
+        if (PyErr_Occurred())
+            return NULL;
+        Py_RETURN_NONE;
+    }
+    truth = PyObject_IsTrue(dst);
+    if (truth <= 0) {
+        Py_DECREF(dst);
+        if (truth < 0)
+            return NULL;
+        Py_RETURN_NONE;
+    }
+    truth = PyObject_RichCompareBool(dst, same_dst, Py_EQ);
+    if (truth != 0) {
+        Py_DECREF(dst);
+        if (truth < 0)
+            return NULL;
+        Py_INCREF(src);
+        return src;
+    }
+    return dst;
+}
+
+static PyObject *
+call_first(PyObject *self, PyObject *const *args, Py_ssize_t nargs)
+{
+    PyObject *target, *names, *e, *seq, *callback, *result;
+    Py_ssize_t i, n;
+
+    if (!check_nargs("call_first", nargs, 3))
+        return NULL;
+    target = args[0];
+    names = args[1];
+    e = args[2];
+    seq = PySequence_Fast(names, "names must be a sequence");
+    if (seq == NULL)
+        return NULL;
+    n = PySequence_Fast_GET_SIZE(seq);
+    for (i = 0; i < n; i++) {
+        callback = get_optional_attr(target, PySequence_Fast_GET_ITEM(seq, i));
+        if (callback == NULL) {
+            if (PyErr_Occurred()) {
+                Py_DECREF(seq);
+                return NULL;
+            }
+            continue;
+        }
+        if (callback == Py_None) {
+            Py_DECREF(callback);
+            continue;
+        }
+        Py_DECREF(seq);
+        result = PyObject_CallOneArg(callback, e);
+        Py_DECREF(callback);
+        return result;
+    }
+    Py_DECREF(seq);
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+call_first_global(PyObject *self, PyObject *const *args, Py_ssize_t nargs)
+{
+    PyObject *callbacks, *obj, *names, *e, *seq, *name, *callback, *result;
+    Py_ssize_t i, n;
+    int found;
+
+    if (!check_nargs("call_first_global", nargs, 4))
+        return NULL;
+    callbacks = args[0];
+    obj = args[1];
+    names = args[2];
+    e = args[3];
+    seq = PySequence_Fast(names, "names must be a sequence");
+    if (seq == NULL)
+        return NULL;
+    n = PySequence_Fast_GET_SIZE(seq);
+    for (i = 0; i < n; i++) {
+        name = PySequence_Fast_GET_ITEM(seq, i);
+        found = PySequence_Contains(callbacks, name);
+        if (found < 0) {
+            Py_DECREF(seq);
+            return NULL;
+        }
+        if (found)
+            callback = PyObject_GetItem(callbacks, name);
+        else
+            callback = get_optional_attr(obj, name);
+        if (callback == NULL) {
+            if (PyErr_Occurred()) {
+                Py_DECREF(seq);
+                return NULL;
+            }
+            continue;
+        }
+        if (!found && callback == Py_None) {
+            Py_DECREF(callback);
+            continue;
+        }
+        Py_DECREF(seq);
+        result = PyObject_CallOneArg(callback, e);
+        Py_DECREF(callback);
+        return result;
+    }
+    Py_DECREF(seq);
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef speedups_methods[] = {
+    {"lookup", (PyCFunction)(void(*)(void))lookup, METH_FASTCALL,
+     "Returns the destination of event from src, or None."},
+    {"call_first", (PyCFunction)(void(*)(void))call_first, METH_FASTCALL,
+     "Calls the first attribute of target found among names with e."},
+    {"call_first_global", (PyCFunction)(void(*)(void))call_first_global, METH_FASTCALL,
+     "Same as call_first, looking up names in callbacks first."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef speedups_module = {
+    PyModuleDef_HEAD_INIT,
+    "fysom._speedups",
+    "C implementation of the event dispatch primitives of fysom._core.",
+    -1,
+    speedups_methods,
+    NULL,
+    NULL,
+    NULL,
+    NULL
+};
+
+PyMODINIT_FUNC
+PyInit__speedups(void)
+{
+    wildcard = PyUnicode_InternFromString("*");
+    same_dst = PyUnicode_InternFromString("=");
+    if (wildcard == NULL || same_dst == NULL)
+        return NULL;
+    return PyModule_Create(&speedups_module);
+}
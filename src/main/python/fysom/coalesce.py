@@ -0,0 +1,184 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Coalescing front-end collapsing bursts of redundant events before they
+    reach the machines.
+'''
+
+import time
+
+try:
+    _monotonic = time.monotonic
+except AttributeError:  # pragma: no cover
+    _monotonic = time.time
+
+
+def merge_last(old, new):
+    '''
+        Default merge function: keyword arguments of the latest event win.
+    '''
+    merged = dict(old)
+    merged.update(new)
+    return merged
+
+
+class Coalescer(object):
+
+    '''
+        Queues events per machine and fires each distinct (machine, event)
+        pair once per drain cycle or time window.
+
+        Posting an event that is the last one queued for the same machine
+        does not queue it again: its keyword arguments are merged into the
+        pending one and its positional arguments replace the pending ones.
+        An event posted after other events of the machine is queued, so that
+        the machine sees the same sequence of events as without coalescing.
+    '''
+
+    def __init__(self, gsm=None, events=None, merge=merge_last, window=None,
+                 strict=False, clock=None):
+        '''
+        Construct a coalescer.
+
+        Arguments:
+
+            gsm         a FysomGlobal: posted targets are then the objects it
+                        handles. Otherwise targets are Fysom instances or
+                        FysomGlobalMixin objects.
+
+            events      names of the events that may be coalesced, all events
+                        by default. Other events are queued as posted.
+
+            merge       function (pending kwargs, new kwargs) -> kwargs, or a
+                        dictionary mapping event names to such functions
+
+            window      in seconds, used by flush() to only fire the events
+                        that have been pending for at least that long
+
+            strict      fire events with trigger() rather than try_trigger(),
+                        so that inappropriate and canceled events raise
+
+            clock       function returning the current time in seconds
+        '''
+        self.gsm = gsm
+        self.events = None if events is None else frozenset(events)
+        self.merge = merge
+        self.window = window
+        self.strict = strict
+        self._clock = clock or _monotonic
+        self._queue = []
+        self._tails = {}  # id(target) -> last queued entry of target
+        self.posted = 0
+        self.fired = 0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def post(self, target, event, *args, **kwargs):
+        '''
+            Queues an event for target, coalescing it with a pending one.
+            Returns True if it was coalesced.
+        '''
+        self.posted += 1
+        tail = self._tails.get(id(target))
+        if tail is not None and tail[1] == event and (
+                self.events is None or event in self.events):
+            merge = self.merge
+            if isinstance(merge, dict):
+                merge = merge.get(event, merge_last)
+            tail[2] = args
+            tail[3] = merge(tail[3], kwargs)
+            return True
+        entry = [target, event, args, kwargs, self._clock()]
+        self._tails[id(target)] = entry
+        self._queue.append(entry)
+        return False
+
+    def drain(self):
+        '''
+            Fires every queued event. Events posted by callbacks during the
+            drain are queued for the next cycle. Returns a list of
+            (target, event, result) tuples, result being a TriggerResult
+            code, or None when strict.
+
+            When an event raises, the events queued after it stay queued.
+        '''
+        queue, self._queue = self._queue, []
+        self._tails = {}
+        return self._fire_all(queue)
+
+    def flush(self):
+        '''
+            Fires the queued events that have been pending for at least
+            window seconds, keeping the others queued.
+        '''
+        if self.window is None:
+            return self.drain()
+        deadline = self._clock() - self.window
+        queue = self._queue
+        count = 0
+        while count < len(queue) and queue[count][4] <= deadline:
+            count += 1
+        due, self._queue = queue[:count], queue[count:]
+        tails = self._tails
+        for entry in due:
+            if tails.get(id(entry[0])) is entry:
+                del tails[id(entry[0])]
+        return self._fire_all(due)
+
+    def _fire_all(self, entries):
+        results = []
+        position = 0
+        try:
+            while position < len(entries):
+                entry = entries[position]
+                position += 1
+                results.append(self._fire(entry))
+        finally:
+            if position < len(entries):
+                self._requeue(entries[position:])
+        return results
+
+    def _requeue(self, entries):
+        # Put back the entries not fired ahead of those posted meanwhile.
+        self._queue[:0] = entries
+        self._tails = dict((id(entry[0]), entry) for entry in self._queue)
+
+    def _fire(self, entry):
+        target, event, args, kwargs = entry[:4]
+        self.fired += 1
+        if self.gsm is not None:
+            args = (target, event) + args
+            trigger = self.gsm.trigger if self.strict else self.gsm.try_trigger
+        else:
+            args = (event,) + args
+            trigger = target.trigger if self.strict else target.try_trigger
+        return target, event, trigger(*args, **kwargs)
@@ -0,0 +1,393 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Generates specialized machine classes from a Fysom specification.
+
+    Every event becomes a method with inline transitions for its source
+    states and direct calls to the declared callbacks, so firing an event
+    does no map lookup nor callback probing:
+
+    >>> Light = build_class({'initial': 'green',
+    ...                      'events': [('warn', 'green', 'yellow')]},
+    ...                     class_name='Light', callback_names=['onyellow'])
+    >>> class MyLight(Light):
+    ...     def onyellow(self, e):
+    ...         print('yellow')
+    >>> light = MyLight()
+    >>> light.warn()
+    yellow
+
+    Callbacks are fixed when the class is generated: they are the keys of
+    the 'callbacks' of the specification plus the given callback_names, and
+    are implemented either by methods of a subclass or by callbacks passed
+    to the constructor. Unlike Fysom, adding an attribute for another
+    callback name on an instance has no effect.
+'''
+
+import keyword
+import re
+
+from fysom import (FysomDefinition, FysomError, Canceled, TriggerResult,
+                   WILDCARD, SAME_DST, _weak_callback)
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class GeneratedEvent(object):
+
+    '''
+        Event object passed to the callbacks of generated machines.
+    '''
+
+    def __init__(self, fsm, event, src, dst, args, kwargs):
+        self.fsm, self.event, self.src, self.dst = fsm, event, src, dst
+        self.args = args
+        self.__dict__.update(kwargs)
+
+
+class GeneratedMachine(object):
+
+    '''
+        Base class of the generated machines, holding the methods that do
+        not depend on the specification.
+    '''
+
+    _definition = None
+    _callback_names = ()
+
+    def __init__(self, callbacks=None, weak_callbacks=True):
+        callbacks = dict(self._definition.callbacks, **(callbacks or {}))
+        for name, callback in callbacks.items():
+            if name not in self._callback_names:
+                raise FysomError(
+                    'callback %s was not declared when generating %s'
+                    % (name, type(self).__name__))
+            setattr(self, name, _weak_callback(callback, weak_callbacks))
+        self.current = 'none'
+        init = self._definition.initial
+        if init and 'defer' not in init:
+            getattr(self, init['event'])()
+
+    def isstate(self, state):
+        return self.current == state
+
+    is_state = isstate
+
+    def can(self, event):
+        dsts = self._definition.map.get(event)
+        return (dsts is not None and
+                (self.current in dsts or WILDCARD in dsts) and
+                not hasattr(self, 'transition'))
+
+    def cannot(self, event):
+        return not self.can(event)
+
+    def is_finished(self):
+        final = self._definition.final
+        return final and (self.current == final)
+
+    def trigger(self, event, *args, **kwargs):
+        if event not in self._definition.map:
+            raise FysomError(
+                "There isn't any event registered as %s" % event)
+        return getattr(self, event)(*args, **kwargs)
+
+    def try_trigger(self, event, *args, **kwargs):
+        if not self.can(event):
+            return TriggerResult.INVALID
+        try:
+            getattr(self, event)(*args, **kwargs)
+        except Canceled:
+            return TriggerResult.CANCELED
+        if hasattr(self, 'transition'):
+            return TriggerResult.PENDING
+        return TriggerResult.OK
+
+    fire_if_possible = try_trigger
+
+    def _callback(self, names):
+        '''
+            Returns the first declared callback among names, if any.
+        '''
+        for name in names:
+            if name in self._callback_names:
+                return getattr(self, name)
+
+    def _fire_generic(self, e):
+        '''
+            Transition for a source state only known at runtime, i.e. a
+            wildcard source.
+        '''
+        src, dst = e.src, e.dst
+        before = self._callback(('onbefore' + e.event,
+                                 'on_before_' + e.event))
+        if before is not None and before(e) is False:
+            raise Canceled(
+                "Cannot trigger event {0} because the onbefore{0} handler "
+                "returns False".format(e.event))
+        after = self._callback(('onafter' + e.event, 'on' + e.event,
+                                'on_after_' + e.event, 'on_' + e.event))
+        if src == dst:
+            reenter = self._callback(('onreenter' + dst, 'on_reenter_' + dst))
+            if reenter is not None:
+                reenter(e)
+            if after is not None:
+                after(e)
+            return
+        exits, enters = self._definition.path(src, dst)
+
+        def _tran():
+            delattr(self, 'transition')
+            self.current = dst
+            for state in enters:
+                enter = self._callback(('onenter' + state, 'on' + state,
+                                        'on_enter_' + state, 'on_' + state))
+                if enter is not None:
+                    enter(e)
+            change = self._callback(('onchangestate', 'on_change_state'))
+            if change is not None:
+                change(e)
+            if after is not None:
+                after(e)
+        self.transition = _tran
+        pending = False
+        for state in exits:
+            leave = self._callback(('onleave' + state, 'on_leave_' + state))
+            if leave is not None and leave(e) is False:
+                pending = True
+        if not pending:
+            self.transition()
+
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _is_identifier(name):
+    return bool(_IDENTIFIER.match(name)) and not keyword.iskeyword(name)
+
+
+def _attr(name):
+    '''
+        Returns the expression reading the attribute name of self.
+    '''
+    if _is_identifier(name):
+        return 'self.' + name
+    return 'getattr(self, %r)' % name
+
+
+class _Writer(object):
+
+    def __init__(self):
+        self.lines = []
+        self.helpers = []
+        self.footer = []
+
+    def __call__(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+
+def generate_source(cfg={}, class_name='GeneratedFysom', callback_names=(),
+                    **kwargs):
+    '''
+    Returns the Python source of a module defining the class generated for
+    the given specification, taking the same arguments as Fysom. The module
+    expects a compiled FysomDefinition of the specification to be bound to
+    the name _definition before it is executed; build_class takes care of
+    that.
+    '''
+    definition = cfg if isinstance(cfg, FysomDefinition) else \
+        FysomDefinition(cfg, **kwargs)
+    return _generate(definition, class_name, callback_names)
+
+
+def build_class(cfg={}, class_name='GeneratedFysom', callback_names=(),
+                **kwargs):
+    '''
+    Generates and executes the class for the given specification, taking
+    the same arguments as Fysom, plus:
+
+        class_name      name of the generated class
+
+        callback_names  names of callbacks implemented by subclasses or
+                        passed to the constructor, in addition to the ones
+                        of the specification
+    '''
+    definition = cfg if isinstance(cfg, FysomDefinition) else \
+        FysomDefinition(cfg, **kwargs)
+    source = _generate(definition, class_name, callback_names)
+    namespace = {'_definition': definition}
+    code = compile(source, '<fysom.codegen %s>' % class_name, 'exec')
+    exec(code, namespace)
+    cls = namespace[class_name]
+    cls.__source__ = source
+    return cls
+
+
+def _generate(definition, class_name, callback_names):
+    if definition.timeouts:
+        raise FysomError('timed events are not supported by generated classes')
+    for e in definition.events:
+        if e.get('cond'):
+            raise FysomError(
+                'conditions are not supported by generated classes')
+    names = set(definition.callbacks) | set(callback_names)
+
+    def first(candidates):
+        for name in candidates:
+            if name in names:
+                return name
+
+    w = _Writer()
+    w(0, '# Generated by fysom.codegen, do not edit.')
+    w(0, 'import functools')
+    w(0, 'from fysom import FysomError, Canceled')
+    w(0, 'from fysom.codegen import GeneratedMachine, GeneratedEvent, _noop')
+    w(0, '')
+    w(0, '')
+    w(0, 'class %s(GeneratedMachine):' % class_name)
+    w(0, '')
+    w(1, '_definition = _definition')
+    w(1, '_callback_names = frozenset(%r)' % (sorted(names),))
+    for name in sorted(names):
+        if _is_identifier(name):
+            w(1, '%s = staticmethod(_noop)' % name)
+        else:
+            w.footer.append('setattr(%s, %r, staticmethod(_noop))'
+                            % (class_name, name))
+
+    counter = [0]
+    for event in sorted(definition.map):
+        dsts = definition.map[event]
+        before = first(['onbefore' + event, 'on_before_' + event])
+        after = first(['onafter' + event, 'on' + event,
+                       'on_after_' + event, 'on_' + event])
+        method = event
+        if not _is_identifier(event):
+            counter[0] += 1
+            method = '_event_%d' % counter[0]
+            w.footer.append('setattr(%s, %r, %s.%s)'
+                            % (class_name, event, class_name, method))
+        w(0, '')
+        w(1, 'def %s(self, *args, **kwargs):' % method)
+        w(2, "if hasattr(self, 'transition'):")
+        w(3, 'raise FysomError(%r)' % (
+            'event %s inappropriate because previous transition did not '
+            'complete' % event))
+        w(2, 'src = self.current')
+        branch = 'if'
+        for src in sorted(s for s in dsts if s != WILDCARD):
+            dst = dsts[src]
+            dst = src if dst == SAME_DST else dst
+            w(2, '%s src == %r:' % (branch, src))
+            branch = 'elif'
+            _branch(w, definition, event, src, dst, before, after, first,
+                    counter)
+        indent = 2
+        if branch == 'elif':
+            w(2, 'else:')
+            indent = 3
+        if WILDCARD in dsts:
+            dst = dsts[WILDCARD]
+            w(indent, 'self._fire_generic(GeneratedEvent(self, %r, src, %s, '
+                      'args, kwargs))' % (event, 'src' if dst == SAME_DST
+                                          else repr(dst)))
+        else:
+            w(indent, 'raise FysomError(%r %% src)' % (
+                'event %s inappropriate in current state %%s'
+                % event.replace('%', '%%')))
+
+    lines = w.lines + w.helpers
+    if w.footer:
+        lines += ['', ''] + w.footer
+    return '\n'.join(lines) + '\n'
+
+
+def _branch(w, definition, event, src, dst, before, after, first, counter):
+    '''
+        Writes the inline transition of event from src to dst.
+    '''
+    w(3, 'e = GeneratedEvent(self, %r, %r, %r, args, kwargs)'
+         % (event, src, dst))
+    if before:
+        w(3, 'if %s(e) is False:' % _attr(before))
+        w(4, 'raise Canceled(%r)' % (
+            'Cannot trigger event {0} because the onbefore{0} handler '
+            'returns False'.format(event)))
+    if src == dst:
+        reenter = first(['onreenter' + dst, 'on_reenter_' + dst])
+        if reenter:
+            w(3, '%s(e)' % _attr(reenter))
+        if after:
+            w(3, '%s(e)' % _attr(after))
+        return
+
+    exits, enters = definition.path(src, dst)
+    leaves = [name for name in
+              (first(['onleave' + s, 'on_leave_' + s]) for s in exits)
+              if name]
+    body = ['self.current = %r' % dst]
+    for state in enters:
+        enter = first(['onenter' + state, 'on' + state,
+                       'on_enter_' + state, 'on_' + state])
+        if enter:
+            body.append('%s(e)' % _attr(enter))
+    change = first(['onchangestate', 'on_change_state'])
+    if change:
+        body.append('%s(e)' % _attr(change))
+    if after:
+        body.append('%s(e)' % _attr(after))
+
+    if not leaves:
+        for line in body:
+            w(3, line)
+        return
+
+    # Leave callbacks may defer the transition, which then runs from the
+    # transition attribute.
+    counter[0] += 1
+    helper = '_transition_%d' % counter[0]
+    w.helpers.append('')
+    w.helpers.append('    def %s(self, e):' % helper)
+    w.helpers.append("        delattr(self, 'transition')")
+    w.helpers.extend('        ' + line for line in body)
+    w(3, 'self.transition = functools.partial(self.%s, e)' % helper)
+    if len(leaves) == 1:
+        w(3, 'if %s(e) is not False:' % _attr(leaves[0]))
+        w(4, 'self.transition()')
+    else:
+        w(3, 'pending = False')
+        for leave in leaves:
+            w(3, 'if %s(e) is False:' % _attr(leave))
+            w(4, 'pending = True')
+        w(3, 'if not pending:')
+        w(4, 'self.transition()')
@@ -0,0 +1,153 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Fixed-size transition history of a machine.
+'''
+
+import threading
+import time
+from array import array
+
+# State and event names are stored as codes into this table, shared by all
+# histories so that the codes of the same name are the same everywhere.
+_names = []
+_codes = {}
+_lock = threading.Lock()
+
+
+def code(name):
+    '''
+        Returns the code of a state or event name, allocating it if needed.
+        Allocation is serialized so that concurrent threads agree on codes.
+    '''
+    try:
+        return _codes[name]
+    except KeyError:
+        with _lock:
+            value = _codes.get(name)
+            if value is None:
+                # Publish the code only once its name is in the table.
+                _names.append(name)
+                value = _codes[name] = len(_names) - 1
+            return value
+
+
+def history_of(machine, obj=None):
+    '''
+        Returns the History of a Fysom machine, or of the object obj of a
+        FysomGlobal machine, or None if it records none. Unlike the history
+        attributes, it cannot be shadowed by an event named history.
+    '''
+    if obj is not None:
+        return getattr(obj, '_fysom_history', None)
+    return machine._history
+
+
+def name(value):
+    '''
+        Returns the state or event name of a code.
+    '''
+    return _names[value]
+
+
+class History(object):
+
+    '''
+        Ring buffer of the last size transitions of a machine, as (event,
+        src, dst, timestamp) entries. The arrays holding them are allocated
+        once; recording a transition stores three codes and a timestamp.
+    '''
+
+    def __init__(self, size, clock=time.time):
+        if size < 1:
+            raise ValueError('history size must be positive')
+        self.size = size
+        self._clock = clock
+        self._events = array('l', [0]) * size
+        self._srcs = array('l', [0]) * size
+        self._dsts = array('l', [0]) * size
+        self._times = array('d', [0.0]) * size
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    @property
+    def dropped(self):
+        '''
+            Number of transitions recorded but overwritten since.
+        '''
+        return max(self.count - self.size, 0)
+
+    def record(self, event, src, dst):
+        index = self.count % self.size
+        self._events[index] = code(event)
+        self._srcs[index] = code(src)
+        self._dsts[index] = code(dst)
+        self._times[index] = self._clock()
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def _ordered(self, values):
+        if self.count <= self.size:
+            return values[:self.count]
+        split = self.count % self.size
+        return values[split:] + values[:split]
+
+    def __iter__(self):
+        return iter(self.entries())
+
+    def entries(self):
+        '''
+            Returns the recorded (event, src, dst, timestamp) tuples, oldest
+            first.
+        '''
+        names = _names
+        return [(names[event], names[src], names[dst], timestamp)
+                for event, src, dst, timestamp in zip(
+                    self._ordered(self._events), self._ordered(self._srcs),
+                    self._ordered(self._dsts), self._ordered(self._times))]
+
+    def export(self):
+        '''
+            Returns the history in bulk, oldest first, as a dictionary of
+            arrays: 'event', 'src' and 'dst' codes, 'timestamp', and the
+            'names' list mapping codes to names.
+        '''
+        return {
+            'event': self._ordered(self._events),
+            'src': self._ordered(self._srcs),
+            'dst': self._ordered(self._dsts),
+            'timestamp': self._ordered(self._times),
+            'names': list(_names),
+        }
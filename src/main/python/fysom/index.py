@@ -0,0 +1,90 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Index of the objects of a FysomGlobal machine by state.
+'''
+
+import weakref
+
+
+class StateIndex(object):
+
+    '''
+        Weak sets of the objects in each state. Objects must be hashable
+        and weakly referenceable; they leave the index when collected.
+    '''
+
+    def __init__(self):
+        self._members = {}
+
+    def add(self, obj, state):
+        members = self._members.get(state)
+        if members is None:
+            members = self._members[state] = weakref.WeakSet()
+        members.add(obj)
+
+    def discard(self, obj, state):
+        members = self._members.get(state)
+        if members is not None:
+            members.discard(obj)
+
+    def move(self, obj, src, dst):
+        self.discard(obj, src)
+        self.add(obj, dst)
+
+    def count(self, state):
+        '''
+            Returns the number of live objects in state.
+        '''
+        members = self._members.get(state)
+        return 0 if members is None else len(members)
+
+    def counts(self):
+        '''
+            Returns a dictionary of the number of objects per state.
+        '''
+        return dict((state, len(members))
+                    for state, members in self._members.items()
+                    if len(members))
+
+    def members(self, state):
+        '''
+            Returns a list of the objects in state, safe to iterate while
+            their state changes.
+        '''
+        members = self._members.get(state)
+        return [] if members is None else list(members)
+
+    def __contains__(self, obj):
+        return any(obj in members for members in self._members.values())
+
+    def clear(self):
+        self._members.clear()
@@ -0,0 +1,189 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Loading of machine definitions from JSON or YAML files, with an on-disk
+    cache of the compiled definitions.
+'''
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+
+from fysom import FysomDefinition, FysomError, __version__
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover
+    yaml = None
+
+# Part of the cache keys, to be bumped when FysomDefinition changes shape.
+CACHE_FORMAT = 1
+
+YAML_EXTENSIONS = ('.yaml', '.yml')
+
+
+def parse_config(data, format='json', source='<string>'):
+    '''
+        Parses a machine configuration, in the shape Fysom takes, from JSON
+        or YAML text and checks its structure.
+    '''
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    if format == 'json':
+        try:
+            cfg = json.loads(data)
+        except ValueError as error:
+            raise FysomError('%s: invalid JSON: %s' % (source, error))
+    elif format == 'yaml':
+        if yaml is None:
+            raise FysomError('%s: loading YAML requires PyYAML' % source)
+        try:
+            cfg = yaml.safe_load(data)
+        except yaml.YAMLError as error:
+            raise FysomError('%s: invalid YAML: %s' % (source, error))
+    else:
+        raise FysomError('unknown definition format %r' % (format,))
+    check_config(cfg, source)
+    return cfg
+
+
+def check_config(cfg, source='<config>'):
+    '''
+        Raises FysomError if cfg does not have the structure of a machine
+        configuration.
+    '''
+    if not isinstance(cfg, dict):
+        raise FysomError('%s: a definition must be a mapping' % source)
+    events = cfg.get('events', [])
+    if not isinstance(events, list):
+        raise FysomError('%s: events must be a list' % source)
+    for position, event in enumerate(events):
+        if isinstance(event, dict):
+            missing = [key for key in ('name', 'dst') if key not in event]
+            if missing:
+                raise FysomError('%s: event %d has no %s' % (
+                    source, position, ' nor '.join(missing)))
+        elif not isinstance(event, list) or len(event) != 3:
+            raise FysomError(
+                '%s: event %d must be a mapping or a [name, src, dst] list'
+                % (source, position))
+    for key in ('callbacks', 'substates'):
+        if not isinstance(cfg.get(key, {}), dict):
+            raise FysomError('%s: %s must be a mapping' % (source, key))
+
+
+def _format(path):
+    if os.path.splitext(path)[1].lower() in YAML_EXTENSIONS:
+        return 'yaml'
+    return 'json'
+
+
+def cache_key(data):
+    '''
+        Returns the cache key of the content of a definition file.
+    '''
+    digest = hashlib.sha256()
+    digest.update(('%s|%s|%d.%d|' % (
+        CACHE_FORMAT, __version__, sys.version_info[0],
+        sys.version_info[1])).encode('utf-8'))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+# os.rename does not overwrite existing files on Windows, os.replace does
+# (Python 3.3 and later).
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _write_atomically(path, payload):
+    directory = os.path.dirname(path)
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as out:
+            out.write(payload)
+        try:
+            _replace(temporary, path)
+        except OSError:
+            # Another process wrote the entry first. Entries are keyed by
+            # content, so its copy is as good as this one.
+            if not os.path.exists(path):
+                raise
+            os.unlink(temporary)
+    except Exception:
+        os.unlink(temporary)
+        raise
+
+
+def load_definition(path, cache_dir=None):
+    '''
+        Returns the FysomDefinition of a JSON or YAML (.yaml, .yml) file.
+
+        With cache_dir, compiled definitions are pickled there, keyed by a
+        hash of the file content, and loaded from the cache on the next
+        calls instead of being parsed and compiled again. The cache
+        directory must only be writable by trusted users, since loading a
+        pickle can run code.
+    '''
+    with open(path, 'rb') as source:
+        data = source.read()
+    cached = None
+    if cache_dir is not None:
+        cached = os.path.join(cache_dir, cache_key(data) + '.pickle')
+        try:
+            with open(cached, 'rb') as source:
+                return pickle.load(source)
+        except Exception:  # missing or unreadable entry: rebuild it
+            pass
+    definition = FysomDefinition(parse_config(data, _format(path), path))
+    if cached is not None:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        _write_atomically(cached, pickle.dumps(
+            definition, pickle.HIGHEST_PROTOCOL))
+    return definition
+
+
+def load_directory(directory, cache_dir=None, patterns=('*.json', '*.yaml',
+                                                        '*.yml')):
+    '''
+        Returns a dictionary mapping the base names of the definition files
+        of a directory to their FysomDefinition, see load_definition.
+    '''
+    definitions = {}
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.join(directory, pattern))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            definitions[name] = load_definition(path, cache_dir)
+    return definitions
@@ -0,0 +1,157 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Live counters aggregated over all the objects of a FysomGlobal machine.
+'''
+
+import threading
+
+
+class GlobalMetrics(object):
+
+    '''
+        Counts, incrementally on each event of a global machine:
+
+            population      objects per state, from the transitions seen
+                            and the states of FysomGlobalMixin objects
+                            restored or assigned: +1 on entering a state,
+                            -1 on leaving it, the 'none' state of
+                            uninitialized objects excluded
+
+            transitions     completed transitions (and reentries) per event
+
+            canceled        events canceled by a condition or a before
+                            callback, per event
+
+            conditions      cancellations per failed condition, named after
+                            the callback name or the function name
+
+            invalid         events fired in a state they do not apply to
+
+        Each thread increments its own counters without locking; reading
+        merges the counters of all threads.
+    '''
+
+    KINDS = ('population', 'transitions', 'canceled', 'conditions',
+             'invalid')
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = dict((kind, {}) for kind in self.KINDS)
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def transition(self, event, src, dst):
+        shard = self._shard()
+        counts = shard['transitions']
+        counts[event] = counts.get(event, 0) + 1
+        if src != dst:
+            self._move(shard['population'], src, dst)
+
+    def move(self, src, dst):
+        '''
+            Moves an object between states without an event, e.g. when its
+            current state is assigned.
+        '''
+        if src != dst:
+            self._move(self._shard()['population'], src, dst)
+
+    @staticmethod
+    def _move(population, src, dst):
+        if src != 'none':
+            population[src] = population.get(src, 0) - 1
+        if dst != 'none':
+            population[dst] = population.get(dst, 0) + 1
+
+    def cancel(self, event, condition=None):
+        shard = self._shard()
+        counts = shard['canceled']
+        counts[event] = counts.get(event, 0) + 1
+        if condition is not None:
+            if callable(condition):
+                condition = getattr(condition, '__name__', repr(condition))
+            counts = shard['conditions']
+            counts[condition] = counts.get(condition, 0) + 1
+
+    def invalid(self, event):
+        counts = self._shard()['invalid']
+        counts[event] = counts.get(event, 0) + 1
+
+    def adjust(self, state, delta):
+        '''
+            Corrects the population of state, e.g. for objects loaded in or
+            removed from the system without a transition.
+        '''
+        population = self._shard()['population']
+        population[state] = population.get(state, 0) + delta
+
+    def read(self, kind):
+        '''
+            Returns the merged counters of a kind, as a dictionary.
+        '''
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for key, count in list(shard[kind].items()):
+                merged[key] = merged.get(key, 0) + count
+        return merged
+
+    def population(self, state=None):
+        '''
+            Returns the number of objects in state, or a dictionary of the
+            populations of all states.
+        '''
+        population = self.read('population')
+        if state is None:
+            return population
+        return population.get(state, 0)
+
+    def snapshot(self):
+        '''
+            Returns a dictionary of the merged counters of every kind.
+        '''
+        return dict((kind, self.read(kind)) for kind in self.KINDS)
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                for counts in shard.values():
+                    counts.clear()
@@ -0,0 +1,223 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Pool of the machines of the active entities, materialized on demand from
+    a state store and evicted back to it.
+'''
+
+import time
+from collections import OrderedDict
+
+try:
+    _monotonic = time.monotonic
+except AttributeError:  # pragma: no cover
+    _monotonic = time.time
+
+
+class MachinePool(object):
+
+    '''
+        Keeps the machines of the most recently used keys in memory, up to
+        capacity machines and for at most ttl seconds since their last use.
+        Other machines live in the store as their current state only.
+
+        A missing machine is built by factory(key), a Fysom instance or a
+        FysomGlobalMixin object in its initial state, and moved to the state
+        saved for its key, if any, by setting its current attribute: no
+        callbacks run. Evicted machines whose state changed since it was
+        loaded or last flushed are saved back to the store.
+    '''
+
+    def __init__(self, factory, store, capacity=10000, ttl=None, clock=None):
+        '''
+        Construct a machine pool.
+
+        Arguments:
+
+            factory     function key -> new machine
+
+            store       a fysom.stores.StateStore keeping the states of the
+                        machines that are not in the pool
+
+            capacity    maximum number of machines kept in the pool
+
+            ttl         seconds after which an unused machine is evicted,
+                        never by default
+
+            clock       function returning the current time in seconds
+        '''
+        self.factory = factory
+        self.store = store
+        self.capacity = capacity
+        self.ttl = ttl
+        self._clock = clock or _monotonic
+        # key -> [machine, saved state, last use], least recently used first
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.writes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def get(self, key):
+        '''
+            Returns the machine of key, loading it if it is not in the pool.
+        '''
+        now = self._clock()
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            if self.ttl is None or now - entry[2] < self.ttl:
+                self.hits += 1
+                entry[2] = now
+                self._entries[key] = entry
+                return entry[0]
+            self.expirations += 1
+            self._save(key, entry)
+        self.misses += 1
+        return self._load(key, self.store.load(key), now)
+
+    def trigger(self, key, event, *args, **kwargs):
+        '''
+            Triggers event on the machine of key.
+        '''
+        return self.get(key).trigger(event, *args, **kwargs)
+
+    def try_trigger(self, key, event, *args, **kwargs):
+        '''
+            Non-raising counterpart of trigger().
+        '''
+        return self.get(key).try_trigger(event, *args, **kwargs)
+
+    def preload(self, keys):
+        '''
+            Loads the machines of keys that are not in the pool with a single
+            store.load_many call.
+        '''
+        missing = [key for key in keys if key not in self._entries]
+        states = self.store.load_many(missing)
+        now = self._clock()
+        for key in missing:
+            self.misses += 1
+            self._load(key, states.get(key), now)
+
+    def _load(self, key, state, now):
+        machine = self.factory(key)
+        if state is not None and state != machine.current:
+            machine.current = state
+        self._entries[key] = [machine, state, now]
+        self._shrink()
+        return machine
+
+    def _shrink(self):
+        entries = self._entries
+        while len(entries) > self.capacity:
+            key, entry = entries.popitem(last=False)
+            self.evictions += 1
+            self._save(key, entry)
+
+    def _save(self, key, entry):
+        state = entry[0].current
+        if state != entry[1]:
+            self.store.save(key, state)
+            self.writes += 1
+
+    def expire(self):
+        '''
+            Evicts the machines unused for ttl seconds.
+        '''
+        if self.ttl is None:
+            return
+        deadline = self._clock() - self.ttl
+        entries = self._entries
+        while entries:
+            key = next(iter(entries))
+            entry = entries[key]
+            if entry[2] > deadline:
+                break
+            del entries[key]
+            self.expirations += 1
+            self._save(key, entry)
+
+    def evict(self, key):
+        '''
+            Removes the machine of key from the pool, saving its state.
+        '''
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.evictions += 1
+            self._save(key, entry)
+
+    def flush(self):
+        '''
+            Saves the changed states of the machines in the pool, with a
+            single store.save_many call.
+        '''
+        dirty = {}
+        for key, entry in self._entries.items():
+            state = entry[0].current
+            if state != entry[1]:
+                dirty[key] = entry[1] = state
+        if dirty:
+            self.store.save_many(dirty)
+            self.writes += len(dirty)
+        self.store.flush()
+
+    def clear(self):
+        '''
+            Flushes and empties the pool.
+        '''
+        self.flush()
+        self._entries.clear()
+
+    def stats(self):
+        '''
+            Returns a dictionary of the pool metrics.
+        '''
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': float(self.hits) / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'writes': self.writes,
+        }
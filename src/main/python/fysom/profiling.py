@@ -0,0 +1,222 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Sampling profiler timing the callbacks of a fraction of the transitions
+    of machines.
+'''
+
+import random
+import threading
+import time
+
+from fysom import (FysomGlobal, _CHANGE_STATE_NAMES, _callback_names,
+                   call_first, call_first_global)
+
+try:
+    _perf_counter = time.perf_counter
+except AttributeError:  # pragma: no cover
+    _perf_counter = time.time
+
+# hook kind -> (method name, callback kind, state of the event it runs for)
+_HOOKS = {
+    'before': ('_before_event', 'before', 'src'),
+    'leave': ('_leave_state', 'leave', 'src'),
+    'enter': ('_enter_state', 'enter', 'dst'),
+    'reenter': ('_reenter_state', 'reenter', 'dst'),
+    'change': ('_change_state', None, 'dst'),
+    'after': ('_after_event', 'after', 'dst'),
+}
+
+TABLE_HEADER = ('kind', 'event', 'state', 'callback', 'calls', 'total',
+                'mean', 'max')
+
+
+class SamplingProfiler(object):
+
+    '''
+        Times the callbacks of a random fraction (rate) of the transitions of
+        the machines it is attached to, and aggregates the timings by hook
+        kind ('condition', 'before', 'leave', 'enter', 'reenter', 'change',
+        'after'), event, state and callback name.
+
+        Attaching installs wrappers on the machine instance only: machines
+        without a profiler are not slowed down. Transitions that are not
+        sampled pay one random draw and a flag check per hook.
+    '''
+
+    def __init__(self, rate=0.01, clock=None, random=random.random):
+        self.rate = rate
+        self._clock = clock or _perf_counter
+        self._random = random
+        self._local = threading.local()
+        # (kind, event, state, callback) -> [calls, total, max]
+        self.stats = {}
+        self.seen = 0
+        self.sampled = 0
+
+    def attach(self, machine):
+        '''
+            Profiles the transitions of a Fysom or FysomGlobal machine.
+        '''
+        is_global = isinstance(machine, FysomGlobal)
+        fire = machine._fire
+        local = self._local
+
+        def _fire(*args):
+            self.seen += 1
+            previous = getattr(local, 'active', False)
+            local.active = self._random() < self.rate
+            if local.active:
+                self.sampled += 1
+            try:
+                return fire(*args)
+            finally:
+                local.active = previous
+
+        machine._fire = _fire
+        for kind in _HOOKS:
+            setattr(machine, _HOOKS[kind][0],
+                    self._wrap_hook(machine, kind, is_global))
+        if is_global:
+            machine._check_condition = self._wrap_condition(machine)
+
+    def detach(self, machine):
+        '''
+            Removes the wrappers installed by attach().
+        '''
+        names = ['_fire', '_check_condition'] + \
+            [hook[0] for hook in _HOOKS.values()]
+        for name in names:
+            machine.__dict__.pop(name, None)
+
+    def _wrap_hook(self, machine, kind, is_global):
+        method_name, names_kind, state_attr = _HOOKS[kind]
+        original = getattr(machine, method_name)
+        local = self._local
+        record = self._record
+        clock = self._clock
+
+        def hook(*args):
+            if not getattr(local, 'active', False):
+                return original(*args)
+            if is_global:
+                obj, e = args[:2]
+                state = args[2] if len(args) > 2 else None
+            else:
+                e = args[0]
+                state = args[1] if len(args) > 1 else None
+            if state is None:
+                state = getattr(e, state_attr)
+            if names_kind is None:
+                names = _CHANGE_STATE_NAMES
+            elif names_kind in ('before', 'after'):
+                names = _callback_names(names_kind, e.event)
+            else:
+                names = _callback_names(names_kind, state)
+            for name in names:
+                if is_global:
+                    found = name in machine._callbacks or \
+                        getattr(obj, name, None) is not None
+                else:
+                    found = getattr(machine, name, None) is not None
+                if found:
+                    break
+            else:
+                return None
+            start = clock()
+            try:
+                if is_global:
+                    return call_first_global(machine._callbacks, obj,
+                                             (name,), e)
+                return call_first(machine, (name,), e)
+            finally:
+                record(kind, e.event, state, name, clock() - start)
+
+        return hook
+
+    def _wrap_condition(self, machine):
+        original = machine._check_condition
+        local = self._local
+        clock = self._clock
+
+        def check_condition(obj, func, target, e):
+            if not getattr(local, 'active', False):
+                return original(obj, func, target, e)
+            name = func if not callable(func) else \
+                getattr(func, '__name__', repr(func))
+            start = clock()
+            try:
+                return original(obj, func, target, e)
+            finally:
+                self._record('condition', e.event, e.src, name,
+                             clock() - start)
+
+        return check_condition
+
+    def _record(self, kind, event, state, name, elapsed):
+        key = (kind, event, state, name)
+        stat = self.stats.get(key)
+        if stat is None:
+            self.stats[key] = [1, elapsed, elapsed]
+        else:
+            stat[0] += 1
+            stat[1] += elapsed
+            if elapsed > stat[2]:
+                stat[2] = elapsed
+
+    def reset(self):
+        self.stats.clear()
+        self.seen = 0
+        self.sampled = 0
+
+    def table(self):
+        '''
+            Returns the aggregated timings as a list of (kind, event, state,
+            callback, calls, total, mean, max) tuples, in seconds, by
+            decreasing total time. See TABLE_HEADER.
+        '''
+        rows = [key + (calls, total, total / calls, longest)
+                for key, (calls, total, longest) in self.stats.items()]
+        rows.sort(key=lambda row: row[5], reverse=True)
+        return rows
+
+    def collapsed(self, root='fysom'):
+        '''
+            Returns the timings in the collapsed stack format of flame graph
+            tools, one "root;event;kind state;callback microseconds" line per
+            callback.
+        '''
+        lines = []
+        for (kind, event, state, name), stat in sorted(self.stats.items()):
+            lines.append('%s;%s;%s %s;%s %d' % (
+                root, event, kind, state, name,
+                int(round(stat[1] * 1e6))))
+        return '\n'.join(lines) + '\n' if lines else ''
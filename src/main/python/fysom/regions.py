@@ -0,0 +1,275 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+'''
+    Orthogonal regions: several independent state dimensions held by a
+    single machine.
+'''
+
+import functools
+import sys
+import weakref
+
+from fysom import (Fysom, FysomDefinition, FysomError, Canceled,
+                   TriggerResult, Mapping, WILDCARD, SAME_DST, _weak_callback,
+                   _drop_dead_callback)
+
+
+class RegionsDefinition(object):
+
+    '''
+        Compiled form of a set of orthogonal regions.
+
+        Holds one FysomDefinition per region and an index of the regions
+        handling each event. Like FysomDefinition, it can be shared between
+        many machines.
+    '''
+
+    def __init__(self, regions):
+        '''
+        Compile a set of regions.
+
+            regions     a list of (region name, cfg) pairs, or a dictionary
+                        mapping region names to cfg. Each cfg is anything
+                        accepted by Fysom, including a FysomDefinition.
+                        Timed events are not supported.
+        '''
+        if isinstance(regions, Mapping):
+            regions = list(regions.items())
+        self.names = tuple(name for name, _ in regions)
+        self.definitions = tuple(
+            cfg if isinstance(cfg, FysomDefinition) else FysomDefinition(cfg)
+            for _, cfg in regions)
+        self.positions = dict((name, i) for i, name in enumerate(self.names))
+        for name, definition in zip(self.names, self.definitions):
+            if definition.timeouts:
+                raise FysomError(
+                    'timed events are not supported in regions: %s' % name)
+
+        index = {}
+        for i, definition in enumerate(self.definitions):
+            for event in definition.map:
+                index.setdefault(event, []).append(i)
+        self.index = dict((event, tuple(positions))
+                          for event, positions in index.items())
+
+
+class FysomRegions(Fysom):
+
+    '''
+        A machine made of several orthogonal regions.
+
+        The current attribute is a tuple holding the state of every region,
+        in region order. An event is dispatched once to all the regions
+        handling it, as found in the precomputed event to regions index, and
+        every region for which it is valid in its current state transitions.
+
+        Callbacks follow Fysom naming conventions. onbefore, onafter and
+        onchangestate callbacks run once per dispatch, with e.src and e.dst
+        holding the whole state tuples. onleave, onenter and onreenter
+        callbacks run for every region transition, with e.region set to the
+        name of the region. Returning False from an onleave callback has no
+        effect: asynchronous transitions are not supported across regions.
+    '''
+
+    def __init__(self, regions, callbacks=None, **kwargs):
+        '''
+        Construct a machine with orthogonal regions.
+
+        Arguments:
+
+            regions     a list of (region name, cfg) pairs, a dictionary
+                        mapping region names to cfg, or a RegionsDefinition
+
+            callbacks   a dictionary mapping callback names to functions
+
+        Example:
+
+        >>> fsm = FysomRegions([
+        ...     ('link', {'initial': 'down', 'events': [('up', 'down', 'up')]}),
+        ...     ('auth', {'initial': 'anonymous',
+        ...               'events': [('login', 'anonymous', 'user')]})])
+        >>> fsm.current
+        ('down', 'anonymous')
+        >>> fsm.up()
+        >>> fsm.region('link')
+        'up'
+
+        '''
+        if sys.version_info[0] >= 3:
+            super(Fysom, self).__init__(**kwargs)
+        if not isinstance(regions, RegionsDefinition):
+            regions = RegionsDefinition(regions)
+        self._regions = regions
+
+        for definition in regions.definitions:
+            for name in definition.callbacks:
+                setattr(self, name, definition.callbacks[name])
+            definition.share_callbacks(self)
+        if callbacks:
+            self_ref = weakref.ref(self)
+            for name in callbacks:
+                setattr(self, name, _weak_callback(
+                    callbacks[name], True,
+                    functools.partial(_drop_dead_callback, self_ref, name)))
+
+        self.current = ('none',) * len(regions.names)
+
+        # Regions are initialized one by one, as initial events of
+        # different regions commonly share the 'startup' name.
+        for i, definition in enumerate(regions.definitions):
+            init = definition.initial
+            if init and 'defer' not in init:
+                self._dispatch(init['event'], (i,), (), {}, True)
+
+    def __getattr__(self, name):
+        '''
+            Event methods are resolved through the shared index rather than
+            bound on every instance.
+        '''
+        if not name.startswith('_') and name in self._regions.index:
+            return functools.partial(self.trigger, name)
+        raise AttributeError(name)
+
+    def fork(self):
+        '''
+            Returns a new machine in the current states of this one. Event
+            methods are not bound on instances, so only the attributes of
+            the machine are copied.
+        '''
+        fork = object.__new__(type(self))
+        fork.__dict__.update(self.__dict__)
+        return fork
+
+    def region(self, name):
+        '''
+            Returns the current state of the given region.
+        '''
+        return self.current[self._regions.positions[name]]
+
+    def isstate(self, state):
+        '''
+            Returns if any region is in the given state.
+        '''
+        return state in self.current
+
+    is_state = isstate
+
+    def can(self, event):
+        '''
+            Returns if the given event can be fired in at least one region.
+        '''
+        regions = self._regions
+        for i in regions.index.get(event, ()):
+            dsts = regions.definitions[i].map[event]
+            if self.current[i] in dsts or WILDCARD in dsts:
+                return True
+        return False
+
+    def is_finished(self):
+        '''
+            Returns if every region having a final state is in it.
+        '''
+        finals = [(i, d.final)
+                  for i, d in enumerate(self._regions.definitions) if d.final]
+        return bool(finals) and all(self.current[i] == final
+                                    for i, final in finals)
+
+    def trigger(self, event, *args, **kwargs):
+        '''
+            Triggers the given event in every region handling it.
+        '''
+        if event not in self._regions.index:
+            raise FysomError(
+                "There isn't any event registered as %s" % event)
+        self._fire(event, args, kwargs, True)
+
+    def _fire(self, event, args, kwargs, strict):
+        positions = self._regions.index.get(event, ())
+        return self._dispatch(event, positions, args, kwargs, strict)
+
+    def _dispatch(self, event, positions, args, kwargs, strict):
+        '''
+            Transitions the given regions on event as a single dispatch.
+        '''
+        regions = self._regions
+        src = self.current
+        moves = []
+        for i in positions:
+            dsts = regions.definitions[i].map[event]
+            state = src[i]
+            dst = dsts[state] if state in dsts else dsts.get(WILDCARD)
+            if dst:
+                moves.append((i, state, state if dst == SAME_DST else dst))
+        if not moves:
+            if strict:
+                raise FysomError(
+                    "event %s inappropriate in current state %s"
+                    % (event, src))
+            return TriggerResult.INVALID
+
+        dst = list(src)
+        for i, _, state in moves:
+            dst[i] = state
+        dst = tuple(dst)
+
+        e = self._e_obj()
+        e.fsm, e.event, e.src, e.dst, e.region = self, event, src, dst, None
+        for k in kwargs:
+            setattr(e, k, kwargs[k])
+        e.args = args
+
+        if self._before_event(e) is False:
+            if strict:
+                raise Canceled(
+                    "Cannot trigger event {0} because the onbefore{0} handler returns False".format(event))
+            return TriggerResult.CANCELED
+
+        for i, state_src, state_dst in moves:
+            if state_src != state_dst:
+                e.region = regions.names[i]
+                exits = regions.definitions[i].path(state_src, state_dst)[0]
+                for state in exits:
+                    self._leave_state(e, state)
+
+        self.current = dst
+        for i, state_src, state_dst in moves:
+            e.region = regions.names[i]
+            if state_src == state_dst:
+                self._reenter_state(e, state_dst)
+            else:
+                enters = regions.definitions[i].path(state_src, state_dst)[1]
+                for state in enters:
+                    self._enter_state(e, state)
+        e.region = None
+
+        if src != dst:
+            self._change_state(e)
+        self._after_event(e)
+        return TriggerResult.OK
@@ -0,0 +1,266 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Dry runs of event sequences on the transition table of a machine,
+    without callbacks, event objects nor exceptions, and random walks
+    generating valid event sequences.
+'''
+
+import random
+from bisect import bisect_right
+
+from fysom import FysomDefinition, FysomGlobal, SAME_DST, WILDCARD, lookup
+
+
+class SimulationResult(object):
+
+    '''
+        Outcome of a simulated event sequence.
+
+            state       state reached, before the first invalid event if any
+
+            invalid     index of the first event that could not be fired, or
+                        None if the whole sequence ran
+
+            states      trajectory of states from the start state, one more
+                        than the events run, or None when not requested
+    '''
+
+    __slots__ = ('state', 'invalid', 'states')
+
+    def __init__(self, state, invalid, states):
+        self.state = state
+        self.invalid = invalid
+        self.states = states
+
+    @property
+    def ok(self):
+        return self.invalid is None
+
+    def __eq__(self, other):
+        return isinstance(other, SimulationResult) and \
+            (self.state, self.invalid, self.states) == \
+            (other.state, other.invalid, other.states)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'SimulationResult(state=%r, invalid=%r, states=%r)' % (
+            self.state, self.invalid, self.states)
+
+
+def transition_table(machine):
+    '''
+        Returns the {event: {source: destination}} table of a Fysom or
+        FysomGlobal machine, a FysomDefinition or a configuration dictionary.
+        Conditions of global machines are not part of it.
+    '''
+    if isinstance(machine, FysomGlobal):
+        return dict((event, dict((src, transition['dst'])
+                                 for src, transition in sources.items()))
+                    for event, sources in machine._map.items())
+    return _definition(machine).map
+
+
+def _definition(machine):
+    definition = getattr(machine, '_definition', machine)
+    if not isinstance(definition, FysomDefinition):
+        definition = FysomDefinition(definition)
+    return definition
+
+
+def initial_state(machine):
+    '''
+        Returns the initial state of a machine, as transition_table() takes
+        them, or 'none' if it has none or defers it.
+    '''
+    initial = _definition(machine).initial
+    if initial and 'defer' not in initial:
+        return initial['state']
+    return 'none'
+
+
+class Simulator(object):
+
+    '''
+        Runs event sequences on the transition table of a machine. The
+        table is built once; the machine itself is never fired.
+    '''
+
+    def __init__(self, machine):
+        self.table = transition_table(machine)
+        self.initial = initial_state(machine)
+
+    def run(self, events, start=None, trajectory=True):
+        '''
+            Runs a sequence of events from start, the initial state by
+            default, and returns a SimulationResult.
+        '''
+        table = self.table
+        state = self.initial if start is None else start
+        states = [state] if trajectory else None
+        for step, event in enumerate(events):
+            dst = lookup(table, event, state)
+            if dst is None:
+                return SimulationResult(
+                    state, step, tuple(states) if trajectory else None)
+            state = dst
+            if trajectory:
+                states.append(state)
+        return SimulationResult(
+            state, None, tuple(states) if trajectory else None)
+
+    def run_many(self, sequences, start=None, trajectory=False):
+        '''
+            Runs every sequence of events from start and returns the list of
+            their SimulationResult, without trajectories by default.
+        '''
+        table = self.table
+        initial = self.initial if start is None else start
+        results = []
+        append = results.append
+        if trajectory:
+            run = self.run
+            for events in sequences:
+                append(run(events, initial))
+            return results
+        for events in sequences:
+            state = initial
+            invalid = None
+            for step, event in enumerate(events):
+                dst = lookup(table, event, state)
+                if dst is None:
+                    invalid = step
+                    break
+                state = dst
+            append(SimulationResult(state, invalid, None))
+        return results
+
+
+def simulate(machine, events, start=None):
+    '''
+        Shortcut for Simulator(machine).run(events, start).
+    '''
+    return Simulator(machine).run(events, start)
+
+
+def simulate_many(machine, sequences, start=None, trajectory=False):
+    '''
+        Shortcut for Simulator(machine).run_many(sequences, start).
+    '''
+    return Simulator(machine).run_many(sequences, start, trajectory)
+
+
+class RandomWalker(object):
+
+    '''
+        Generates random valid event sequences of a machine, given as
+        transition_table() takes it. The events that can be fired from each
+        state are indexed once, so a step costs a random draw.
+
+        Events are drawn uniformly among the ones valid in the current
+        state, or in proportion to weights, a dictionary mapping event names
+        to weights (1 for the events it does not list, 0 to never draw
+        one). seed makes the walks reproducible.
+    '''
+
+    def __init__(self, machine, weights=None, seed=None):
+        table = transition_table(machine)
+        self.initial = initial_state(machine)
+        self.final = _definition(machine).final
+        self.random = random.Random(seed)
+        states = set()
+        for dsts in table.values():
+            states.update(src for src in dsts if src != WILDCARD)
+            states.update(dst for dst in dsts.values()
+                          if dst and dst != SAME_DST)
+        # state -> (steps, cumulative weights or None when uniform)
+        self.index = {}
+        for state in states:
+            steps = []
+            for event in sorted(table):
+                dst = lookup(table, event, state)
+                if dst is not None:
+                    steps.append((event, dst))
+            cumulative = None
+            if weights is not None:
+                steps = [step for step in steps if weights.get(step[0], 1) > 0]
+                cumulative = []
+                total = 0
+                for event, _ in steps:
+                    total += weights.get(event, 1)
+                    cumulative.append(total)
+            if steps:
+                self.index[state] = (tuple(steps), cumulative)
+
+    def events(self, state):
+        '''
+            Returns the events that can be fired from state.
+        '''
+        steps = self.index.get(state)
+        return [] if steps is None else [event for event, _ in steps[0]]
+
+    def walk(self, max_length=100, start=None, stop_at_final=True):
+        '''
+            Generator of the (event, destination) steps of a random walk
+            from start, the initial state by default. The walk ends after
+            max_length steps, in a state without events, or in the final
+            state when stop_at_final is set.
+        '''
+        index = self.index
+        draw = self.random.random
+        final = self.final if stop_at_final else None
+        state = self.initial if start is None else start
+        for _ in range(max_length):
+            if state == final:
+                return
+            entry = index.get(state)
+            if entry is None:
+                return
+            steps, cumulative = entry
+            if cumulative is None:
+                step = steps[int(draw() * len(steps))]
+            else:
+                step = steps[bisect_right(cumulative, draw() * cumulative[-1])]
+            yield step
+            state = step[1]
+
+    def sequences(self, count, max_length=100, start=None,
+                  stop_at_final=True):
+        '''
+            Generator of count random walks as lists of event names.
+        '''
+        for _ in range(count):
+            yield [event for event, _ in self.walk(
+                max_length, start, stop_at_final)]
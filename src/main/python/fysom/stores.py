@@ -0,0 +1,278 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    State stores keeping the state of the entities of a FysomGlobal machine
+    outside of objects, keyed by entity.
+'''
+
+import re
+import sqlite3
+
+from fysom import FysomError
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class StateStore(object):
+
+    '''
+        Interface of the state stores. load returns None for unknown keys.
+        The bulk methods default to one call per key; backends override them
+        to batch their accesses.
+    '''
+
+    def load(self, key):
+        raise NotImplementedError()
+
+    def save(self, key, state):
+        raise NotImplementedError()
+
+    def load_many(self, keys):
+        '''
+            Returns a dictionary mapping the known keys among keys to their
+            state.
+        '''
+        states = {}
+        for key in keys:
+            state = self.load(key)
+            if state is not None:
+                states[key] = state
+        return states
+
+    def save_many(self, states):
+        '''
+            Saves a dictionary mapping keys to states.
+        '''
+        for key, state in states.items():
+            self.save(key, state)
+
+    def flush(self):
+        '''
+            Writes pending changes, if the store defers them.
+        '''
+
+
+class MemoryStore(StateStore):
+
+    '''
+        Keeps states in a dictionary, available as the states attribute.
+    '''
+
+    def __init__(self, states=None):
+        self.states = {} if states is None else states
+
+    def load(self, key):
+        return self.states.get(key)
+
+    def save(self, key, state):
+        self.states[key] = state
+
+    def load_many(self, keys):
+        states = self.states
+        return dict((key, states[key]) for key in keys if key in states)
+
+    def save_many(self, states):
+        self.states.update(states)
+
+
+class SQLiteStore(StateStore):
+
+    '''
+        Keeps states in a SQLite table with key and state columns. Bulk
+        loads are split in batches of at most max_variables keys, and bulk
+        saves run in a single transaction.
+    '''
+
+    max_variables = 500
+
+    def __init__(self, database=':memory:', table='fysom_states'):
+        '''
+        Construct a SQLite store.
+
+        Arguments:
+
+            database    path of the database file, or a sqlite3 connection
+
+            table       name of the table, created if it does not exist
+        '''
+        if not _IDENTIFIER.match(table):
+            raise FysomError('invalid table name %r' % (table,))
+        if isinstance(database, sqlite3.Connection):
+            self.connection = database
+        else:
+            self.connection = sqlite3.connect(database)
+        self.table = table
+        # No type on the columns, so that keys and states keep their type:
+        # states are integers with FysomGlobal(..., state_codes=True).
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS %s '
+                '(key PRIMARY KEY, state NOT NULL)' % table)
+        self._select = 'SELECT state FROM %s WHERE key = ?' % table
+        self._select_many = 'SELECT key, state FROM %s WHERE key IN (%%s)' \
+            % table
+        self._upsert = 'INSERT OR REPLACE INTO %s (key, state) VALUES (?, ?)' \
+            % table
+
+    def load(self, key):
+        row = self.connection.execute(self._select, (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def save(self, key, state):
+        with self.connection:
+            self.connection.execute(self._upsert, (key, state))
+
+    def load_many(self, keys):
+        keys = list(keys)
+        states = {}
+        for start in range(0, len(keys), self.max_variables):
+            batch = keys[start:start + self.max_variables]
+            query = self._select_many % ', '.join('?' * len(batch))
+            states.update(self.connection.execute(query, batch))
+        return states
+
+    def save_many(self, states):
+        with self.connection:
+            self.connection.executemany(self._upsert, states.items())
+
+    def close(self):
+        self.connection.close()
+
+
+class CachedStore(StateStore):
+
+    '''
+        Read-through cache in front of another store. With write_behind,
+        saves only update the cache and are written to the backend in
+        batches, by save_many, once batch_size keys are dirty or on flush().
+    '''
+
+    def __init__(self, backend, write_behind=True, batch_size=100):
+        self.backend = backend
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.cache = {}
+        self.dirty = set()
+
+    def load(self, key):
+        cache = self.cache
+        if key in cache:
+            return cache[key]
+        state = cache[key] = self.backend.load(key)
+        return state
+
+    def save(self, key, state):
+        self.cache[key] = state
+        if not self.write_behind:
+            self.backend.save(key, state)
+            return
+        self.dirty.add(key)
+        if len(self.dirty) >= self.batch_size:
+            self.flush()
+
+    def load_many(self, keys):
+        cache = self.cache
+        missing = [key for key in keys if key not in cache]
+        if missing:
+            loaded = self.backend.load_many(missing)
+            for key in missing:
+                cache[key] = loaded.get(key)
+        return dict((key, cache[key]) for key in keys
+                    if cache[key] is not None)
+
+    def save_many(self, states):
+        self.cache.update(states)
+        if not self.write_behind:
+            self.backend.save_many(states)
+            return
+        self.dirty.update(states)
+        if len(self.dirty) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.dirty:
+            cache = self.cache
+            self.backend.save_many(dict((key, cache[key])
+                                        for key in self.dirty))
+            self.dirty.clear()
+        self.backend.flush()
+
+    def evict(self, keys=None):
+        '''
+            Drops keys, or every key, from the cache after writing their
+            pending changes.
+        '''
+        self.flush()
+        if keys is None:
+            self.cache.clear()
+        else:
+            for key in keys:
+                self.cache.pop(key, None)
+
+
+class StoredEntity(object):
+
+    '''
+        Stand-in object handed to a FysomGlobal machine for a key of its
+        store. Its state attribute reads and writes through the store.
+    '''
+
+    def __init__(self, gsm, key):
+        self._gsm = gsm
+        self.key = key
+
+    def _get_state(self):
+        gsm = self._gsm
+        state = gsm._store.load(self.key)
+        return gsm._store_default if state is None else state
+
+    def _set_state(self, state):
+        gsm = self._gsm
+        gsm._store.save(self.key, state)
+        if gsm._pending.get(self.key) is self:
+            del gsm._pending[self.key]
+
+
+_entity_classes = {}
+
+
+def entity_class(state_field):
+    '''
+        Returns the StoredEntity subclass exposing the state as state_field.
+    '''
+    cls = _entity_classes.get(state_field)
+    if cls is None:
+        cls = _entity_classes[state_field] = type(
+            str('StoredEntity'), (StoredEntity,), {
+                '__slots__': (),
+                state_field: property(StoredEntity._get_state,
+                                      StoredEntity._set_state)})
+    return cls
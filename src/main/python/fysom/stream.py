@@ -0,0 +1,274 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Streaming processor replaying event logs through a FysomGlobal machine,
+    with the state of every entity kept in a dictionary instead of objects.
+'''
+
+import csv
+import json
+
+from fysom import FysomError, TriggerResult, lookup
+
+
+class StreamRecord(object):
+
+    '''
+        Outcome of one event of a stream.
+
+        result is a TriggerResult code, or None when a callback raised, in
+        which case error holds the exception. src and dst are the states of
+        the entity before and after the event.
+    '''
+
+    __slots__ = ('key', 'event', 'payload', 'src', 'dst', 'result', 'error')
+
+    def __init__(self, key, event, payload, src, dst, result, error=None):
+        self.key = key
+        self.event = event
+        self.payload = payload
+        self.src = src
+        self.dst = dst
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.result == TriggerResult.OK
+
+    def __repr__(self):
+        return 'StreamRecord(%r, %r, %r -> %r, %r)' % (
+            self.key, self.event, self.src, self.dst,
+            self.result if self.error is None else self.error)
+
+
+class _Entity(object):
+    '''
+        Stand-in object handed to the global machine for one event.
+    '''
+
+
+class StreamProcessor(object):
+
+    '''
+        Applies (key, event, payload) tuples to the entities of a global
+        machine and lazily yields a StreamRecord per event.
+
+        Only the current state of each key is kept, so memory grows with the
+        number of distinct keys and not with the length of the stream.
+        Unknown keys start in the initial state of the machine, without
+        firing its initial event.
+
+        When the machine has no callbacks nor conditions, transitions are
+        resolved from a table compiled once from the machine. Otherwise each
+        event is fired through the machine on a stand-in object holding the
+        state of the key, its key and its payload, so that its callbacks and
+        conditions run; the payload is also passed as the payload keyword
+        argument of the event. Callbacks defined on model classes do not
+        run, as there are no model objects.
+    '''
+
+    ERRORS = ('yield', 'skip', 'raise')
+
+    def __init__(self, gsm, states=None, errors='yield', evict_final=False):
+        '''
+        Construct a stream processor.
+
+        Arguments:
+
+            gsm         the FysomGlobal machine to apply events with.
+                        Timed events and stores are not supported.
+
+            states      dictionary mapping keys to their current state, to
+                        resume from a previous run. It is updated in place.
+
+            errors      what to do with events that do not apply, are
+                        canceled, stay pending or whose callbacks raise:
+                        'yield' their records, 'skip' them, or 'raise' a
+                        FysomError (or the exception of the callback).
+
+            evict_final forget keys reaching the final state, bounding the
+                        memory for streams of short-lived entities. A key
+                        seen again afterwards starts over.
+        '''
+        if errors not in self.ERRORS:
+            raise FysomError('errors must be one of %s' % (self.ERRORS,))
+        if gsm._definition.timeouts:
+            raise FysomError('timed events are not supported in streams')
+        if gsm._store is not None:
+            raise FysomError('a stream keeps its own states, not a store')
+        self.gsm = gsm
+        self.states = {} if states is None else states
+        self.errors = errors
+        self.evict_final = evict_final
+        initial = gsm._initial
+        if initial and not initial.get('defer'):
+            self.initial = initial['state']
+        else:
+            self.initial = 'none'
+        self._table = self._compile(gsm)
+        self.processed = 0
+        self.failed = 0
+
+    @staticmethod
+    def _compile(gsm):
+        if gsm._callbacks:
+            return None
+        table = {}
+        for event, sources in gsm._map.items():
+            dsts = table[event] = {}
+            for src, transition in sources.items():
+                if transition.get('cond'):
+                    return None
+                dsts[src] = transition['dst']
+        return table
+
+    def process(self, events):
+        '''
+            Generator applying an iterable of (key, event) or
+            (key, event, payload) tuples and yielding their records.
+        '''
+        states = self.states
+        initial = self.initial
+        table = self._table
+        final = self.gsm._final if self.evict_final else None
+        errors = self.errors
+        for item in events:
+            if len(item) == 2:
+                key, event = item
+                payload = None
+            else:
+                key, event, payload = item
+            src = states.get(key, initial)
+            if table is not None:
+                record = self._lookup(table, key, event, payload, src)
+            else:
+                record = self._fire(key, event, payload, src)
+            self.processed += 1
+            if record.result == TriggerResult.OK:
+                if record.dst == final:
+                    states.pop(key, None)
+                else:
+                    states[key] = record.dst
+                yield record
+                continue
+            self.failed += 1
+            if errors == 'raise':
+                if record.error is not None:
+                    raise record.error
+                raise FysomError('event %s of %r %s in state %s' % (
+                    event, key, record.result, src))
+            if errors == 'yield':
+                yield record
+
+    def _lookup(self, table, key, event, payload, src):
+        dst = lookup(table, event, src)
+        if dst is not None:
+            return StreamRecord(key, event, payload, src, dst,
+                                TriggerResult.OK)
+        return StreamRecord(key, event, payload, src, src,
+                            TriggerResult.INVALID)
+
+    def _fire(self, key, event, payload, src):
+        gsm = self.gsm
+        obj = _Entity()
+        obj.key = key
+        obj.payload = payload
+        gsm._write(obj, src)
+        try:
+            result = gsm.try_trigger(obj, event, payload=payload)
+        except Exception as error:
+            return StreamRecord(key, event, payload, src, src, None, error)
+        if result != TriggerResult.OK:
+            return StreamRecord(key, event, payload, src, src, result)
+        return StreamRecord(key, event, payload, src,
+                            gsm.current(obj), result)
+
+
+def _lines(lines, chunk_size):
+    readlines = getattr(lines, 'readlines', None)
+    if readlines is None:
+        for line in lines:
+            yield line
+        return
+    while True:
+        chunk = readlines(chunk_size)
+        if not chunk:
+            return
+        for line in chunk:
+            yield line
+
+
+def read_csv(lines, header=False, chunk_size=1 << 16, **fmtparams):
+    '''
+        Generator parsing entity_id,event[,payload] rows from an open file
+        or an iterable of lines. Files are read chunk_size bytes at a time.
+        The first row is skipped when header is true. fmtparams are passed
+        to csv.reader.
+    '''
+    rows = csv.reader(_lines(lines, chunk_size), **fmtparams)
+    if header:
+        next(rows, None)
+    for row in rows:
+        if not row:
+            continue
+        if len(row) == 2:
+            yield row[0], row[1], None
+        elif len(row) == 3:
+            yield row[0], row[1], row[2]
+        else:
+            raise ValueError('line %d: expected 2 or 3 columns, got %d'
+                             % (rows.line_num, len(row)))
+
+
+def read_json_lines(lines, key_field='entity_id', event_field='event',
+                    payload_field='payload', chunk_size=1 << 16):
+    '''
+        Generator parsing one JSON object (or [entity_id, event, payload]
+        array) per line from an open file or an iterable of lines. The
+        payload field is optional.
+    '''
+    for number, line in enumerate(_lines(lines, chunk_size), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+            if isinstance(item, dict):
+                row = (item[key_field], item[event_field],
+                       item.get(payload_field))
+            elif len(item) in (2, 3):
+                row = (item[0], item[1], item[2] if len(item) == 3 else None)
+            else:
+                raise ValueError('expected 2 or 3 items')
+        except (ValueError, KeyError, TypeError) as error:
+            raise ValueError('line %d: %s' % (number, error))
+        yield row
@@ -0,0 +1,255 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Hierarchical timer wheel driving the timed transitions declared with
+    the 'after' key of events.
+
+    A single wheel is meant to be shared by every machine of a process:
+    scheduling and canceling a timer are O(1), and advancing the wheel only
+    touches the slots whose time has come.
+'''
+
+import math
+import time
+
+try:
+    _monotonic = time.monotonic
+except AttributeError:  # pragma: no cover
+    _monotonic = time.time
+
+
+class Timer(object):
+
+    '''
+        Handle of a scheduled callback, as returned by TimerWheel.schedule.
+    '''
+
+    __slots__ = ('expires', 'callback', '_wheel', '_slot')
+
+    def __init__(self, wheel, expires, callback):
+        self.expires = expires
+        self.callback = callback
+        self._wheel = wheel
+        self._slot = None
+
+    @property
+    def active(self):
+        '''
+            Returns if the timer is still waiting to fire.
+        '''
+        return self._slot is not None
+
+    def cancel(self):
+        '''
+            Cancels the timer. Does nothing if it already fired.
+        '''
+        if self._slot is not None:
+            del self._slot[self]
+            self._slot = None
+            self._wheel._count -= 1
+
+
+class TimerWheel(object):
+
+    '''
+        Hashed hierarchical timing wheel.
+
+        Time is split in ticks of resolution seconds. The first level holds
+        one slot per tick for the next 2 ** bits ticks, every other level
+        covers 2 ** bits times the span of the previous one; timers far in
+        the future are moved down a level whenever their slot comes up.
+    '''
+
+    def __init__(self, resolution=1.0, bits=8, levels=4, clock=None):
+        '''
+        Construct a timer wheel.
+
+        Arguments:
+
+            resolution  duration of a tick in seconds. Timers fire on the
+                        first tick boundary after their deadline.
+
+            bits        the number of slots of every level is 2 ** bits
+
+            levels      number of levels. Timers further away than
+                        2 ** (bits * levels) ticks are parked in the last
+                        level until they come within reach.
+
+            clock       function returning the current time in seconds,
+                        defaults to a monotonic clock.
+        '''
+        self.resolution = float(resolution)
+        self._clock = clock or _monotonic
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._levels = [[{} for _ in range(1 << bits)]
+                        for _ in range(levels)]
+        self._tick = int(self._clock() / self.resolution)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, delay, callback):
+        '''
+            Calls callback without arguments once delay seconds have elapsed.
+            Returns a Timer handle that can be used to cancel it.
+        '''
+        expires = int(math.ceil((self._clock() + delay) / self.resolution))
+        timer = Timer(self, max(expires, self._tick + 1), callback)
+        self._add(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer):
+        '''
+            Cancels the given timer.
+        '''
+        timer.cancel()
+
+    def _add(self, timer):
+        expires = timer.expires
+        ticks = expires - self._tick
+        bits = self._bits
+        last = len(self._levels) - 1
+        level = 0
+        while level < last and ticks >> (bits * (level + 1)):
+            level += 1
+        if ticks >> (bits * (level + 1)):
+            # Beyond the span of the wheel, park the timer in the furthest
+            # slot, it is placed again when that slot cascades.
+            expires = self._tick + (1 << (bits * (level + 1))) - 1
+        slot = self._levels[level][(expires >> (bits * level)) & self._mask]
+        slot[timer] = None
+        timer._slot = slot
+
+    def _cascade(self, level):
+        '''
+            Moves the timers of the current slot of a level to lower levels.
+            Returns the index of that slot.
+        '''
+        index = (self._tick >> (self._bits * level)) & self._mask
+        slot = self._levels[level][index]
+        self._levels[level][index] = {}
+        for timer in slot:
+            self._add(timer)
+        return index
+
+    def advance(self, now=None):
+        '''
+            Fires every timer due at the given time, defaulting to the
+            current time of the clock. Returns the number of fired timers.
+        '''
+        if now is None:
+            now = self._clock()
+        target = int(now / self.resolution)
+        fired = 0
+        while self._tick < target:
+            if not self._count:
+                # Nothing scheduled, skip the idle ticks altogether.
+                self._tick = target
+                break
+            self._tick += 1
+            index = self._tick & self._mask
+            if not index:
+                level = 1
+                while level < len(self._levels) and not self._cascade(level):
+                    level += 1
+            slot = self._levels[0][index]
+            if not slot:
+                continue
+            self._levels[0][index] = {}
+            for timer in list(slot):
+                if timer._slot is not slot:
+                    continue  # canceled by a previous callback
+                if timer.expires > self._tick:
+                    self._add(timer)  # parked beyond the span of the wheel
+                    continue
+                timer._slot = None
+                self._count -= 1
+                fired += 1
+                timer.callback()
+        return fired
+
+    def next_deadline(self):
+        '''
+            Returns the time of the next tick, at which advance() should be
+            called again.
+        '''
+        return (self._tick + 1) * self.resolution
+
+    def run(self, until=None):
+        '''
+            Synchronous driver: advances the wheel every tick in the calling
+            thread, until the until function returns True.
+        '''
+        while until is None or not until():
+            self.advance()
+            time.sleep(max(0.0, self.next_deadline() - self._clock()))
+
+
+class AsyncioDriver(object):
+
+    '''
+        Drives a TimerWheel from an asyncio event loop, advancing it once per
+        tick with loop.call_later.
+    '''
+
+    def __init__(self, wheel, loop=None):
+        if loop is None:
+            import asyncio
+            loop = asyncio.get_event_loop()
+        self.wheel = wheel
+        self.loop = loop
+        self._handle = None
+
+    def start(self):
+        '''
+            Starts advancing the wheel.
+        '''
+        if self._handle is None:
+            self._schedule()
+
+    def stop(self):
+        '''
+            Stops advancing the wheel.
+        '''
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self):
+        delay = self.wheel.next_deadline() - self.wheel._clock()
+        self._handle = self.loop.call_later(max(0.0, delay), self._run)
+
+    def _run(self):
+        self.wheel.advance()
+        self._schedule()
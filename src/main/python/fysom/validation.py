@@ -0,0 +1,216 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+
+'''
+    Checks of machine definitions, run once when they are compiled.
+
+    A definition built with validate='strict' raises InvalidDefinition
+    listing its problems; with validate='warn', every problem is reported
+    as a DefinitionWarning and the definition is used as is.
+'''
+
+import warnings
+
+from fysom import InvalidDefinition, WILDCARD, SAME_DST, lookup
+
+MODES = ('strict', 'warn')
+
+
+class DefinitionWarning(UserWarning):
+
+    '''
+        Warns of a problem of a machine definition in lenient mode.
+    '''
+
+
+def _conditions(e):
+    conditions = e.get('cond')
+    if not conditions:
+        return []
+    if isinstance(conditions, (list, tuple)):
+        return [{True: cond} if not isinstance(cond, dict) else cond
+                for cond in conditions]
+    return [{True: conditions}]
+
+
+def conflicts(definition):
+    '''
+        Returns the problems of the (event, source state) pairs given
+        several destinations, of which only the last one is used.
+    '''
+    problems = []
+    seen = {}
+    for e in definition.events:
+        for src in e['src']:
+            key = (e['name'], src)
+            if key in seen and seen[key] != e['dst']:
+                problems.append(
+                    'event %s from %s goes to both %s and %s' % (
+                        e['name'], src, seen[key], e['dst']))
+            seen[key] = e['dst']
+    return problems
+
+
+def _destinations(definition):
+    dsts = set()
+    if definition.initial:
+        dsts.add(definition.initial['state'])
+    for e in definition.events:
+        if e['dst'] != SAME_DST:
+            dsts.add(e['dst'])
+        for cond in _conditions(e):
+            if 'else' in cond:
+                dsts.add(cond['else'])
+    return dsts
+
+
+def unknown_final(definition):
+    '''
+        Returns the problem of a final state no event leads to.
+    '''
+    final = definition.final
+    if final and final not in _destinations(definition):
+        return ['final state %s is not the destination of any event'
+                % final]
+    return []
+
+
+def unreachable_states(definition):
+    '''
+        Returns the problems of the states that cannot be reached from the
+        initial state. Without initial state, the starting state is up to
+        the application and nothing is reported.
+    '''
+    if not definition.initial:
+        return []
+    tmap = definition.map
+    elses = {}
+    for e in definition.events:
+        for cond in _conditions(e):
+            if 'else' in cond:
+                elses.setdefault(e['name'], set()).add(cond['else'])
+    reached = set(['none'])
+    frontier = ['none']
+    while frontier:
+        state = frontier.pop()
+        targets = set()
+        for event in tmap:
+            dst = lookup(tmap, event, state)
+            if dst is not None:
+                targets.add(dst)
+                targets.update(elses.get(event, ()))
+        for target in targets:
+            # Being in a substate means being in all of its parents.
+            for ancestor in definition.ancestors(target):
+                if ancestor not in reached:
+                    reached.add(ancestor)
+                    frontier.append(ancestor)
+    states = definition.states - reached - set([WILDCARD])
+    return ['state %s is unreachable from the initial state' % state
+            for state in sorted(states)]
+
+
+def invalid_conditions(definition):
+    '''
+        Returns the problems of the conditions FysomGlobal cannot evaluate:
+        list items that are neither a callback name nor a {True or False:
+        condition} dictionary, dictionaries without such a key, and
+        conditions that are neither a name nor a callable.
+    '''
+    problems = []
+    for e in definition.events:
+        conditions = e.get('cond')
+        if not conditions:
+            continue
+        in_list = isinstance(conditions, (list, tuple))
+        if not in_list:
+            conditions = [conditions]
+        for cond in conditions:
+            if isinstance(cond, dict):
+                if True not in cond and False not in cond:
+                    problems.append(
+                        'condition %r of event %s has no True or False key'
+                        % (cond, e['name']))
+                    continue
+                cond = cond[True in cond]
+            elif callable(cond) and in_list:
+                problems.append(
+                    'condition %r of event %s must be given as {True: %s} '
+                    'in a list' % (cond, e['name'], getattr(
+                        cond, '__name__', 'condition')))
+                continue
+            if not definition._is_base_string(cond) and not callable(cond):
+                problems.append('condition %r of event %s is neither a '
+                                'callback name nor callable'
+                                % (cond, e['name']))
+    return problems
+
+
+def missing_conditions(definition, callbacks, model):
+    '''
+        Returns the problems of the conditions naming a callback found
+        neither in callbacks nor as an attribute of the model class.
+    '''
+    problems = []
+    for e in definition.events:
+        for cond in _conditions(e):
+            target = True in cond
+            name = cond.get(target)
+            if not definition._is_base_string(name) or name in callbacks:
+                continue
+            if not hasattr(model, name):
+                problems.append(
+                    'condition %s of event %s is not a callback of %s' % (
+                        name, e['name'], model.__name__))
+    return problems
+
+
+def check(definition):
+    '''
+        Returns the list of the problems of a definition found without
+        knowing the kind of machine using it.
+    '''
+    return (conflicts(definition) + unknown_final(definition) +
+            unreachable_states(definition))
+
+
+def report(problems, mode, source='definition'):
+    '''
+        Raises InvalidDefinition listing problems in strict mode, or warns
+        of each of them in warn mode.
+    '''
+    if not problems:
+        return
+    if mode == 'strict':
+        raise InvalidDefinition(
+            'invalid %s: %s' % (source, '; '.join(problems)), problems)
+    for problem in problems:
+        warnings.warn('%s: %s' % (source, problem), DefinitionWarning,
+                      stacklevel=3)
@@ -0,0 +1,159 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import Fysom, FysomError, FysomGlobal, TriggerResult
+from fysom.coalesce import Coalescer
+
+
+class CoalescerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.fsm = self._fsm()
+
+    def _fsm(self):
+        return Fysom({
+            'initial': 'idle',
+            'events': [('update', '*', '='),
+                       ('close', 'idle', 'closed')],
+            'callbacks': {
+                'onupdate': lambda e: self.calls.append(
+                    ('update', e.args, dict(e.values))),
+                'onclose': lambda e: self.calls.append(('close', (), {}))
+            }
+        })
+
+    def test_duplicate_events_should_fire_once(self):
+        coalescer = Coalescer()
+        for i in range(10):
+            coalescer.post(self.fsm, 'update', i, values={'n': i})
+        self.assertEqual(len(coalescer), 1)
+        self.assertEqual(coalescer.drain(),
+                         [(self.fsm, 'update', TriggerResult.OK)])
+        self.assertEqual(self.calls, [('update', (9,), {'n': 9})])
+        self.assertEqual((coalescer.posted, coalescer.fired), (10, 1))
+
+    def test_events_should_be_coalesced_per_machine(self):
+        other = self._fsm()
+        coalescer = Coalescer()
+        coalescer.post(self.fsm, 'update', values={})
+        coalescer.post(other, 'update', values={})
+        coalescer.post(self.fsm, 'update', values={})
+        self.assertEqual(len(coalescer.drain()), 2)
+
+    def test_merge_function_should_combine_kwargs(self):
+        def merge(old, new):
+            return {'values': dict(old['values'], **new['values'])}
+        coalescer = Coalescer(merge={'update': merge})
+        coalescer.post(self.fsm, 'update', values={'a': 1})
+        coalescer.post(self.fsm, 'update', values={'b': 2})
+        coalescer.drain()
+        self.assertEqual(self.calls, [('update', (), {'a': 1, 'b': 2})])
+
+    def test_only_listed_events_should_be_coalesced(self):
+        coalescer = Coalescer(events=['update'])
+        coalescer.post(self.fsm, 'update', values={})
+        coalescer.post(self.fsm, 'close')
+        coalescer.post(self.fsm, 'close')
+        coalescer.post(self.fsm, 'update', values={})
+        results = coalescer.drain()
+        self.assertEqual([r for _, _, r in results],
+                         [TriggerResult.OK, TriggerResult.OK,
+                          TriggerResult.INVALID, TriggerResult.OK])
+
+    def test_events_should_keep_their_order(self):
+        fsm = Fysom({'initial': 'closed',
+                     'events': [('open', 'closed', 'opened'),
+                                ('close', 'opened', 'closed')]})
+        coalescer = Coalescer()
+        for event in ('open', 'close', 'open', 'open'):
+            coalescer.post(fsm, event)
+        self.assertEqual(len(coalescer), 3)
+        coalescer.drain()
+        self.assertEqual(fsm.current, 'opened')
+
+    def test_strict_mode_should_raise(self):
+        coalescer = Coalescer(strict=True)
+        coalescer.post(self.fsm, 'close')
+        coalescer.drain()
+        coalescer.post(self.fsm, 'close')
+        self.assertRaises(FysomError, coalescer.drain)
+
+    def test_strict_mode_should_keep_the_events_after_an_error(self):
+        other = self._fsm()
+        coalescer = Coalescer(strict=True)
+        coalescer.post(self.fsm, 'close')
+        coalescer.drain()
+        coalescer.post(self.fsm, 'close')
+        coalescer.post(other, 'close')
+        coalescer.post(other, 'update', values={'n': 1})
+        self.assertRaises(FysomError, coalescer.drain)
+        self.assertEqual(len(coalescer), 2)
+        coalescer.post(other, 'update', values={'n': 2})
+        self.assertEqual(len(coalescer), 2)
+        coalescer.drain()
+        self.assertEqual(other.current, 'closed')
+        self.assertEqual(self.calls[-1], ('update', (), {'n': 2}))
+
+    def test_flush_should_only_fire_events_older_than_window(self):
+        now = [0.0]
+        coalescer = Coalescer(window=1.0, clock=lambda: now[0])
+        coalescer.post(self.fsm, 'update', values={'n': 1})
+        now[0] = 0.5
+        other = self._fsm()
+        coalescer.post(other, 'update', values={'n': 2})
+        coalescer.post(self.fsm, 'update', values={'n': 3})
+        now[0] = 1.2
+        self.assertEqual(len(coalescer.flush()), 1)
+        self.assertEqual(self.calls, [('update', (), {'n': 3})])
+        coalescer.post(other, 'update', values={'n': 4})
+        self.assertEqual(len(coalescer), 1)
+        now[0] = 2.0
+        coalescer.flush()
+        self.assertEqual(self.calls[-1], ('update', (), {'n': 4}))
+
+    def test_global_machine_targets(self):
+        gsm = FysomGlobal(events=[('update', '*', '=')], state_field='state',
+                          initial={'state': 'idle', 'defer': True})
+
+        class Model(object):
+            state = 'idle'
+            updates = 0
+
+            def onupdate(self, e):
+                self.updates += 1
+
+        obj = Model()
+        coalescer = Coalescer(gsm=gsm)
+        for _ in range(5):
+            coalescer.post(obj, 'update')
+        coalescer.drain()
+        self.assertEqual(obj.updates, 1)
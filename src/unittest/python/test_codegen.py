@@ -0,0 +1,183 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import Canceled, FysomError, TriggerResult
+from fysom.codegen import build_class, generate_source
+
+
+class FysomCodegenTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cfg = {
+            'initial': 'hungry',
+            'final': 'sick',
+            'events': [
+                {'name': 'eat', 'src': 'hungry', 'dst': 'satisfied'},
+                {'name': 'eat', 'src': 'satisfied', 'dst': 'full'},
+                {'name': 'eat', 'src': 'full', 'dst': 'sick'},
+                {'name': 'nap', 'src': ['hungry', 'full'], 'dst': '='},
+                {'name': 'rest', 'src': '*', 'dst': 'hungry'},
+                {'name': 'walk', 'src': '*', 'dst': '='},
+            ]
+        }
+        self.logs = []
+        self.Machine = build_class(
+            self.cfg, class_name='Eater',
+            callback_names=['onbeforeeat', 'onleavehungry', 'onenterfull',
+                            'onreenterhungry', 'onchangestate', 'onrest',
+                            'on_after_walk'])
+        logs = self.logs
+
+        class Eater(self.Machine):
+            def onenterfull(self, e):
+                logs.append(('enter', e.src, e.dst, e.args))
+
+            def onreenterhungry(self, e):
+                logs.append(('reenter', e.event))
+
+            def onchangestate(self, e):
+                logs.append(('change', e.dst))
+
+        self.Eater = Eater
+
+    def test_transitions_should_follow_the_specification(self):
+        fsm = self.Eater()
+        self.assertEqual(fsm.current, 'hungry')
+        self.assertEqual(self.logs, [('change', 'hungry')])
+        del self.logs[:]
+        fsm.eat()
+        fsm.eat(1)
+        self.assertEqual(fsm.current, 'full')
+        self.assertEqual(self.logs, [('change', 'satisfied'),
+                                     ('enter', 'satisfied', 'full', (1,)),
+                                     ('change', 'full')])
+        fsm.eat()
+        self.assertTrue(fsm.is_finished())
+        self.assertRaises(FysomError, fsm.eat)
+        self.assertRaises(FysomError, fsm.trigger, 'unknown')
+
+    def test_same_dst_and_reenter(self):
+        fsm = self.Eater()
+        del self.logs[:]
+        fsm.nap()
+        fsm.walk()
+        self.assertEqual(fsm.current, 'hungry')
+        self.assertEqual(self.logs, [('reenter', 'nap'), ('reenter', 'walk')])
+
+    def test_wildcard_source(self):
+        received = []
+        fsm = self.Eater(callbacks={'onrest': received.append})
+        fsm.eat()
+        fsm.eat()
+        fsm.rest(msg='zzz')
+        self.assertEqual(fsm.current, 'hungry')
+        self.assertEqual(received[0].src, 'full')
+        self.assertEqual(received[0].msg, 'zzz')
+        self.assertTrue(fsm.can('walk'))
+
+    def test_onbefore_returning_false_should_cancel(self):
+        fsm = self.Eater(callbacks={'onbeforeeat': lambda e: False})
+        self.assertRaises(Canceled, fsm.eat)
+        self.assertEqual(fsm.try_trigger('eat'), TriggerResult.CANCELED)
+        self.assertEqual(fsm.current, 'hungry')
+
+    def test_async_transition(self):
+        fsm = self.Eater(callbacks={'onleavehungry': lambda e: False})
+        fsm.eat()
+        self.assertEqual(fsm.current, 'hungry')
+        self.assertTrue(fsm.cannot('eat'))
+        self.assertRaises(FysomError, fsm.eat)
+        fsm.transition()
+        self.assertEqual(fsm.current, 'satisfied')
+
+    def test_deferred_initial_state(self):
+        Machine = build_class(
+            initial={'state': 'a', 'event': 'init', 'defer': True},
+            events=[('go', 'a', 'b')])
+        fsm = Machine()
+        self.assertEqual(fsm.current, 'none')
+        fsm.init()
+        fsm.go()
+        self.assertEqual(fsm.current, 'b')
+
+    def test_undeclared_callbacks_should_be_rejected(self):
+        self.assertRaises(FysomError, self.Eater,
+                          callbacks={'onsick': lambda e: None})
+
+    def test_callbacks_of_the_specification_are_declared(self):
+        calls = []
+        Machine = build_class(initial='a', events=[('go', 'a', 'b')],
+                              callbacks={'ongo': calls.append})
+        Machine().go()
+        self.assertEqual(len(calls), 1)
+
+    def test_hierarchical_states_and_odd_names(self):
+        logs = []
+        Machine = build_class(
+            initial='active.running',
+            substates={'active': ['active.running', 'active.paused']},
+            events=[('pause', 'active.running', 'active.paused'),
+                    ('stop-all', 'active', 'idle')],
+            callback_names=['onleaveactive', 'onleaveactive.paused'])
+        fsm = Machine(callbacks={
+            'onleaveactive': lambda e: logs.append('active'),
+            'onleaveactive.paused': lambda e: logs.append('paused')})
+        fsm.pause()
+        fsm.trigger('stop-all')
+        self.assertEqual(fsm.current, 'idle')
+        self.assertEqual(logs, ['paused', 'active'])
+
+    def test_event_names_should_be_quoted_in_messages(self):
+        Machine = build_class(initial='a', events=[
+            ('a%d', 'b', 'a'), ('say"hi', 'b', 'a'), ('go', 'a', 'b')])
+        fsm = Machine()
+        for event in ('a%d', 'say"hi'):
+            with self.assertRaises(FysomError) as raised:
+                fsm.trigger(event)
+            self.assertEqual(str(raised.exception),
+                             'event %s inappropriate in current state a'
+                             % event)
+        fsm.go()
+        fsm.trigger('say"hi')
+        self.assertEqual(fsm.current, 'a')
+
+    def test_source_should_be_reusable(self):
+        source = generate_source(self.cfg, class_name='Eater')
+        self.assertTrue('class Eater(GeneratedMachine):' in source)
+        self.assertTrue('def eat(self, *args, **kwargs):' in source)
+
+    def test_conditions_and_timed_events_are_not_supported(self):
+        self.assertRaises(FysomError, build_class,
+                          events=[{'name': 'go', 'src': 'a', 'dst': 'b',
+                                   'cond': 'is_ready'}])
+        self.assertRaises(FysomError, build_class,
+                          events=[{'name': 'go', 'src': 'a', 'dst': 'b',
+                                   'after': 1}])
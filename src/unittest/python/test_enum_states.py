@@ -0,0 +1,129 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import (Fysom, FysomDefinition, FysomError, FysomGlobal,
+                   FysomGlobalMixin, TriggerResult)
+
+try:
+    import enum
+except ImportError:  # pragma: no cover
+    enum = None
+
+if enum is not None:
+    class State(enum.Enum):
+        green = 1
+        yellow = 2
+        red = 3
+
+    class Event(enum.Enum):
+        warn = 1
+        panic = 2
+        calm = 3
+
+    EVENTS = [(Event.warn, State.green, State.yellow),
+              (Event.panic, [State.green, State.yellow], State.red),
+              {'name': Event.calm, 'src': State.red, 'dst': State.yellow}]
+
+
+@unittest.skipIf(enum is None, 'needs the enum module')
+class FysomEnumTests(unittest.TestCase):
+
+    def test_members_should_stand_for_their_names(self):
+        fsm = Fysom(initial=State.green, final=State.red, events=EVENTS)
+        self.assertEqual(fsm.current, 'green')
+        self.assertTrue(fsm.isstate(State.green))
+        self.assertTrue(fsm.can(Event.warn))
+        self.assertFalse(fsm.can(Event.calm))
+        fsm.warn()
+        fsm.trigger(Event.panic)
+        self.assertTrue(fsm.is_finished())
+        fsm.try_trigger(Event.calm)
+        self.assertTrue(fsm.is_state(State.yellow))
+
+    def test_definitions_should_hold_names(self):
+        definition = FysomDefinition(
+            initial={'state': State.green, 'event': Event.calm},
+            events=EVENTS, substates={State.red: ['red.hot']})
+        self.assertEqual(definition.initial,
+                         {'state': 'green', 'event': 'calm'})
+        self.assertEqual(definition.map['panic'],
+                         {'green': 'red', 'yellow': 'red'})
+        self.assertEqual(definition.parents, {'red.hot': 'red'})
+
+    def test_enum_classes_should_catch_unknown_names(self):
+        cfg = {'initial': 'green', 'events': EVENTS,
+               'state_enum': State, 'event_enum': Event}
+        Fysom(cfg)
+        with self.assertRaises(FysomError) as raised:
+            Fysom(dict(cfg, events=EVENTS + [('clear', 'yelow', 'green')]))
+        self.assertEqual(str(raised.exception), 'states not in State: yelow')
+        with self.assertRaises(FysomError) as raised:
+            Fysom(dict(cfg, events=EVENTS + [('clear', 'yellow', 'green')]))
+        self.assertEqual(str(raised.exception), 'events not in Event: clear')
+
+    def test_global_machines_should_accept_members(self):
+        gsm = FysomGlobal(
+            initial=State.green, state_field='state', state_codes=State,
+            events=EVENTS + [{'name': 'alarm', 'src': State.green,
+                              'dst': State.red,
+                              'cond': [{True: 'is_angry',
+                                        'else': State.yellow}]}],
+            callbacks={'is_angry': lambda e: False})
+
+        class Model(FysomGlobalMixin, object):
+            GSM = gsm
+
+            def __init__(self):
+                self.state = None
+                super(Model, self).__init__()
+
+        obj = Model()
+        self.assertEqual(gsm.state_names, ('none', 'green', 'yellow', 'red'))
+        self.assertEqual(obj.state, State.green.value)
+        self.assertTrue(obj.can(Event.warn))
+        gsm.trigger(obj, 'alarm')
+        self.assertTrue(obj.is_state(State.yellow))
+        obj.current = State.red
+        self.assertEqual(obj.state, State.red.value)
+        self.assertEqual(gsm.try_trigger(obj, Event.calm),
+                         TriggerResult.OK)
+        self.assertEqual(obj.current, 'yellow')
+
+    def test_str_enum_members_should_be_used_as_they_are(self):
+        class Light(str, enum.Enum):
+            GREEN = 'green'
+            RED = 'red'
+
+        fsm = Fysom(initial=Light.GREEN, events=[('stop', Light.GREEN,
+                                                  Light.RED)])
+        fsm.stop()
+        self.assertEqual(fsm.current, 'red')
+        self.assertTrue(fsm.isstate(Light.RED))
@@ -0,0 +1,180 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import Fysom, FysomDefinition, FysomError, TriggerResult
+from fysom.regions import FysomRegions
+
+
+class FysomForkTests(unittest.TestCase):
+
+    def setUp(self):
+        self.log = []
+        self.fsm = Fysom({
+            'initial': 'hungry',
+            'final': 'sick',
+            'events': [
+                {'name': 'eat', 'src': 'hungry', 'dst': 'satisfied'},
+                {'name': 'eat', 'src': 'satisfied', 'dst': 'full'},
+                {'name': 'eat', 'src': 'full', 'dst': 'sick'},
+                {'name': 'rest', 'src': '*', 'dst': 'hungry'},
+            ],
+            'callbacks': {
+                'onfull': lambda e: self.log.append(('full', e.fsm)),
+            }
+        })
+
+    def test_fork_should_not_affect_the_original(self):
+        fork = self.fsm.fork()
+        self.assertIsInstance(fork, Fysom)
+        fork.eat()
+        fork.trigger('eat')
+        self.assertEqual(fork.current, 'full')
+        self.assertEqual(self.fsm.current, 'hungry')
+        self.assertEqual(self.log, [('full', fork)])
+        self.assertEqual(fork.try_trigger('rest'), TriggerResult.OK)
+        fork.eat()
+        self.fsm.eat()
+        self.assertEqual((fork.current, self.fsm.current),
+                         ('satisfied', 'satisfied'))
+        self.assertFalse(fork.is_finished())
+        self.assertTrue(fork.can('eat'))
+
+    def test_fork_should_copy_callbacks_on_write(self):
+        fork = self.fsm.fork()
+        fork.onfull = lambda e: self.log.append('fork')
+        fork.onsatisfied = lambda e: self.log.append('satisfied')
+        fork.eat()
+        fork.eat()
+        self.fsm.eat()
+        self.fsm.eat()
+        self.assertEqual(self.log, ['satisfied', 'fork', ('full', self.fsm)])
+        self.assertFalse(hasattr(self.fsm, 'onsatisfied'))
+
+    def test_fork_should_not_depend_on_the_number_of_events(self):
+        small = Fysom(initial='s0', events=[('e0', 's0', 's1')])
+        large = Fysom(initial='s0', events=[
+            ('e%d' % i, 's%d' % i, 's%d' % (i + 1)) for i in range(500)])
+        self.assertEqual(len(vars(small.fork())), len(vars(large.fork())))
+        fork = large.fork()
+        self.assertIs(fork._map, large._map)
+        self.assertIs(type(fork), type(large.fork()))
+
+    def test_forks_of_forks_should_share_the_original_callbacks(self):
+        fork = self.fsm.fork().fork().fork()
+        self.assertIs(fork._fork_parent, self.fsm)
+        fork.eat()
+        own = fork.fork()
+        own.onsatisfied = lambda e: None
+        self.assertIs(own.fork()._fork_parent, own)
+        self.assertEqual(own.fork().current, 'satisfied')
+        self.assertRaises(AttributeError, getattr, fork, 'unknown')
+
+    def test_forks_of_shared_definitions(self):
+        definition = FysomDefinition({
+            'initial': 'a', 'events': [('go', 'a', 'b')]})
+        first, second = Fysom(definition), Fysom(definition)
+        self.assertIs(type(first.fork()), type(second.fork()))
+        fork = first.fork()
+        fork.go()
+        self.assertEqual((fork.current, first.current), ('b', 'a'))
+
+    def test_machines_of_equal_cfgs_should_share_fork_classes(self):
+        cfg = {'initial': 'a', 'events': [('go', 'a', 'b')]}
+        first, second = Fysom(cfg), Fysom(cfg)
+        self.assertIsNot(first._definition, second._definition)
+        self.assertIs(type(first.fork()), type(second.fork()))
+        fork = second.fork()
+        fork.go()
+        self.assertEqual((fork.current, second.current), ('b', 'a'))
+
+    def test_pending_transitions_should_not_be_forked(self):
+        self.fsm.onleavehungry = lambda e: False
+        self.fsm.eat()
+        self.assertRaises(FysomError, self.fsm.fork)
+        self.fsm.transition()
+        self.assertEqual(self.fsm.fork().current, 'satisfied')
+
+    def test_subclass_attributes_should_be_copied(self):
+        class Counter(Fysom):
+            def __init__(self):
+                self.count = 0
+                self.seen = []
+                super(Counter, self).__init__(
+                    initial='a', events=[('go', 'a', 'b')], history=5)
+
+            def onb(self, e):
+                self.count += 1
+
+        counter = Counter()
+        fork = counter.fork()
+        fork.go()
+        self.assertEqual((fork.count, counter.count), (1, 0))
+        self.assertIs(fork.seen, counter.seen)
+        self.assertIsNone(fork.history)
+        self.assertEqual(fork.fork().count, 1)
+
+    def test_subclass_attributes_should_be_read_until_written(self):
+        class Counter(Fysom):
+            def __init__(self):
+                self.count = 0
+                super(Counter, self).__init__(
+                    initial='a', events=[('go', 'a', 'b'), ('back', 'b', 'a')])
+
+            def onb(self, e):
+                self.count += 1
+
+        counter = Counter()
+        fork = counter.fork()
+        fork.go()
+        self.assertEqual((fork.count, counter.count), (1, 0))
+        refork = fork.fork()
+        self.assertIs(refork._fork_parent, fork)
+        refork.back()
+        refork.go()
+        self.assertEqual((refork.count, fork.count), (2, 1))
+        self.assertIs(counter.fork().fork()._fork_parent, counter)
+
+    def test_pending_transitions_of_the_parent_should_not_leak(self):
+        fork = self.fsm.fork()
+        self.fsm.onleavehungry = lambda e: False
+        self.fsm.eat()
+        self.assertFalse(hasattr(fork, 'transition'))
+        self.assertTrue(fork.can('eat'))
+
+    def test_regions_should_fork(self):
+        fsm = FysomRegions({
+            'light': {'initial': 'off', 'events': [('switch', 'off', 'on')]},
+            'door': {'initial': 'closed', 'events': [('open', 'closed',
+                                                      'opened')]}})
+        fork = fsm.fork()
+        fork.switch()
+        self.assertEqual(fork.current, ('on', 'closed'))
+        self.assertEqual(fsm.current, ('off', 'closed'))
@@ -30,7 +30,7 @@
 import unittest
 import gc
 
-from fysom import Fysom
+from fysom import Fysom, FysomDefinition, FysomGlobal, _weak_callback
 
 
 class FysomGarbageCollectionTests(unittest.TestCase):
@@ -132,3 +132,83 @@ class FysomGarbageCollectionTests(unittest.TestCase):
         obj.clear()
         del obj
         fsm.warn()
+
+    def test_weak_callbacks_should_forward_arguments(self):
+        class Listener(object):
+            def on_green(self, *args, **kwargs):
+                return args, kwargs
+
+        listener = Listener()
+        fsm = Fysom(initial='green', callbacks={'ongreen': listener.on_green})
+        self.assertEqual(fsm.ongreen('e'), (('e',), {}))
+        self.assertEqual(fsm.ongreen(), ((), {}))
+        self.assertEqual(fsm.ongreen('e', 1, k=2), (('e', 1), {'k': 2}))
+        self.assertEqual(fsm.ongreen(k=2), ((), {'k': 2}))
+
+    def test_weak_callback_of_dead_object_should_return_none(self):
+        class Listener(object):
+            def on_green(self, event):
+                return event
+
+        listener = Listener()
+        callback = _weak_callback(listener.on_green)
+        self.assertEqual(callback('e'), 'e')
+        del listener
+        gc.collect()
+        self.assertEqual(callback('e'), None)
+
+    def test_dead_callbacks_should_be_removed_from_machines(self):
+        class Listener(object):
+            def on_green(self, event):
+                pass
+
+        listener, other = Listener(), Listener()
+        definition = FysomDefinition(initial='green',
+                                     callbacks={'ongreen': listener.on_green})
+        first = Fysom(definition)
+        second = Fysom(definition, callbacks={'onleavegreen': other.on_green})
+        gsm = FysomGlobal(initial='green', state_field='state',
+                          callbacks={'ongreen': listener.on_green,
+                                     'onleavegreen': other.on_green})
+        del listener
+        gc.collect()
+        self.assertFalse('ongreen' in definition.callbacks)
+        self.assertFalse(hasattr(first, 'ongreen'))
+        self.assertFalse(hasattr(second, 'ongreen'))
+        self.assertTrue(hasattr(second, 'onleavegreen'))
+        self.assertEqual(list(gsm._callbacks), ['onleavegreen'])
+        del other
+        gc.collect()
+        self.assertFalse(hasattr(second, 'onleavegreen'))
+        self.assertEqual(gsm._callbacks, {})
+
+    def test_replaced_callbacks_should_not_be_removed(self):
+        class Listener(object):
+            def on_green(self, event):
+                pass
+
+        listener = Listener()
+        fsm = Fysom(initial='green', callbacks={'ongreen': listener.on_green})
+        replacement = lambda e: None  # noqa
+        fsm.ongreen = replacement
+        del listener
+        gc.collect()
+        self.assertTrue(fsm.ongreen is replacement)
+
+    def test_strong_callbacks_should_keep_object_alive(self):
+        class Listener(object):
+            def on_green(self, event):
+                pass
+
+        listener = Listener()
+        fsm = Fysom(initial='green', callbacks={'ongreen': listener.on_green},
+                    weak_callbacks=False)
+        gsm = FysomGlobal(initial='green', state_field='state',
+                          callbacks={'ongreen': listener.on_green},
+                          weak_callbacks=False)
+        self.assertEqual(fsm.ongreen, listener.on_green)
+        self.assertEqual(gsm._callbacks['ongreen'], listener.on_green)
+        del listener
+        gc.collect()
+        self.assertEqual(len(list(filter(lambda o: isinstance(o, Listener),
+                                         gc.get_objects()))), 1)
@@ -0,0 +1,142 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import threading
+import unittest
+
+from fysom import Canceled, FysomError, FysomGlobal, FysomGlobalMixin
+from fysom.metrics import GlobalMetrics
+
+
+def is_angry(e):
+    return getattr(e, 'angry', False)
+
+
+class Model(FysomGlobalMixin, object):
+    GSM = None
+
+    def __init__(self, state=None):
+        self.state = state
+        super(Model, self).__init__()
+
+    def is_ready(self, e):
+        return getattr(e, 'ready', True)
+
+
+class FysomGlobalMetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        Model.GSM = FysomGlobal(
+            events=[('warn', 'green', 'yellow'),
+                    {'name': 'panic', 'src': 'yellow', 'dst': 'red',
+                     'cond': [{True: is_angry}, 'is_ready']},
+                    ('calm', 'red', 'yellow'),
+                    ('blink', 'yellow', 'yellow')],
+            callbacks={'onbeforecalm': lambda e: getattr(e, 'calm', True)},
+            initial='green', state_field='state', metrics=True)
+        self.metrics = Model.GSM.metrics
+
+    def test_population_should_follow_transitions(self):
+        models = [Model() for _ in range(3)]
+        models[0].warn()
+        models[1].warn()
+        models[1].blink()
+        self.assertEqual(self.metrics.population(),
+                         {'green': 1, 'yellow': 2})
+        self.assertEqual(self.metrics.population('red'), 0)
+        self.assertEqual(self.metrics.read('transitions'),
+                         {'startup': 3, 'warn': 2, 'blink': 1})
+
+    def test_population_should_follow_restored_and_assigned_states(self):
+        Model()
+        Model('yellow')
+        model = Model('red')
+        model.current = 'yellow'
+        model.current = 'yellow'
+        self.assertEqual(self.metrics.population(),
+                         {'green': 1, 'yellow': 2, 'red': 0})
+        self.assertEqual(self.metrics.read('transitions'), {'startup': 1})
+
+    def test_cancellations_and_invalid_events_should_be_counted(self):
+        model = Model()
+        self.assertRaises(FysomError, model.calm)
+        model.warn()
+        self.assertRaises(Canceled, model.panic)
+        self.assertRaises(Canceled, model.panic, angry=True, ready=False)
+        model.panic(angry=True)
+        self.assertRaises(Canceled, model.calm, calm=False)
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['invalid'], {'calm': 1})
+        self.assertEqual(snapshot['canceled'], {'panic': 2, 'calm': 1})
+        self.assertEqual(snapshot['conditions'],
+                         {'is_angry': 1, 'is_ready': 1})
+        self.assertEqual(snapshot['population'],
+                         {'green': 0, 'yellow': 0, 'red': 1})
+
+    def test_counters_of_threads_should_be_merged(self):
+        def run():
+            for _ in range(100):
+                Model().warn()
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.metrics.population(),
+                         {'green': 0, 'yellow': 400})
+        self.assertEqual(len(self.metrics._shards), 4)
+
+    def test_adjust_and_reset(self):
+        Model()
+        self.metrics.adjust('green', -1)
+        self.assertEqual(self.metrics.population(), {'green': 0})
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(),
+                         dict((kind, {}) for kind in GlobalMetrics.KINDS))
+
+    def test_metrics_should_be_shared_or_disabled(self):
+        metrics = GlobalMetrics()
+        gsm = FysomGlobal(events=[('warn', 'green', 'yellow')],
+                          initial='green', state_field='state',
+                          metrics=metrics)
+        self.assertIs(gsm.metrics, metrics)
+        gsm = FysomGlobal(events=[('warn', 'green', 'yellow')],
+                          initial='green', state_field='state')
+        self.assertIsNone(gsm.metrics)
+
+    def test_event_named_metrics_should_not_disable_them(self):
+        metrics = GlobalMetrics()
+        gsm = FysomGlobal(events=[('metrics', 'green', 'yellow')],
+                          initial='green', state_field='state',
+                          metrics=metrics)
+        model = Model('green')
+        gsm.metrics(model)
+        self.assertEqual(model.state, 'yellow')
+        self.assertEqual(metrics.read('transitions'), {'metrics': 1})
@@ -0,0 +1,128 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import Canceled, FysomError, FysomGlobal, FysomGlobalMixin
+from fysom.simulate import transition_table
+from fysom.stream import StreamProcessor
+
+
+class Model(object):
+
+    def __init__(self, state=None):
+        self.state = state
+
+
+class FysomGlobalMultiSourceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.gsm = FysomGlobal(
+            events=[('repair', 'broken', 'idle'),
+                    {'name': 'repair', 'src': 'damaged', 'dst': 'running',
+                     'cond': 'has_parts'},
+                    ('stop', ['running', 'idle'], 'off'),
+                    ('stop', 'broken', '='),
+                    ('ping', '*', '=')],
+            callbacks={'has_parts': lambda e: e.kwargs.get('parts', True)},
+            initial='idle',
+            state_field='state')
+
+    def test_sources_should_have_their_own_destinations(self):
+        broken, damaged = Model('broken'), Model('damaged')
+        self.gsm.repair(broken)
+        self.gsm.repair(damaged)
+        self.assertEqual(broken.state, 'idle')
+        self.assertEqual(damaged.state, 'running')
+
+    def test_sources_should_have_their_own_conditions(self):
+        broken, damaged = Model('broken'), Model('damaged')
+        self.gsm.repair(broken, parts=False)
+        self.assertEqual(broken.state, 'idle')
+        self.assertRaises(Canceled, self.gsm.repair, damaged, parts=False)
+        self.assertEqual(damaged.state, 'damaged')
+
+    def test_same_destination_should_keep_the_state(self):
+        broken = Model('broken')
+        self.gsm.stop(broken)
+        self.assertEqual(broken.state, 'broken')
+        self.gsm.ping(broken)
+        self.assertEqual(broken.state, 'broken')
+        running = Model('running')
+        self.gsm.stop(running)
+        self.assertEqual(running.state, 'off')
+
+    def test_can_should_use_the_compiled_table(self):
+        self.assertTrue(self.gsm.can(Model('damaged'), 'repair'))
+        self.assertFalse(self.gsm.can(Model('off'), 'repair'))
+        self.assertTrue(self.gsm.can(Model('off'), 'ping'))
+        self.assertIn(('damaged', 'repair'), self.gsm._table)
+        self.assertRaises(FysomError, self.gsm.repair, Model('off'))
+
+    def test_single_definition_should_share_its_transition(self):
+        sources = self.gsm._map['stop']
+        self.assertIs(sources['running'], sources['idle'])
+        self.assertEqual(sources['running'], {'dst': 'off'})
+
+    def test_substates_should_inherit_per_source_transitions(self):
+        gsm = FysomGlobal(
+            events=[('fix', 'faulty', 'ok'),
+                    ('fix', 'faulty.cable', 'rewired')],
+            substates={'faulty': ['faulty.cable', 'faulty.fuse']},
+            initial='ok', state_field='state')
+        cable, fuse = Model('faulty.cable'), Model('faulty.fuse')
+        gsm.fix(cable)
+        gsm.fix(fuse)
+        self.assertEqual((cable.state, fuse.state), ('rewired', 'ok'))
+
+    def test_mixin_models_should_fire_per_source_events(self):
+        gsm = self.gsm
+
+        class Machine(FysomGlobalMixin, object):
+            GSM = gsm
+
+            def __init__(self):
+                self.state = None
+                super(Machine, self).__init__()
+
+        machine = Machine()
+        machine.stop()
+        self.assertEqual(machine.current, 'off')
+
+    def test_tables_of_other_modules_should_follow_sources(self):
+        table = transition_table(self.gsm)
+        self.assertEqual(table['repair'],
+                         {'broken': 'idle', 'damaged': 'running'})
+        gsm = FysomGlobal(events=[('go', 'a', 'b'), ('go', 'b', 'c')],
+                          initial='a', state_field='state')
+        records = list(StreamProcessor(gsm).process(
+            [('k', 'go'), ('k', 'go'), ('k', 'go')]))
+        self.assertEqual([(r.src, r.dst, r.ok) for r in records],
+                         [('a', 'b', True), ('b', 'c', True),
+                          ('c', 'c', False)])
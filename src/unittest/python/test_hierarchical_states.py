@@ -0,0 +1,172 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import (Fysom, FysomDefinition, FysomError, FysomGlobal,
+                   FysomGlobalMixin)
+
+
+class FysomHierarchicalStateTests(unittest.TestCase):
+
+    def setUp(self):
+        self.definition = FysomDefinition({
+            'initial': 'idle',
+            'substates': {
+                'active': ['active.running', 'active.paused'],
+            },
+            'events': [
+                {'name': 'start', 'src': 'idle', 'dst': 'active.running'},
+                {'name': 'pause', 'src': 'active.running',
+                 'dst': 'active.paused'},
+                {'name': 'resume', 'src': 'active.paused',
+                 'dst': 'active.running'},
+                {'name': 'stop', 'src': 'active', 'dst': 'idle'},
+                {'name': 'poke', 'src': 'active', 'dst': '='},
+                {'name': 'poke', 'src': 'active.paused',
+                 'dst': 'active.running'}
+            ]
+        })
+        self.logs = []
+
+    def _fsm(self):
+        fsm = Fysom(self.definition)
+        for kind in ('enter', 'leave', 'reenter'):
+            for state in ('idle', 'active', 'active.running',
+                          'active.paused'):
+                name = 'on%s%s' % (kind, state)
+                setattr(fsm, name,
+                        lambda e, name=name: self.logs.append(name))
+        return fsm
+
+    def test_parent_events_should_apply_to_children(self):
+        fsm = self._fsm()
+        fsm.start()
+        fsm.stop()
+        self.assertEqual(fsm.current, 'idle')
+        fsm.start()
+        fsm.pause()
+        fsm.stop()
+        self.assertEqual(fsm.current, 'idle')
+        self.assertRaises(FysomError, fsm.stop)
+
+    def test_child_transition_should_override_parent(self):
+        fsm = self._fsm()
+        fsm.start()
+        fsm.poke()
+        self.assertEqual(fsm.current, 'active.running')
+        fsm.pause()
+        fsm.poke()
+        self.assertEqual(fsm.current, 'active.running')
+
+    def test_entering_child_should_enter_parent_first(self):
+        fsm = self._fsm()
+        fsm.start()
+        self.assertEqual(self.logs, ['onleaveidle', 'onenteractive',
+                                     'onenteractive.running'])
+
+    def test_moving_between_siblings_should_not_leave_parent(self):
+        fsm = self._fsm()
+        fsm.start()
+        self.logs = []
+        fsm.pause()
+        self.assertEqual(self.logs, ['onleaveactive.running',
+                                     'onenteractive.paused'])
+
+    def test_leaving_child_should_leave_parent_last(self):
+        fsm = self._fsm()
+        fsm.start()
+        self.logs = []
+        fsm.stop()
+        self.assertEqual(self.logs, ['onleaveactive.running',
+                                     'onleaveactive', 'onenteridle'])
+
+    def test_parent_leave_handler_can_defer_transition(self):
+        fsm = self._fsm()
+        fsm.start()
+        fsm.onleaveactive = lambda e: False
+        fsm.stop()
+        self.assertEqual(fsm.current, 'active.running')
+        fsm.transition()
+        self.assertEqual(fsm.current, 'idle')
+
+    def test_definition_should_be_shared_between_machines(self):
+        first = Fysom(self.definition)
+        second = Fysom(self.definition)
+        self.assertTrue(first._map is second._map)
+        first.start()
+        self.assertEqual(first.current, 'active.running')
+        self.assertEqual(second.current, 'idle')
+
+    def test_definition_should_not_be_overridden(self):
+        self.assertRaises(FysomError, Fysom, self.definition,
+                          initial='active')
+
+    def test_substates_kwarg(self):
+        fsm = Fysom(initial='a.x',
+                    substates={'a': ['a.x', 'a.y']},
+                    events=[('go', 'a', 'b')])
+        fsm.go()
+        self.assertEqual(fsm.current, 'b')
+
+
+class FysomGlobalHierarchicalStateTests(unittest.TestCase):
+
+    def setUp(self):
+        class Model(FysomGlobalMixin, object):
+            GSM = FysomGlobal(
+                initial='idle',
+                substates={'active': ['running', 'paused']},
+                events=[('start', 'idle', 'running'),
+                        ('pause', 'running', 'paused'),
+                        ('stop', 'active', 'idle')],
+                state_field='state'
+            )
+
+            def __init__(self):
+                self.state = None
+                self.logs = []
+                super(Model, self).__init__()
+
+            def onleaveactive(self, e):
+                self.logs.append('leave active')
+
+            def onenteractive(self, e):
+                self.logs.append('enter active')
+
+        self.Model = Model
+
+    def test_parent_events_should_apply_to_children(self):
+        obj = self.Model()
+        obj.start()
+        obj.pause()
+        self.assertTrue(obj.can('stop'))
+        obj.stop()
+        self.assertTrue(obj.is_state('idle'))
+        self.assertEqual(obj.logs, ['enter active', 'leave active'])
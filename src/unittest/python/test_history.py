@@ -0,0 +1,152 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import threading
+import unittest
+
+from fysom import Fysom, FysomError, FysomGlobal, FysomGlobalMixin
+from fysom.history import History, code, history_of, name
+from fysom.stores import MemoryStore
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+class Light(FysomGlobalMixin, object):
+    GSM = FysomGlobal(
+        events=[('warn', 'green', 'yellow'), ('clear', 'yellow', 'green')],
+        initial='green', state_field='state', history=2)
+
+    def __init__(self):
+        self.state = None
+        super(Light, self).__init__()
+
+
+class FysomHistoryTests(unittest.TestCase):
+
+    def test_ring_buffer_should_keep_the_last_entries(self):
+        history = History(3, clock=Clock())
+        self.assertEqual(history.entries(), [])
+        for i in range(5):
+            history.record('e%d' % i, 's%d' % i, 's%d' % (i + 1))
+        self.assertEqual((len(history), history.count, history.dropped),
+                         (3, 5, 2))
+        self.assertEqual(list(history), [('e2', 's2', 's3', 3.0),
+                                         ('e3', 's3', 's4', 4.0),
+                                         ('e4', 's4', 's5', 5.0)])
+        exported = history.export()
+        self.assertEqual([exported['names'][c] for c in exported['event']],
+                         ['e2', 'e3', 'e4'])
+        self.assertEqual(list(exported['timestamp']), [3.0, 4.0, 5.0])
+        history.clear()
+        self.assertEqual(history.entries(), [])
+        self.assertRaises(ValueError, History, 0)
+
+    def test_names_should_share_codes(self):
+        self.assertEqual(code('green'), code('green'))
+        self.assertEqual(name(code('green')), 'green')
+
+    def test_concurrent_allocations_should_agree(self):
+        names = ['concurrent-%d' % i for i in range(200)]
+        results = []
+
+        def allocate():
+            results.append([code(n) for n in names])
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(codes == results[0] for codes in results))
+        self.assertEqual([name(c) for c in results[0]], names)
+
+    def test_machine_should_record_its_transitions(self):
+        fsm = Fysom(initial='green', history=3,
+                    events=[('warn', 'green', 'yellow'),
+                            ('stay', 'yellow', '='),
+                            ('clear', 'yellow', 'green')])
+        fsm.warn()
+        fsm.stay()
+        self.assertEqual([entry[:3] for entry in fsm.history.entries()], [
+            ('startup', 'none', 'green'), ('warn', 'green', 'yellow'),
+            ('stay', 'yellow', 'yellow')])
+        fsm.clear()
+        self.assertEqual(fsm.history.entries()[-1][:3],
+                         ('clear', 'yellow', 'green'))
+        self.assertEqual(fsm.history.dropped, 1)
+
+    def test_history_should_be_disabled_by_default(self):
+        fsm = Fysom(initial='green', events=[('warn', 'green', 'yellow')])
+        fsm.warn()
+        self.assertIsNone(fsm.history)
+
+    def test_pending_transitions_should_be_recorded_when_completed(self):
+        fsm = Fysom(initial='green', history=2,
+                    events=[('warn', 'green', 'yellow')],
+                    callbacks={'onleavegreen': lambda e: False})
+        fsm.warn()
+        self.assertEqual(len(fsm.history), 1)
+        fsm.transition()
+        self.assertEqual(fsm.history.entries()[-1][:3],
+                         ('warn', 'green', 'yellow'))
+
+    def test_global_machine_should_record_per_object(self):
+        light, other = Light(), Light()
+        light.warn()
+        light.clear()
+        self.assertEqual([entry[:3] for entry in light.history().entries()], [
+            ('warn', 'green', 'yellow'), ('clear', 'yellow', 'green')])
+        self.assertEqual(len(other.history()), 1)
+        gsm = FysomGlobal(events=[('warn', 'green', 'yellow')],
+                          initial='green', state_field='state')
+        self.assertIsNone(gsm.history(object()))
+
+    def test_event_named_history_should_not_break_recording(self):
+        fsm = Fysom(initial='a', history=4,
+                    events=[('history', 'a', 'b'), ('back', 'b', 'a')])
+        fsm.history()
+        fsm.back()
+        self.assertEqual([entry[:3] for entry in history_of(fsm).entries()], [
+            ('startup', 'none', 'a'), ('history', 'a', 'b'),
+            ('back', 'b', 'a')])
+        light = Light()
+        self.assertIs(history_of(Light.GSM, light), light.history())
+
+    def test_history_should_be_rejected_with_a_store(self):
+        self.assertRaises(FysomError, FysomGlobal,
+                          events=[('warn', 'green', 'yellow')],
+                          initial='green', store=MemoryStore(), history=4)
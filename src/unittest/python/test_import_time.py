@@ -0,0 +1,87 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import os
+import subprocess
+import sys
+import unittest
+
+import fysom
+
+# Budget for "from fysom import Fysom" in a fresh interpreter, including the
+# modules fysom imports that are not loaded at startup. It is well above the
+# few milliseconds this takes, to leave room for slow or loaded machines.
+IMPORT_BUDGET_US = 50000
+
+LAZY_MODULES = ['fysom.codegen', 'fysom.coalesce', 'fysom.history',
+                'fysom.index', 'fysom.loader', 'fysom.metrics',
+                'fysom.pool', 'fysom.profiling', 'fysom.regions',
+                'fysom.simulate', 'fysom.stores', 'fysom.stream',
+                'fysom.timers', 'fysom.validation']
+
+
+def run_python(code, *options):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+    return subprocess.check_output(
+        [sys.executable] + list(options) + ['-c', code],
+        stderr=subprocess.STDOUT, env=env).decode('utf-8')
+
+
+class FysomImportTimeTests(unittest.TestCase):
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'needs -X importtime')
+    def test_import_should_stay_under_budget(self):
+        output = run_python('from fysom import Fysom', '-X', 'importtime')
+        timings = [line.split('|') for line in output.splitlines()
+                   if line.startswith('import time:')]
+        cumulative = dict((name.strip(), int(total))
+                          for _, total, name in timings[1:])
+        self.assertIn('fysom', cumulative)
+        self.assertLess(cumulative['fysom'], IMPORT_BUDGET_US)
+
+    def test_import_should_not_load_optional_subsystems(self):
+        output = run_python(
+            'import sys; from fysom import Fysom; '
+            'print(sorted(m for m in sys.modules if m.startswith("fysom")))')
+        for name in LAZY_MODULES:
+            self.assertNotIn(repr(name), output)
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'needs PEP 562')
+    def test_optional_subsystems_should_load_on_first_access(self):
+        from fysom.regions import FysomRegions
+        from fysom.timers import TimerWheel
+        self.assertIs(fysom.FysomRegions, FysomRegions)
+        self.assertIs(fysom.TimerWheel, TimerWheel)
+        self.assertIs(fysom.codegen, sys.modules['fysom.codegen'])
+        self.assertIn('coalesce', dir(fysom))
+
+    def test_unknown_attribute_should_raise_attribute_error(self):
+        self.assertRaises(AttributeError, getattr, fysom, 'no_such_thing')
+        self.assertFalse(hasattr(fysom, 'no_such_thing'))
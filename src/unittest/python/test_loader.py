@@ -0,0 +1,169 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from fysom import Fysom, FysomDefinition, FysomError
+from fysom import loader
+
+CONFIG = {
+    'initial': 'green',
+    'final': 'red',
+    'events': [
+        {'name': 'warn', 'src': 'green', 'dst': 'yellow'},
+        {'name': 'panic', 'src': ['green', 'yellow'], 'dst': 'red'},
+        ['calm', 'yellow', 'green'],
+    ],
+}
+
+YAML_CONFIG = '''
+initial: green
+events:
+  - {name: warn, src: green, dst: yellow}
+  - [calm, yellow, green]
+'''
+
+
+class FysomLoaderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = os.path.join(self.directory, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as out:
+            out.write(content)
+        return path
+
+    def test_json_definition_should_drive_machines(self):
+        path = self.write('light.json', json.dumps(CONFIG))
+        fsm = Fysom(loader.load_definition(path))
+        self.assertEqual(fsm.current, 'green')
+        fsm.warn()
+        fsm.calm()
+        fsm.panic()
+        self.assertTrue(fsm.is_finished())
+
+    def test_cached_definition_should_not_be_parsed_again(self):
+        path = self.write('light.json', json.dumps(CONFIG))
+        first = loader.load_definition(path, self.cache)
+        self.assertEqual(len(os.listdir(self.cache)), 1)
+        parse = loader.parse_config
+        loader.parse_config = None
+        try:
+            second = loader.load_definition(path, self.cache)
+        finally:
+            loader.parse_config = parse
+        self.assertIsNot(first, second)
+        self.assertEqual(second.map, first.map)
+        fsm = Fysom(second)
+        fsm.warn()
+        self.assertEqual(fsm.current, 'yellow')
+
+    def test_changed_file_should_miss_the_cache(self):
+        path = self.write('light.json', json.dumps(CONFIG))
+        loader.load_definition(path, self.cache)
+        changed = dict(CONFIG, initial='yellow')
+        self.write('light.json', json.dumps(changed))
+        definition = loader.load_definition(path, self.cache)
+        self.assertEqual(Fysom(definition).current, 'yellow')
+        self.assertEqual(len(os.listdir(self.cache)), 2)
+
+    def test_corrupted_cache_entry_should_be_rebuilt(self):
+        path = self.write('light.json', json.dumps(CONFIG))
+        loader.load_definition(path, self.cache)
+        entry = os.path.join(self.cache, os.listdir(self.cache)[0])
+        with open(entry, 'wb') as out:
+            out.write(b'garbage')
+        definition = loader.load_definition(path, self.cache)
+        self.assertEqual(Fysom(definition).current, 'green')
+        with open(entry, 'rb') as source:
+            self.assertIsInstance(pickle.load(source), FysomDefinition)
+
+    def test_entry_written_concurrently_should_be_kept(self):
+        path = self.write('light.json', json.dumps(CONFIG))
+
+        def lost_race(source, target):
+            with open(target, 'wb') as out:
+                out.write(b'written by another process')
+            raise OSError('target exists')
+
+        replace = loader._replace
+        loader._replace = lost_race
+        try:
+            definition = loader.load_definition(path, self.cache)
+        finally:
+            loader._replace = replace
+        self.assertEqual(Fysom(definition).current, 'green')
+        self.assertEqual(len(os.listdir(self.cache)), 1)
+
+    def test_yaml_definition_should_load(self):
+        if loader.yaml is None:
+            self.skipTest('PyYAML is not installed')
+        path = self.write('light.yml', YAML_CONFIG)
+        fsm = Fysom(loader.load_definition(path, self.cache))
+        fsm.warn()
+        self.assertEqual(fsm.current, 'yellow')
+
+    def test_invalid_configs_should_raise_naming_the_file(self):
+        for content in ('{"events": [', '[]', '{"events": {}}',
+                        '{"events": [{"name": "a"}]}',
+                        '{"events": [["a", "b"]]}'):
+            path = self.write('bad.json', content)
+            with self.assertRaises(FysomError) as raised:
+                loader.load_definition(path, self.cache)
+            self.assertIn('bad.json', str(raised.exception))
+
+    def test_load_directory_should_key_definitions_by_name(self):
+        self.write('light.json', json.dumps(CONFIG))
+        self.write('door.json', json.dumps(
+            {'initial': 'closed', 'events': [['open', 'closed', 'opened']]}))
+        self.write('notes.txt', 'ignored')
+        definitions = loader.load_directory(self.directory, self.cache)
+        self.assertEqual(sorted(definitions), ['door', 'light'])
+        self.assertEqual(Fysom(definitions['door']).current, 'closed')
+
+    def test_definitions_should_pickle_without_machine_registrations(self):
+        definition = FysomDefinition(CONFIG)
+        fsm = Fysom(definition)
+        fsm.fork()
+        copy = pickle.loads(pickle.dumps(definition))
+        self.assertEqual(copy.map, definition.map)
+        self.assertEqual(len(copy._machines), 0)
+        self.assertEqual(copy._fork_classes, {})
+        self.assertEqual(Fysom(copy).current, 'green')
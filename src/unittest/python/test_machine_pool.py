@@ -0,0 +1,136 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import (Fysom, FysomDefinition, FysomGlobal, FysomGlobalMixin,
+                   TriggerResult)
+from fysom.pool import MachinePool
+from fysom.stores import MemoryStore
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Order(FysomGlobalMixin, object):
+    GSM = FysomGlobal(
+        events=[('pay', 'new', 'paid'), ('ship', 'paid', 'shipped')],
+        initial='new', state_field='state')
+
+    def __init__(self, key):
+        self.key = key
+        self.state = None
+        super(Order, self).__init__()
+
+
+class FysomMachinePoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.definition = FysomDefinition({
+            'initial': 'new',
+            'events': [('pay', 'new', 'paid'), ('ship', 'paid', 'shipped')]})
+        self.store = MemoryStore({'old': 'paid'})
+        self.clock = Clock()
+        self.created = []
+
+        def factory(key):
+            self.created.append(key)
+            return Fysom(self.definition)
+
+        self.pool = MachinePool(factory, self.store, capacity=2, ttl=10,
+                                clock=self.clock)
+
+    def test_machines_should_be_materialized_from_the_store(self):
+        self.assertEqual(self.pool.get('old').current, 'paid')
+        self.assertEqual(self.pool['new'].current, 'new')
+        self.assertIs(self.pool.get('old'), self.pool.get('old'))
+        self.assertEqual(self.created, ['old', 'new'])
+        stats = self.pool.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']),
+                         (2, 2, 2))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_least_recently_used_machines_should_be_evicted_and_saved(self):
+        self.pool.trigger('a', 'pay')
+        self.pool.get('old')
+        self.pool.get('b')
+        self.assertNotIn('a', self.pool)
+        self.assertEqual(self.store.states, {'old': 'paid', 'a': 'paid'})
+        self.pool.get('c')
+        self.assertEqual(list(self.pool._entries), ['b', 'c'])
+        self.assertEqual(self.store.states, {'old': 'paid', 'a': 'paid'})
+        self.assertEqual(self.pool.stats()['evictions'], 2)
+        self.assertEqual(self.pool.stats()['writes'], 1)
+        self.assertEqual(self.pool.try_trigger('a', 'ship'),
+                         TriggerResult.OK)
+        self.assertEqual(self.pool.try_trigger('a', 'ship'),
+                         TriggerResult.INVALID)
+
+    def test_unused_machines_should_expire(self):
+        self.pool.trigger('a', 'pay')
+        self.clock.now = 5
+        self.pool.get('old')
+        self.clock.now = 12
+        self.pool.expire()
+        self.assertEqual(list(self.pool._entries), ['old'])
+        self.assertEqual(self.store.states['a'], 'paid')
+        self.clock.now = 16
+        machine = self.pool.get('old')
+        self.assertEqual(self.created, ['a', 'old', 'old'])
+        self.assertEqual(machine.current, 'paid')
+        self.assertEqual(self.pool.stats()['expirations'], 2)
+
+    def test_flush_should_save_changed_states_in_bulk(self):
+        self.pool.preload(['old', 'a'])
+        self.assertEqual(self.pool.stats()['misses'], 2)
+        self.pool.trigger('old', 'ship')
+        self.pool.flush()
+        self.assertEqual(self.store.states, {'old': 'shipped', 'a': 'new'})
+        self.pool.flush()
+        self.assertEqual(self.pool.stats()['writes'], 2)
+        self.pool.evict('a')
+        self.pool.clear()
+        self.assertEqual(len(self.pool), 0)
+        self.assertEqual(self.pool.stats()['writes'], 2)
+
+    def test_global_machine_objects_should_be_pooled(self):
+        store = MemoryStore({1: 'paid'})
+        pool = MachinePool(Order, store, capacity=1)
+        pool.trigger(1, 'ship')
+        self.assertEqual(pool.get(1).state, 'shipped')
+        pool.get(2)
+        self.assertEqual(store.states, {1: 'shipped'})
+        pool.clear()
+        self.assertEqual(store.states, {1: 'shipped', 2: 'new'})
@@ -0,0 +1,136 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import Fysom, FysomGlobal, FysomGlobalMixin
+from fysom.profiling import SamplingProfiler, TABLE_HEADER
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.5
+        return self.now
+
+
+def is_ready(e):
+    return True
+
+
+class Model(FysomGlobalMixin, object):
+    GSM = None
+
+    def __init__(self):
+        self.state = None
+        super(Model, self).__init__()
+
+    def on_enter_yellow(self, e):
+        pass
+
+
+class FysomProfilingTests(unittest.TestCase):
+
+    def make_fsm(self, profiler):
+        return Fysom(initial='green', profiler=profiler,
+                     events=[('warn', 'green', 'yellow'),
+                             ('blink', 'yellow', 'yellow')],
+                     callbacks={'onbeforewarn': lambda e: None,
+                                'onleavegreen': lambda e: None,
+                                'onyellow': lambda e: None,
+                                'onchangestate': lambda e: None,
+                                'onreenteryellow': lambda e: None})
+
+    def test_sampled_transitions_should_be_timed_per_callback(self):
+        profiler = SamplingProfiler(rate=1, clock=Clock())
+        fsm = self.make_fsm(profiler)
+        fsm.warn()
+        fsm.blink()
+        self.assertEqual((profiler.seen, profiler.sampled), (3, 3))
+        self.assertEqual(sorted(profiler.stats), [
+            ('before', 'warn', 'green', 'onbeforewarn'),
+            ('change', 'startup', 'green', 'onchangestate'),
+            ('change', 'warn', 'yellow', 'onchangestate'),
+            ('enter', 'warn', 'yellow', 'onyellow'),
+            ('leave', 'warn', 'green', 'onleavegreen'),
+            ('reenter', 'blink', 'yellow', 'onreenteryellow')])
+        self.assertEqual(profiler.stats[
+            ('enter', 'warn', 'yellow', 'onyellow')], [1, 0.5, 0.5])
+        self.assertEqual(fsm.current, 'yellow')
+
+    def test_other_transitions_should_not_be_timed(self):
+        draws = iter([0.5, 0.005, 0.5])
+        profiler = SamplingProfiler(rate=0.01, clock=Clock(),
+                                    random=lambda: next(draws))
+        fsm = self.make_fsm(profiler)
+        fsm.warn()
+        fsm.blink()
+        self.assertEqual((profiler.seen, profiler.sampled), (3, 1))
+        self.assertEqual(set(key[1] for key in profiler.stats), {'warn'})
+
+    def test_global_machine_conditions_should_be_timed(self):
+        profiler = SamplingProfiler(rate=1, clock=Clock())
+        Model.GSM = FysomGlobal(
+            events=[{'name': 'warn', 'src': 'green', 'dst': 'yellow',
+                     'cond': is_ready}],
+            callbacks={'on_before_warn': lambda e: None},
+            initial='green', state_field='state', profiler=profiler)
+        model = Model()
+        model.warn()
+        self.assertEqual(sorted(profiler.stats), [
+            ('before', 'warn', 'green', 'on_before_warn'),
+            ('condition', 'warn', 'green', 'is_ready'),
+            ('enter', 'warn', 'yellow', 'on_enter_yellow')])
+        self.assertEqual(model.current, 'yellow')
+
+    def test_exports(self):
+        profiler = SamplingProfiler(rate=1, clock=Clock())
+        self.make_fsm(profiler).warn()
+        profiler.stats[('enter', 'warn', 'yellow', 'onyellow')] = [2, 3.0, 2.0]
+        table = profiler.table()
+        self.assertEqual(len(TABLE_HEADER), len(table[0]))
+        self.assertEqual(table[0], ('enter', 'warn', 'yellow', 'onyellow',
+                                    2, 3.0, 1.5, 2.0))
+        lines = profiler.collapsed().splitlines()
+        self.assertIn('fysom;warn;enter yellow;onyellow 3000000', lines)
+        self.assertIn('fysom;warn;before green;onbeforewarn 500000', lines)
+        profiler.reset()
+        self.assertEqual((profiler.table(), profiler.collapsed()), ([], ''))
+
+    def test_detach_should_restore_the_machine(self):
+        profiler = SamplingProfiler(rate=1, clock=Clock())
+        fsm = self.make_fsm(profiler)
+        profiler.detach(fsm)
+        profiler.reset()
+        fsm.warn()
+        self.assertEqual(profiler.stats, {})
+        self.assertNotIn('_fire', vars(fsm))
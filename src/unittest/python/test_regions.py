@@ -0,0 +1,135 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import FysomError, Canceled, TriggerResult
+from fysom.regions import FysomRegions, RegionsDefinition
+
+
+class FysomRegionsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.definition = RegionsDefinition([
+            ('connection', {
+                'initial': 'offline',
+                'events': [('connect', 'offline', 'online'),
+                           ('disconnect', 'online', 'offline'),
+                           ('reset', '*', 'offline')]}),
+            ('auth', {
+                'initial': 'anonymous',
+                'events': [('login', 'anonymous', 'user'),
+                           ('logout', 'user', 'anonymous'),
+                           ('reset', '*', 'anonymous')]}),
+            ('billing', {
+                'initial': 'trial',
+                'events': [('pay', ['trial', 'overdue'], 'paid'),
+                           ('ping', '*', '=')]}),
+        ])
+        self.logs = []
+
+    def _fsm(self):
+        fsm = FysomRegions(self.definition)
+        for name in ('onleaveonline', 'onenteroffline', 'onenteranonymous',
+                     'onreenterpaid', 'onchangestate', 'onreset'):
+            setattr(fsm, name, lambda e, name=name: self.logs.append(
+                (name, e.region)))
+        return fsm
+
+    def test_initial_states_should_be_set_per_region(self):
+        fsm = self._fsm()
+        self.assertEqual(fsm.current, ('offline', 'anonymous', 'trial'))
+        self.assertEqual(fsm.region('auth'), 'anonymous')
+
+    def test_event_should_only_touch_regions_handling_it(self):
+        fsm = self._fsm()
+        fsm.connect()
+        fsm.login()
+        self.assertEqual(fsm.current, ('online', 'user', 'trial'))
+        self.assertTrue(fsm.isstate('user'))
+        self.assertFalse(fsm.isstate('anonymous'))
+
+    def test_event_should_update_several_regions_in_one_dispatch(self):
+        fsm = self._fsm()
+        fsm.connect()
+        fsm.login()
+        self.logs = []
+        fsm.reset()
+        self.assertEqual(fsm.current, ('offline', 'anonymous', 'trial'))
+        self.assertEqual(self.logs, [('onleaveonline', 'connection'),
+                                     ('onenteroffline', 'connection'),
+                                     ('onenteranonymous', 'auth'),
+                                     ('onchangestate', None),
+                                     ('onreset', None)])
+
+    def test_event_object_should_hold_state_tuples(self):
+        fsm = self._fsm()
+        events = []
+        fsm.onconnect = events.append
+        fsm.connect(reason='test')
+        self.assertEqual(events[0].src, ('offline', 'anonymous', 'trial'))
+        self.assertEqual(events[0].dst, ('online', 'anonymous', 'trial'))
+        self.assertEqual(events[0].reason, 'test')
+
+    def test_reflexive_transition_should_reenter(self):
+        fsm = self._fsm()
+        fsm.pay()
+        self.logs = []
+        fsm.ping()
+        self.assertEqual(self.logs, [('onreenterpaid', 'billing')])
+
+    def test_inappropriate_event_should_raise(self):
+        fsm = self._fsm()
+        self.assertFalse(fsm.can('logout'))
+        self.assertRaises(FysomError, fsm.logout)
+        self.assertRaises(FysomError, fsm.trigger, 'unknown')
+        self.assertEqual(fsm.try_trigger('logout'), TriggerResult.INVALID)
+        self.assertRaises(AttributeError, getattr, fsm, 'unknown')
+
+    def test_canceled_event_should_not_change_any_region(self):
+        fsm = self._fsm()
+        fsm.onbeforereset = lambda e: False
+        fsm.connect()
+        self.assertRaises(Canceled, fsm.reset)
+        self.assertEqual(fsm.current, ('online', 'anonymous', 'trial'))
+
+    def test_is_finished_requires_all_final_regions(self):
+        fsm = FysomRegions({
+            'a': {'initial': 'x', 'final': 'y', 'events': [('go', 'x', 'y')]},
+            'b': {'initial': 'x', 'final': 'z', 'events': [('end', 'x', 'z')]}
+        })
+        fsm.go()
+        self.assertFalse(fsm.is_finished())
+        fsm.end()
+        self.assertTrue(fsm.is_finished())
+
+    def test_timed_events_should_be_rejected(self):
+        self.assertRaises(FysomError, RegionsDefinition, {
+            'a': {'initial': 'x', 'events': [
+                {'name': 'expire', 'src': 'x', 'dst': 'y', 'after': 1}]}})
@@ -0,0 +1,161 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import Fysom, FysomDefinition, FysomGlobal
+from fysom.simulate import (RandomWalker, SimulationResult, Simulator,
+                            simulate, simulate_many, transition_table)
+
+
+class FysomSimulationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.cfg = {
+            'initial': 'hungry',
+            'events': [
+                {'name': 'eat', 'src': 'hungry', 'dst': 'satisfied'},
+                {'name': 'eat', 'src': 'satisfied', 'dst': 'full'},
+                {'name': 'nap', 'src': ['hungry', 'full'], 'dst': '='},
+                {'name': 'rest', 'src': '*', 'dst': 'hungry'},
+            ],
+            'callbacks': {'onfull': lambda e: self.calls.append(e)},
+        }
+
+    def test_run_should_return_the_trajectory(self):
+        result = simulate(self.cfg, ['eat', 'eat', 'nap', 'rest'])
+        self.assertEqual(result, SimulationResult(
+            'hungry', None,
+            ('hungry', 'satisfied', 'full', 'full', 'hungry')))
+        self.assertTrue(result.ok)
+        self.assertEqual(self.calls, [])
+
+    def test_run_should_stop_at_the_first_invalid_step(self):
+        simulator = Simulator(FysomDefinition(self.cfg))
+        result = simulator.run(['eat', 'nap', 'eat', 'unknown', 'eat'])
+        self.assertEqual(result.invalid, 1)
+        self.assertEqual(result.state, 'satisfied')
+        self.assertEqual(result.states, ('hungry', 'satisfied'))
+        self.assertFalse(result.ok)
+        result = simulator.run(['rest', 'unknown'], start='full',
+                               trajectory=False)
+        self.assertEqual(result, SimulationResult('hungry', 1, None))
+
+    def test_machine_should_not_be_fired(self):
+        fsm = Fysom(self.cfg)
+        self.assertEqual(Simulator(fsm).run(['eat', 'eat']).state, 'full')
+        self.assertEqual(fsm.current, 'hungry')
+        self.assertEqual(self.calls, [])
+
+    def test_run_many_should_process_batches(self):
+        sequences = [['eat'], ['eat', 'eat', 'eat'], [], ('rest', 'nap')]
+        results = simulate_many(self.cfg, sequences)
+        self.assertEqual([(r.state, r.invalid) for r in results], [
+            ('satisfied', None), ('full', 2), ('hungry', None),
+            ('hungry', None)])
+        self.assertIsNone(results[0].states)
+        results = simulate_many(self.cfg, sequences, start='full',
+                                trajectory=True)
+        self.assertEqual(results[3].states, ('full', 'hungry', 'hungry'))
+        self.assertEqual(results[0].invalid, 0)
+
+    def test_global_machine_table_should_ignore_conditions(self):
+        gsm = FysomGlobal(
+            events=[{'name': 'warn', 'src': 'green', 'dst': 'yellow',
+                     'cond': lambda e: False},
+                    ('clear', ['yellow', 'red'], 'green')],
+            initial='green', state_field='state')
+        self.assertEqual(transition_table(gsm), {
+            'startup': {'none': 'green'}, 'warn': {'green': 'yellow'},
+            'clear': {'yellow': 'green', 'red': 'green'}})
+        self.assertEqual(simulate(gsm, ['warn', 'clear']).states,
+                         ('green', 'yellow', 'green'))
+
+    def test_deferred_initial_state_should_start_from_none(self):
+        cfg = dict(self.cfg, initial={'state': 'hungry', 'defer': True})
+        self.assertEqual(simulate(cfg, ['startup', 'eat']).states,
+                         ('none', 'hungry', 'satisfied'))
+
+
+class FysomRandomWalkTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cfg = {
+            'initial': 'hungry',
+            'final': 'sick',
+            'events': [
+                {'name': 'eat', 'src': 'hungry', 'dst': 'satisfied'},
+                {'name': 'eat', 'src': 'satisfied', 'dst': 'full'},
+                {'name': 'eat', 'src': 'full', 'dst': 'sick'},
+                {'name': 'nap', 'src': ['hungry', 'full'], 'dst': '='},
+                {'name': 'rest', 'src': '*', 'dst': 'hungry'},
+            ],
+        }
+
+    def test_walks_should_be_valid_and_reproducible(self):
+        walker = RandomWalker(self.cfg, seed=42)
+        simulator = Simulator(self.cfg)
+        sequences = list(walker.sequences(50, max_length=30))
+        for events in sequences:
+            result = simulator.run(events)
+            self.assertTrue(result.ok)
+            self.assertTrue(len(events) == 30 or result.state == 'sick')
+        self.assertEqual(sequences,
+                         list(RandomWalker(self.cfg, seed=42).sequences(
+                             50, max_length=30)))
+
+    def test_walk_should_yield_steps_lazily(self):
+        walker = RandomWalker(self.cfg, seed=1)
+        steps = walker.walk(max_length=1000, stop_at_final=False)
+        event, dst = next(steps)
+        self.assertIn((event, dst), [('eat', 'satisfied'), ('nap', 'hungry'),
+                                     ('rest', 'hungry')])
+        self.assertEqual(len(list(steps)), 999)
+        self.assertEqual(list(walker.walk(start='sick')), [])
+
+    def test_index_should_list_the_events_of_each_state(self):
+        walker = RandomWalker(self.cfg)
+        self.assertEqual(walker.events('full'), ['eat', 'nap', 'rest'])
+        self.assertEqual(walker.events('sick'), ['rest'])
+        self.assertEqual(walker.events('unknown'), [])
+
+    def test_weights_should_bias_the_events(self):
+        walker = RandomWalker(self.cfg, weights={'rest': 0, 'nap': 3},
+                              seed=7)
+        counts = {}
+        for event, _ in walker.walk(max_length=4000, stop_at_final=False,
+                                    start='full'):
+            counts[event] = counts.get(event, 0) + 1
+            if event == 'eat':
+                break
+        self.assertNotIn('rest', counts)
+        events = [event for event, _ in RandomWalker(
+            self.cfg, weights={'nap': 0, 'rest': 0}).walk()]
+        self.assertEqual(events, ['eat', 'eat', 'eat'])
@@ -0,0 +1,182 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+import fysom
+from fysom import _core, Fysom, FysomGlobal, FysomGlobalMixin
+
+try:
+    from fysom import _speedups
+except ImportError:  # pragma: no cover
+    _speedups = None
+
+IMPLEMENTATIONS = [_core] + ([_speedups] if _speedups else [])
+
+
+class Target(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def on_found(self, e):
+        self.calls.append(e)
+        return 'found'
+
+    onnone = None
+
+
+class BrokenTarget(object):
+
+    @property
+    def onbroken(self):
+        raise ValueError('broken')
+
+
+class MissingTarget(object):
+
+    def __getattr__(self, name):
+        raise AttributeError(name)
+
+
+class Model(FysomGlobalMixin, object):
+    GSM = None
+
+    def __init__(self):
+        self.state = None
+        self.log = []
+        super(Model, self).__init__()
+
+    def on_enter_yellow(self, e):
+        self.log.append('enter yellow')
+
+
+class FysomDispatchPrimitivesTests(unittest.TestCase):
+    '''
+    Both implementations of the dispatch primitives must behave the same.
+    '''
+
+    def test_lookup_should_resolve_sources_wildcards_and_same_dst(self):
+        tmap = {'go': {'a': 'b', 'b': '=', '*': 'c'}, 'stay': {'*': '='},
+                'off': {'a': None}}
+        for impl in IMPLEMENTATIONS:
+            self.assertEqual(impl.lookup(tmap, 'go', 'a'), 'b')
+            self.assertEqual(impl.lookup(tmap, 'go', 'b'), 'b')
+            self.assertEqual(impl.lookup(tmap, 'go', 'x'), 'c')
+            self.assertEqual(impl.lookup(tmap, 'stay', 'x'), 'x')
+            self.assertIsNone(impl.lookup(tmap, 'off', 'a'))
+            self.assertIsNone(impl.lookup(tmap, 'off', 'b'))
+            self.assertIsNone(impl.lookup(tmap, 'unknown', 'a'))
+
+    def test_call_first_should_call_the_first_existing_attribute(self):
+        for impl in IMPLEMENTATIONS:
+            target = Target()
+            result = impl.call_first(
+                target, ('onmissing', 'onnone', 'on_found'), 'event')
+            self.assertEqual(result, 'found')
+            self.assertEqual(target.calls, ['event'])
+            self.assertIsNone(impl.call_first(target, ('onmissing',), 'e'))
+            self.assertIsNone(
+                impl.call_first(MissingTarget(), ('onmissing',), 'e'))
+
+    def test_call_first_should_propagate_errors_other_than_missing(self):
+        for impl in IMPLEMENTATIONS:
+            self.assertRaises(ValueError, impl.call_first,
+                              BrokenTarget(), ('onbroken',), 'e')
+
+    def test_call_first_global_should_prefer_the_callbacks_dict(self):
+        for impl in IMPLEMENTATIONS:
+            target = Target()
+            callbacks = {'on_found': lambda e: 'from dict'}
+            self.assertEqual(impl.call_first_global(
+                callbacks, target, ('on_found',), 'e'), 'from dict')
+            self.assertEqual(impl.call_first_global(
+                {}, target, ('onmissing', 'on_found'), 'e'), 'found')
+            self.assertIsNone(impl.call_first_global(
+                {}, target, ('onmissing',), 'e'))
+
+
+class FysomSpeedupsIntegrationTests(unittest.TestCase):
+    '''
+    Runs machines with each implementation patched into fysom.
+    '''
+
+    def setUp(self):
+        self.saved = (fysom.lookup, fysom.call_first, fysom.call_first_global)
+
+    def tearDown(self):
+        (fysom.lookup, fysom.call_first, fysom.call_first_global) = self.saved
+
+    def use(self, impl):
+        fysom.lookup = impl.lookup
+        fysom.call_first = impl.call_first
+        fysom.call_first_global = impl.call_first_global
+
+    def test_machine_callbacks_should_run_with_each_implementation(self):
+        for impl in IMPLEMENTATIONS:
+            self.use(impl)
+            log = []
+            fsm = Fysom({
+                'initial': 'green',
+                'events': [
+                    {'name': 'warn', 'src': 'green', 'dst': 'yellow'},
+                    {'name': 'panic', 'src': '*', 'dst': '='},
+                ],
+                'callbacks': {
+                    'onbeforewarn': lambda e: log.append('before warn'),
+                    'onleavegreen': lambda e: log.append('leave green'),
+                    'onyellow': lambda e: log.append('enter yellow'),
+                    'onchangestate': lambda e: log.append('change'),
+                    'onreenteryellow': lambda e: log.append('reenter'),
+                    'on_panic': lambda e: log.append('after panic'),
+                }
+            })
+            del log[:]
+            fsm.warn()
+            fsm.panic()
+            self.assertEqual(fsm.current, 'yellow')
+            self.assertEqual(log, ['before warn', 'leave green',
+                                   'enter yellow', 'change', 'reenter',
+                                   'after panic'])
+            self.assertFalse(fsm.can('warn'))
+
+    def test_global_machine_callbacks_should_run_with_each_implementation(self):
+        for impl in IMPLEMENTATIONS:
+            self.use(impl)
+            log = []
+            Model.GSM = FysomGlobal(
+                events=[('warn', 'green', 'yellow')],
+                callbacks={'on_before_warn': lambda e: log.append('before')},
+                initial='green',
+                state_field='state')
+            model = Model()
+            model.warn()
+            self.assertEqual(model.current, 'yellow')
+            self.assertEqual(log, ['before'])
+            self.assertEqual(model.log, ['enter yellow'])
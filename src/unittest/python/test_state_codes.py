@@ -0,0 +1,165 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import sys
+import unittest
+
+from fysom import FysomError, FysomGlobal, FysomGlobalMixin
+from fysom.stores import MemoryStore, SQLiteStore
+from fysom.stream import StreamProcessor
+
+EVENTS = [('warn', 'green', 'yellow'),
+          {'name': 'panic', 'src': ['green', 'yellow'], 'dst': 'red',
+           'cond': [{True: 'is_angry', 'else': 'orange'}]},
+          ('calm', ['red', 'orange'], 'yellow'),
+          ('clear', 'yellow', 'green')]
+
+
+class FysomStateCodesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.angry = True
+        self.gsm = FysomGlobal(events=EVENTS, initial='green',
+                               state_field='state', state_codes=True,
+                               callbacks={'is_angry': self.is_angry})
+
+        class Model(FysomGlobalMixin, object):
+            GSM = self.gsm
+
+            def __init__(self):
+                self.state = None
+                super(Model, self).__init__()
+
+        self.Model = Model
+
+    def is_angry(self, e):
+        return self.angry
+
+    def test_states_should_be_numbered_alphabetically(self):
+        self.assertEqual(self.gsm.state_names, (
+            'none', 'green', 'orange', 'red', 'yellow'))
+        self.assertEqual(self.gsm.state_code('red'), 3)
+        self.assertEqual(self.gsm.state_name(4), 'yellow')
+        self.assertRaises(FysomError, self.gsm.state_code, 'blue')
+
+    def test_fields_should_hold_codes_and_api_names(self):
+        obj = self.Model()
+        self.assertEqual(obj.state, 1)
+        self.assertEqual(obj.current, 'green')
+        obj.warn()
+        self.assertEqual(obj.state, 4)
+        self.assertTrue(obj.is_state('yellow'))
+        self.assertTrue(obj.can('panic'))
+        self.angry = False
+        obj.panic()
+        self.assertEqual((obj.state, obj.current), (2, 'orange'))
+        obj.current = 'red'
+        self.assertEqual(obj.state, 3)
+        self.assertRaises(FysomError, setattr, obj, 'current', 'blue')
+
+    @unittest.skipIf(sys.version_info < (3, 4), 'needs the enum module')
+    def test_state_enum_should_match_the_codes(self):
+        State = self.gsm.state_enum
+        obj = self.Model()
+        self.assertEqual(obj.state, State.green)
+        self.assertEqual(State(3).name, 'red')
+        self.assertIs(self.gsm.state_enum, State)
+
+    def test_explicit_codes_should_be_kept(self):
+        gsm = FysomGlobal(events=EVENTS, initial='green',
+                          state_field='state',
+                          state_codes=['yellow', 'green', 'red', 'orange'])
+        self.assertEqual(gsm.state_names,
+                         ('none', 'yellow', 'green', 'red', 'orange'))
+        self.assertRaises(FysomError, FysomGlobal, events=EVENTS,
+                          initial='green', state_field='state',
+                          state_codes=['green', 'red', 'orange'])
+        self.assertRaises(FysomError, FysomGlobal, events=EVENTS,
+                          initial='green', state_field='state',
+                          state_codes=['green', 'green', 'red', 'orange',
+                                       'yellow'])
+
+    @unittest.skipIf(sys.version_info < (3, 4), 'needs the enum module')
+    def test_int_enum_values_should_be_the_codes(self):
+        import enum
+        State = enum.IntEnum('State', [('red', 1), ('green', 2),
+                                       ('orange', 3), ('yellow', 4)])
+        gsm = FysomGlobal(events=EVENTS, initial='green',
+                          state_field='state', state_codes=State)
+        self.assertEqual(gsm.state_names,
+                         ('none', 'red', 'green', 'orange', 'yellow'))
+        self.assertEqual(gsm.state_code(State.yellow), State.yellow)
+        for members in ([('none', 1), ('red', 0), ('green', 2),
+                         ('orange', 3), ('yellow', 4)],
+                        [('red', 0), ('green', 2), ('orange', 3),
+                         ('yellow', 4)],
+                        [('red', 1), ('green', 2), ('orange', 3),
+                         ('yellow', 5)]):
+            self.assertRaises(FysomError, FysomGlobal, events=EVENTS,
+                              initial='green', state_field='state',
+                              state_codes=enum.IntEnum('State', members))
+
+    def test_unencoded_machines_should_refuse_conversions(self):
+        gsm = FysomGlobal(events=EVENTS, initial='green',
+                          state_field='state')
+        self.assertIsNone(gsm.state_names)
+        self.assertRaises(FysomError, gsm.state_code, 'green')
+        self.assertRaises(FysomError, gsm.state_name, 1)
+
+    def test_stores_should_keep_codes(self):
+        store = MemoryStore()
+        gsm = FysomGlobal(events=EVENTS, initial='green', store=store,
+                          state_codes=True,
+                          callbacks={'is_angry': self.is_angry})
+        self.assertEqual(gsm.current('k'), 'green')
+        gsm.warn('k')
+        self.assertEqual(store.load('k'), 4)
+        self.assertEqual(gsm.current('k'), 'yellow')
+
+    def test_sqlite_store_should_keep_codes(self):
+        store = SQLiteStore()
+        gsm = FysomGlobal(events=EVENTS, initial='green', store=store,
+                          state_codes=True,
+                          callbacks={'is_angry': self.is_angry})
+        gsm.warn('k1')
+        self.assertEqual(store.load('k1'), 4)
+        self.assertEqual(gsm.current('k1'), 'yellow')
+        self.assertEqual(gsm.current('k2'), 'green')
+        gsm.panic('k1')
+        self.assertEqual(store.load_many(['k1']), {'k1': 3})
+        self.assertTrue(gsm.is_state('k1', 'red'))
+
+    def test_streams_should_use_names(self):
+        gsm = FysomGlobal(events=EVENTS, initial='green',
+                          state_field='state', state_codes=True,
+                          callbacks={'is_angry': self.is_angry})
+        processor = StreamProcessor(gsm)
+        records = list(processor.process([('k', 'warn'), ('k', 'panic')]))
+        self.assertEqual([r.dst for r in records], ['yellow', 'red'])
+        self.assertEqual(processor.states, {'k': 'red'})
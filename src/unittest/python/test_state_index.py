@@ -0,0 +1,117 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import gc
+import unittest
+
+from fysom import FysomError, FysomGlobal, FysomGlobalMixin, TriggerResult
+from fysom.index import StateIndex
+from fysom.stores import MemoryStore
+
+
+class Order(FysomGlobalMixin, object):
+    GSM = None
+
+    def __init__(self, state=None):
+        self.state = state
+        super(Order, self).__init__()
+
+
+class FysomStateIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        Order.GSM = FysomGlobal(
+            events=[('pay', 'pending', 'paid'),
+                    ('expire', 'pending', 'expired'),
+                    {'name': 'ship', 'src': 'paid', 'dst': 'shipped',
+                     'cond': lambda e: getattr(e.obj, 'stock', True)}],
+            initial='pending', state_field='state', index=True)
+        self.index = Order.GSM.index
+
+    def test_objects_should_be_indexed_on_initialization(self):
+        orders = [Order(), Order(), Order('paid')]
+        self.assertEqual(self.index.counts(), {'pending': 2, 'paid': 1})
+        self.assertEqual(self.index.count('pending'), 2)
+        self.assertEqual(self.index.members('paid'), [orders[2]])
+        self.assertIn(orders[0], self.index)
+
+    def test_transitions_should_move_objects(self):
+        order = Order()
+        order.pay()
+        self.assertEqual(self.index.count('pending'), 0)
+        self.assertEqual(self.index.members('paid'), [order])
+        order.current = 'expired'
+        self.assertEqual(self.index.counts(), {'expired': 1})
+
+    def test_collected_objects_should_leave_the_index(self):
+        order = Order()
+        self.assertEqual(self.index.count('pending'), 1)
+        del order
+        gc.collect()
+        self.assertEqual(self.index.count('pending'), 0)
+        self.assertEqual(self.index.members('pending'), [])
+
+    def test_sweep_should_trigger_every_object_of_a_state(self):
+        orders = [Order() for _ in range(3)] + [Order('paid')]
+        orders[3].stock = False
+        Order('paid')
+        self.assertEqual(Order.GSM.sweep('pending', 'pay'),
+                         {TriggerResult.OK: 3})
+        self.assertEqual(Order.GSM.sweep('paid', 'ship'),
+                         {TriggerResult.OK: 3, TriggerResult.CANCELED: 1})
+        self.assertEqual(self.index.counts(), {'paid': 1, 'shipped': 3})
+        self.assertEqual(Order.GSM.sweep('missing', 'pay'), {})
+
+    def test_index_should_be_optional(self):
+        gsm = FysomGlobal(events=[('pay', 'pending', 'paid')],
+                          initial='pending', state_field='state')
+        self.assertIsNone(gsm.index)
+        self.assertRaises(FysomError, gsm.sweep, 'pending', 'pay')
+        self.assertRaises(FysomError, FysomGlobal, index=True,
+                          events=[('pay', 'pending', 'paid')],
+                          initial='pending', store=MemoryStore())
+
+    def test_index_should_ignore_unknown_objects(self):
+        index = StateIndex()
+        index.discard(Order, 'pending')
+        self.assertEqual(index.count('pending'), 0)
+        index.add(Order, 'pending')
+        index.clear()
+        self.assertEqual(index.counts(), {})
+
+    def test_event_named_index_should_keep_the_index(self):
+        Order.GSM = FysomGlobal(events=[('index', 'pending', 'indexed')],
+                                initial='pending', state_field='state',
+                                index=True)
+        orders = [Order(), Order()]
+        orders[0].index()
+        self.assertEqual(Order.GSM.sweep('pending', 'index'),
+                         {TriggerResult.OK: 1})
+        self.assertEqual([order.state for order in orders],
+                         ['indexed', 'indexed'])
@@ -0,0 +1,199 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from fysom import Canceled, FysomError, FysomGlobal, TriggerResult
+from fysom.stores import (CachedStore, MemoryStore, SQLiteStore, StateStore,
+                          StoredEntity)
+
+
+class CountingStore(MemoryStore):
+
+    def __init__(self):
+        super(CountingStore, self).__init__()
+        self.calls = []
+
+    def load(self, key):
+        self.calls.append(('load', key))
+        return super(CountingStore, self).load(key)
+
+    def load_many(self, keys):
+        self.calls.append(('load_many', sorted(keys)))
+        return super(CountingStore, self).load_many(keys)
+
+    def save_many(self, states):
+        self.calls.append(('save_many', sorted(states.items())))
+        super(CountingStore, self).save_many(states)
+
+
+class FysomStateStoresTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check_store(self, store):
+        self.assertIsNone(store.load('a'))
+        store.save('a', 'green')
+        store.save(1, 'red')
+        self.assertEqual(store.load('a'), 'green')
+        store.save_many({'a': 'yellow', 'b': 'red'})
+        self.assertEqual(store.load_many(['a', 'b', 1, 'c']),
+                         {'a': 'yellow', 'b': 'red', 1: 'red'})
+
+    def test_stores_should_load_and_save_states(self):
+        self.check_store(MemoryStore())
+        self.check_store(SQLiteStore())
+        self.check_store(CachedStore(SQLiteStore(), batch_size=2))
+        self.check_store(CachedStore(MemoryStore(), write_behind=False))
+
+    def test_base_store_should_implement_bulk_methods_with_single_ones(self):
+        class DictStore(StateStore):
+            def __init__(self):
+                self.states = {}
+
+            def load(self, key):
+                return self.states.get(key)
+
+            def save(self, key, state):
+                self.states[key] = state
+
+        self.check_store(DictStore())
+        self.assertRaises(NotImplementedError, StateStore().load, 'a')
+
+    def test_sqlite_store_should_persist_and_batch_bulk_loads(self):
+        path = os.path.join(self.directory, 'states.db')
+        store = SQLiteStore(path, table='lights')
+        store.max_variables = 3
+        store.save_many(dict(('k%d' % i, 'green') for i in range(10)))
+        store.close()
+        store = SQLiteStore(sqlite3.connect(path), table='lights')
+        states = store.load_many('k%d' % i for i in range(12))
+        self.assertEqual(len(states), 10)
+        self.assertRaises(FysomError, SQLiteStore, table='x; DROP TABLE y')
+
+    def test_cached_store_should_read_through_and_write_behind(self):
+        backend = CountingStore()
+        backend.states['a'] = 'green'
+        store = CachedStore(backend, batch_size=2)
+        self.assertEqual(store.load('a'), 'green')
+        self.assertEqual(store.load('a'), 'green')
+        self.assertIsNone(store.load('x'))
+        self.assertIsNone(store.load('x'))
+        self.assertEqual(backend.calls, [('load', 'a'), ('load', 'x')])
+
+        del backend.calls[:]
+        store.save('a', 'yellow')
+        self.assertEqual(backend.states['a'], 'green')
+        store.save('b', 'red')
+        self.assertEqual(backend.calls,
+                         [('save_many', [('a', 'yellow'), ('b', 'red')])])
+
+        del backend.calls[:]
+        store.save('c', 'red')
+        store.evict(['c'])
+        self.assertEqual(backend.calls, [('save_many', [('c', 'red')])])
+        self.assertNotIn('c', store.cache)
+        self.assertEqual(store.load_many(['a', 'c', 'd']),
+                         {'a': 'yellow', 'c': 'red'})
+        self.assertEqual(backend.calls[-1], ('load_many', ['c', 'd']))
+        store.evict()
+        self.assertEqual(store.cache, {})
+
+
+class FysomGlobalStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MemoryStore()
+        self.log = []
+
+        def onyellow(e):
+            self.log.append((e.obj.key, e.src, e.dst))
+
+        self.gsm = FysomGlobal(
+            events=[('warn', 'green', 'yellow'),
+                    {'name': 'panic', 'src': 'yellow', 'dst': 'red',
+                     'cond': lambda e: e.obj.key != 'calm'},
+                    ('calm', 'red', 'yellow')],
+            callbacks={'onyellow': onyellow},
+            initial='green', final='red', store=self.store)
+
+    def test_keys_should_start_in_the_initial_state(self):
+        self.assertEqual(self.gsm.state_field, 'state')
+        self.assertEqual(self.gsm.current('a'), 'green')
+        self.assertTrue(self.gsm.can('a', 'warn'))
+        self.assertEqual(self.store.states, {})
+
+    def test_transitions_should_write_through_the_store(self):
+        self.gsm.warn('a')
+        self.gsm.trigger('a', 'panic')
+        self.assertEqual(self.store.states, {'a': 'red'})
+        self.assertTrue(self.gsm.is_finished('a'))
+        self.assertEqual(self.log, [('a', 'green', 'yellow')])
+        self.assertRaises(FysomError, self.gsm.warn, 'a')
+        self.assertEqual(self.gsm.try_trigger('b', 'panic'),
+                         TriggerResult.INVALID)
+
+    def test_conditions_should_see_the_key(self):
+        self.store.states['calm'] = 'yellow'
+        self.assertRaises(Canceled, self.gsm.panic, 'calm')
+        self.assertEqual(self.gsm.current('calm'), 'yellow')
+
+    def test_pending_transitions_should_be_kept_until_completed(self):
+        self.gsm._callbacks['onleavegreen'] = lambda e: False
+        self.assertEqual(self.gsm.try_trigger('a', 'warn'),
+                         TriggerResult.PENDING)
+        self.assertFalse(self.gsm.can('a', 'warn'))
+        entity = self.gsm.entity('a')
+        self.assertIsInstance(entity, StoredEntity)
+        self.assertEqual(entity.state, 'green')
+        entity.transition()
+        self.assertEqual(self.store.states, {'a': 'yellow'})
+        self.assertEqual(self.gsm._pending, {})
+        self.assertEqual(self.log, [('a', 'green', 'yellow')])
+
+    def test_event_named_store_should_not_detach_the_store(self):
+        gsm = FysomGlobal(events=[('store', 'green', 'stored')],
+                          initial='green', store=self.store)
+        gsm.store('a')
+        self.assertEqual(self.store.states, {'a': 'stored'})
+        self.assertEqual(gsm.current('a'), 'stored')
+
+    def test_timed_events_should_be_rejected(self):
+        self.assertRaises(FysomError, FysomGlobal, events=[
+            {'name': 'expire', 'src': 'green', 'dst': 'red', 'after': 1}],
+            initial='green', store=MemoryStore(), timers=object())
+        self.assertRaises(FysomError, FysomGlobal, events=[])
@@ -0,0 +1,168 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import io
+import unittest
+
+from fysom import FysomError, FysomGlobal, TriggerResult
+from fysom.stores import MemoryStore
+from fysom.stream import StreamProcessor, read_csv, read_json_lines
+
+
+def make_gsm(**kwargs):
+    return FysomGlobal(
+        events=[('pay', 'new', 'paid'),
+                ('ship', 'paid', 'shipped'),
+                ('touch', '*', '='),
+                ('cancel', ['new', 'paid'], 'canceled')],
+        initial='new', final='shipped', state_field='state', **kwargs)
+
+
+class FysomStreamTests(unittest.TestCase):
+
+    def test_table_should_track_the_state_of_every_key(self):
+        processor = StreamProcessor(make_gsm())
+        self.assertIsNotNone(processor._table)
+        records = list(processor.process([
+            ('a', 'pay'), ('b', 'pay', 10), ('a', 'ship'), ('b', 'touch')]))
+        self.assertEqual([(r.key, r.src, r.dst) for r in records], [
+            ('a', 'new', 'paid'), ('b', 'new', 'paid'),
+            ('a', 'paid', 'shipped'), ('b', 'paid', 'paid')])
+        self.assertTrue(all(r.ok for r in records))
+        self.assertEqual(records[1].payload, 10)
+        self.assertEqual(processor.states, {'a': 'shipped', 'b': 'paid'})
+
+    def test_process_should_be_lazy(self):
+        consumed = []
+
+        def events():
+            for key in range(3):
+                consumed.append(key)
+                yield key, 'pay'
+
+        records = StreamProcessor(make_gsm()).process(events())
+        next(records)
+        self.assertEqual(consumed, [0])
+
+    def test_invalid_events_should_follow_the_errors_policy(self):
+        events = [('a', 'ship'), ('a', 'pay')]
+        records = list(StreamProcessor(make_gsm()).process(events))
+        self.assertEqual([r.result for r in records],
+                         [TriggerResult.INVALID, TriggerResult.OK])
+        self.assertEqual(records[0].dst, 'new')
+
+        processor = StreamProcessor(make_gsm(), errors='skip')
+        records = list(processor.process(events))
+        self.assertEqual([r.event for r in records], ['pay'])
+        self.assertEqual((processor.processed, processor.failed), (2, 1))
+
+        processor = StreamProcessor(make_gsm(), errors='raise')
+        self.assertRaises(FysomError, list, processor.process(events))
+        self.assertRaises(FysomError, StreamProcessor, make_gsm(),
+                          errors='ignore')
+
+    def test_states_should_resume_and_evict_final_keys(self):
+        processor = StreamProcessor(make_gsm(), states={'a': 'paid'},
+                                    evict_final=True)
+        list(processor.process([('a', 'ship'), ('b', 'pay')]))
+        self.assertEqual(processor.states, {'b': 'paid'})
+        records = list(processor.process([('a', 'pay')]))
+        self.assertEqual(records[0].src, 'new')
+
+    def test_callbacks_and_conditions_should_run_through_the_machine(self):
+        log = []
+
+        def onpay(e):
+            log.append((e.obj.key, e.payload, e.src, e.dst))
+
+        def onship(e):
+            raise ValueError('no stock')
+
+        gsm = FysomGlobal(
+            events=[{'name': 'pay', 'src': 'new', 'dst': 'paid',
+                     'cond': lambda e: e.payload > 0},
+                    ('ship', 'paid', 'shipped')],
+            callbacks={'onpay': onpay, 'onbeforeship': onship},
+            initial='new', state_field='state')
+        processor = StreamProcessor(gsm)
+        self.assertIsNone(processor._table)
+        records = list(processor.process([
+            ('a', 'pay', 0), ('a', 'pay', 5), ('a', 'ship')]))
+        self.assertEqual([r.result for r in records],
+                         [TriggerResult.CANCELED, TriggerResult.OK, None])
+        self.assertIsInstance(records[2].error, ValueError)
+        self.assertEqual(log, [('a', 5, 'new', 'paid')])
+        self.assertEqual(processor.states, {'a': 'paid'})
+
+        processor = StreamProcessor(gsm, states={'a': 'paid'}, errors='raise')
+        self.assertRaises(ValueError, list, processor.process([('a', 'ship')]))
+
+    def test_timed_events_should_be_rejected(self):
+        gsm = FysomGlobal(
+            events=[('pay', 'new', 'paid'),
+                    {'name': 'expire', 'src': 'new', 'dst': 'expired',
+                     'after': 10}],
+            initial='new', state_field='state', timers=object())
+        self.assertRaises(FysomError, StreamProcessor, gsm)
+
+    def test_store_backed_machines_should_be_rejected(self):
+        gsm = FysomGlobal(events=[('pay', 'new', 'paid')], initial='new',
+                          store=MemoryStore())
+        self.assertRaises(FysomError, StreamProcessor, gsm)
+
+
+class FysomStreamReadersTests(unittest.TestCase):
+
+    def test_read_csv_should_parse_rows_in_chunks(self):
+        source = io.StringIO(u'entity_id,event,payload\n'
+                             u'a,pay,10\n\nb,pay\n"c,1",cancel,"x,y"\n')
+        rows = list(read_csv(source, header=True, chunk_size=8))
+        self.assertEqual(rows, [('a', 'pay', '10'), ('b', 'pay', None),
+                                ('c,1', 'cancel', 'x,y')])
+        self.assertRaises(ValueError, list, read_csv(['a\n']))
+
+    def test_read_json_lines_should_parse_objects_and_arrays(self):
+        source = io.StringIO(u'{"entity_id": 1, "event": "pay", '
+                             u'"payload": {"amount": 3}}\n'
+                             u'\n[2, "pay"]\n["3", "pay", 4]\n')
+        self.assertEqual(list(read_json_lines(source)), [
+            (1, 'pay', {'amount': 3}), (2, 'pay', None), ('3', 'pay', 4)])
+        source = io.StringIO(u'{"id": 1, "event": "pay"}\n')
+        self.assertEqual(list(read_json_lines(source, key_field='id')),
+                         [(1, 'pay', None)])
+        self.assertRaises(ValueError, list, read_json_lines([u'[1]']))
+        self.assertRaises(ValueError, list, read_json_lines([u'{']))
+        self.assertRaises(ValueError, list, read_json_lines([u'{"id": 1}']))
+
+    def test_readers_should_feed_the_processor(self):
+        processor = StreamProcessor(make_gsm())
+        source = io.StringIO(u'a,pay\na,ship\nb,cancel\n')
+        records = list(processor.process(read_csv(source)))
+        self.assertEqual([r.dst for r in records],
+                         ['paid', 'shipped', 'canceled'])
@@ -0,0 +1,213 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import gc
+import unittest
+
+from fysom import Fysom, FysomError, FysomGlobal, FysomGlobalMixin
+from fysom.timers import TimerWheel
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TimerWheelTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.wheel = TimerWheel(resolution=1.0, bits=2, levels=3,
+                                clock=self.clock)
+        self.fired = []
+
+    def _schedule(self, delay):
+        return self.wheel.schedule(
+            delay, lambda: self.fired.append((delay, self.clock.now)))
+
+    def test_timer_should_fire_after_delay(self):
+        self._schedule(3)
+        self.clock.now += 2
+        self.assertEqual(self.wheel.advance(), 0)
+        self.clock.now += 1
+        self.assertEqual(self.wheel.advance(), 1)
+        self.assertEqual(self.fired, [(3, 1003.0)])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_far_timers_should_cascade_down(self):
+        for delay in (1, 5, 17, 63, 64, 200):
+            self._schedule(delay)
+        for _ in range(250):
+            self.clock.now += 1
+            self.wheel.advance()
+        self.assertEqual([(d, now - 1000) for d, now in self.fired],
+                         [(1, 1), (5, 5), (17, 17), (63, 63), (64, 64),
+                          (200, 200)])
+
+    def test_timers_beyond_wheel_span_should_not_fire_early(self):
+        wheel = TimerWheel(resolution=1.0, bits=2, levels=1,
+                           clock=self.clock)
+        wheel.schedule(10, lambda: self.fired.append(self.clock.now))
+        for _ in range(12):
+            self.clock.now += 1
+            wheel.advance()
+        self.assertEqual(self.fired, [1010.0])
+
+    def test_advancing_by_a_large_step_should_fire_everything_due(self):
+        for delay in (1, 30, 100):
+            self._schedule(delay)
+        self.clock.now += 50
+        self.assertEqual(self.wheel.advance(), 2)
+        self.clock.now += 50
+        self.assertEqual(self.wheel.advance(), 1)
+
+    def test_canceled_timer_should_not_fire(self):
+        timer = self._schedule(2)
+        self.assertTrue(timer.active)
+        timer.cancel()
+        self.assertFalse(timer.active)
+        timer.cancel()
+        self.clock.now += 5
+        self.assertEqual(self.wheel.advance(), 0)
+        self.assertEqual(len(self.wheel), 0)
+
+
+class FysomTimedTransitionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.wheel = TimerWheel(resolution=1.0, clock=self.clock)
+        self.cfg = {
+            'initial': 'pending',
+            'events': [
+                {'name': 'expire', 'src': 'pending', 'dst': 'expired',
+                 'after': 30},
+                {'name': 'confirm', 'src': 'pending', 'dst': 'confirmed'},
+                {'name': 'retry', 'src': ['expired', 'confirmed'],
+                 'dst': 'pending'},
+            ]
+        }
+
+    def _wait(self, seconds):
+        self.clock.now += seconds
+        self.wheel.advance()
+
+    def test_timed_event_should_fire_after_delay(self):
+        fsm = Fysom(self.cfg, timers=self.wheel)
+        self._wait(29)
+        self.assertEqual(fsm.current, 'pending')
+        self._wait(1)
+        self.assertEqual(fsm.current, 'expired')
+
+    def test_leaving_state_should_cancel_timed_event(self):
+        fsm = Fysom(self.cfg, timers=self.wheel)
+        self._wait(10)
+        fsm.confirm()
+        self.assertEqual(len(self.wheel), 0)
+        self._wait(30)
+        self.assertEqual(fsm.current, 'confirmed')
+
+    def test_reentering_state_should_restart_timed_event(self):
+        fsm = Fysom(self.cfg, timers=self.wheel)
+        self._wait(10)
+        fsm.confirm()
+        fsm.retry()
+        self._wait(25)
+        self.assertEqual(fsm.current, 'pending')
+        self._wait(5)
+        self.assertEqual(fsm.current, 'expired')
+
+    def test_timed_event_should_not_keep_machine_alive(self):
+        fsm = Fysom(self.cfg, timers=self.wheel)
+        del fsm
+        gc.collect()
+        self._wait(30)
+
+    def test_parent_state_timer_should_survive_child_transitions(self):
+        fsm = Fysom({
+            'initial': 'busy.a',
+            'substates': {'busy': ['busy.a', 'busy.b']},
+            'events': [('flip', 'busy.a', 'busy.b'),
+                       {'name': 'timeout', 'src': 'busy', 'dst': 'idle',
+                        'after': 10}]
+        }, timers=self.wheel)
+        self._wait(5)
+        fsm.flip()
+        self._wait(5)
+        self.assertEqual(fsm.current, 'idle')
+
+    def test_timed_events_require_a_wheel(self):
+        self.assertRaises(FysomError, Fysom, self.cfg)
+
+    def test_timed_events_require_explicit_sources(self):
+        self.assertRaises(FysomError, Fysom,
+                          events=[{'name': 'tick', 'dst': 'a', 'after': 1}],
+                          timers=self.wheel)
+
+    def test_global_machine_timed_event(self):
+        class Model(FysomGlobalMixin, object):
+            GSM = FysomGlobal(self.cfg, state_field='state',
+                              timers=self.wheel)
+
+            def __init__(self):
+                self.state = None
+                super(Model, self).__init__()
+
+        first, second = Model(), Model()
+        self._wait(10)
+        second.confirm()
+        self._wait(20)
+        self.assertTrue(first.is_state('expired'))
+        self.assertTrue(second.is_state('confirmed'))
+
+
+class AsyncioDriverTests(unittest.TestCase):
+
+    def test_driver_should_advance_wheel(self):
+        try:
+            import asyncio
+        except ImportError:  # pragma: no cover
+            return
+        from fysom.timers import AsyncioDriver
+        loop = asyncio.new_event_loop()
+        try:
+            wheel = TimerWheel(resolution=0.01)
+            fired = []
+            wheel.schedule(0.02, lambda: fired.append(True))
+            driver = AsyncioDriver(wheel, loop=loop)
+            driver.start()
+            loop.run_until_complete(asyncio.sleep(0.1))
+            driver.stop()
+            self.assertEqual(fired, [True])
+        finally:
+            loop.close()
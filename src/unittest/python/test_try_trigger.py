@@ -0,0 +1,149 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+from fysom import (Fysom, FysomGlobal, FysomGlobalMixin, FysomError,
+                   TriggerResult)
+
+
+class FysomTryTriggerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.fsm = Fysom({
+            'initial': 'green',
+            'events': [
+                {'name': 'warn', 'src': 'green', 'dst': 'yellow'},
+                {'name': 'panic', 'src': 'yellow', 'dst': 'red'},
+                {'name': 'calm', 'src': 'red', 'dst': 'yellow'},
+                {'name': 'clear', 'src': 'yellow', 'dst': 'green'},
+                {'name': 'wait', 'src': '*', 'dst': '='}
+            ]
+        })
+
+    def test_valid_event_should_return_ok(self):
+        self.assertEqual(self.fsm.try_trigger('warn'), TriggerResult.OK)
+        self.assertEqual(self.fsm.current, 'yellow')
+
+    def test_reflexive_event_should_return_ok(self):
+        self.assertEqual(self.fsm.try_trigger('wait'), TriggerResult.OK)
+        self.assertEqual(self.fsm.current, 'green')
+
+    def test_inappropriate_event_should_return_invalid(self):
+        self.assertEqual(self.fsm.try_trigger('panic'), TriggerResult.INVALID)
+        self.assertEqual(self.fsm.current, 'green')
+
+    def test_unknown_event_should_return_invalid(self):
+        self.assertEqual(self.fsm.try_trigger('unknown'),
+                         TriggerResult.INVALID)
+
+    def test_canceled_event_should_return_canceled(self):
+        self.fsm.onbeforewarn = lambda e: False
+        self.assertEqual(self.fsm.try_trigger('warn'), TriggerResult.CANCELED)
+        self.assertEqual(self.fsm.current, 'green')
+
+    def test_async_transition_should_return_pending(self):
+        self.fsm.onleavegreen = lambda e: False
+        self.assertEqual(self.fsm.try_trigger('warn'), TriggerResult.PENDING)
+        self.assertEqual(self.fsm.try_trigger('clear'),
+                         TriggerResult.INVALID)
+        self.fsm.transition()
+        self.assertEqual(self.fsm.current, 'yellow')
+
+    def test_kwargs_should_be_passed_to_callbacks(self):
+        received = []
+        self.fsm.onwarn = lambda e: received.append((e.args, e.msg))
+        self.fsm.fire_if_possible('warn', 1, msg='danger')
+        self.assertEqual(received, [((1,), 'danger')])
+
+    def test_callback_exceptions_should_not_be_eaten(self):
+        def onwarn(e):
+            raise ValueError('boom')
+        self.fsm.onwarn = onwarn
+        self.assertRaises(ValueError, self.fsm.try_trigger, 'warn')
+
+    def test_raising_api_is_unchanged(self):
+        self.assertRaises(FysomError, self.fsm.panic)
+
+
+class FysomGlobalTryTriggerTests(unittest.TestCase):
+
+    def setUp(self):
+        class Model(FysomGlobalMixin, object):
+            GSM = FysomGlobal(
+                events=[('warn', 'green', 'yellow'),
+                        {'name': 'panic', 'src': 'yellow', 'dst': 'red',
+                         'cond': 'is_angry'},
+                        ('clear', 'yellow', 'green')],
+                initial='green',
+                state_field='state'
+            )
+
+            def __init__(self):
+                self.state = None
+                self.angry = False
+                super(Model, self).__init__()
+
+            def is_angry(self, event):
+                return self.angry
+
+        self.Model = Model
+
+    def test_valid_event_should_return_ok(self):
+        obj = self.Model()
+        self.assertEqual(obj.try_trigger('warn'), TriggerResult.OK)
+        self.assertTrue(obj.is_state('yellow'))
+
+    def test_inappropriate_event_should_return_invalid(self):
+        obj = self.Model()
+        self.assertEqual(self.Model.GSM.try_trigger(obj, 'clear'),
+                         TriggerResult.INVALID)
+        self.assertEqual(obj.try_trigger('unknown'), TriggerResult.INVALID)
+
+    def test_failed_condition_should_return_canceled(self):
+        obj = self.Model()
+        obj.warn()
+        self.assertEqual(obj.fire_if_possible('panic'),
+                         TriggerResult.CANCELED)
+        self.assertTrue(obj.is_state('yellow'))
+        obj.angry = True
+        self.assertEqual(obj.try_trigger('panic'), TriggerResult.OK)
+        self.assertTrue(obj.is_state('red'))
+
+    def test_canceled_before_event_should_return_canceled(self):
+        obj = self.Model()
+        obj.onbeforewarn = lambda e: False
+        self.assertEqual(obj.try_trigger('warn'), TriggerResult.CANCELED)
+
+    def test_async_transition_should_return_pending(self):
+        obj = self.Model()
+        obj.onleavegreen = lambda e: False
+        self.assertEqual(obj.try_trigger('warn'), TriggerResult.PENDING)
+        obj.transition()
+        self.assertTrue(obj.is_state('yellow'))
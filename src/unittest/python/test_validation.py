@@ -0,0 +1,172 @@
+# coding=utf-8
+#
+# fysom - pYthOn Finite State Machine - this is a port of Jake
+#         Gordon's javascript-state-machine to python
+#         https://github.com/jakesgordon/javascript-state-machine
+#
+# Copyright (C) 2011 Mansour Behabadi <mansour@oxplot.com>, Jake Gordon
+#                                        and other contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import sys
+import unittest
+import warnings
+
+from fysom import (Fysom, FysomDefinition, FysomError, FysomGlobal,
+                   FysomGlobalMixin, InvalidDefinition)
+from fysom.validation import DefinitionWarning
+
+EVENTS = [('warn', 'green', 'yellow'),
+          ('panic', ['green', 'yellow'], 'red'),
+          ('calm', 'red', 'yellow'),
+          ('clear', 'yellow', 'green')]
+
+
+class FysomValidationTests(unittest.TestCase):
+
+    def problems(self, **kwargs):
+        with self.assertRaises(InvalidDefinition) as raised:
+            FysomDefinition(validate='strict', **kwargs)
+        return raised.exception.problems
+
+    def test_valid_definition_should_compile(self):
+        definition = FysomDefinition(initial='green', final='red',
+                                     events=EVENTS, validate='strict')
+        self.assertEqual(definition.validate, 'strict')
+        fsm = Fysom(definition)
+        fsm.panic()
+        self.assertTrue(fsm.is_finished())
+
+    def test_conflicting_destinations_should_be_reported(self):
+        problems = self.problems(initial='green', events=EVENTS + [
+            ('warn', 'green', 'red'), ('clear', 'yellow', 'green')])
+        self.assertEqual(
+            problems, ['event warn from green goes to both yellow and red'])
+
+    def test_unknown_final_state_should_be_reported(self):
+        problems = self.problems(initial='green', final='black',
+                                 events=EVENTS)
+        self.assertEqual(problems, [
+            'final state black is not the destination of any event',
+            'state black is unreachable from the initial state'])
+
+    def test_unreachable_states_should_be_reported(self):
+        problems = self.problems(initial='green', events=EVENTS + [
+            ('fix', 'broken', 'green'), ('break', 'offline', 'broken')])
+        self.assertEqual(problems, [
+            'state broken is unreachable from the initial state',
+            'state offline is unreachable from the initial state'])
+
+    def test_reachability_should_follow_wildcards_and_substates(self):
+        FysomDefinition(
+            initial='idle', validate='strict',
+            substates={'running': ['fast', 'slow']},
+            events=[('go', 'idle', 'fast'), ('ease', 'fast', 'slow'),
+                    ('stop', '*', 'idle'),
+                    ('wait', 'running', '=')])
+
+    def test_definitions_without_initial_state_are_not_walked(self):
+        FysomDefinition(events=[('fix', 'broken', 'ok')], validate='strict')
+
+    def test_warn_mode_should_warn_and_compile(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            fsm = Fysom(initial='green', final='black', events=EVENTS,
+                        validate='warn')
+        self.assertEqual(fsm.current, 'green')
+        self.assertEqual(len(caught), 2)
+        self.assertTrue(all(issubclass(w.category, DefinitionWarning)
+                            for w in caught))
+
+    def test_unknown_mode_should_raise(self):
+        self.assertRaises(FysomError, FysomDefinition, events=EVENTS,
+                          validate='loose')
+
+    def test_validation_should_be_read_from_cfg(self):
+        self.assertRaises(InvalidDefinition, Fysom, {
+            'initial': 'green', 'final': 'black', 'events': EVENTS,
+            'validate': 'strict'})
+
+    def test_compiled_definition_should_not_be_revalidated(self):
+        definition = FysomDefinition(initial='green', events=EVENTS)
+        self.assertRaises(FysomError, Fysom, definition, validate='strict')
+
+    def test_global_machine_should_report_conflicts(self):
+        with self.assertRaises(InvalidDefinition) as raised:
+            FysomGlobal(initial='green', state_field='state',
+                        validate='strict', events=EVENTS + [
+                            ('calm', 'red', 'green')])
+        self.assertEqual(raised.exception.problems, [
+            'event calm from red goes to both yellow and green'])
+
+    def test_global_conditions_should_be_evaluable(self):
+        def is_angry(e):
+            return True
+
+        with self.assertRaises(InvalidDefinition) as raised:
+            FysomGlobal(initial='green', state_field='state',
+                        validate='strict', events=[
+                            {'name': 'warn', 'src': 'green', 'dst': 'yellow',
+                             'cond': [is_angry, {'else': 'red'}, 42]}])
+        self.assertEqual(raised.exception.problems, [
+            'condition %r of event warn must be given as {True: is_angry} '
+            'in a list' % (is_angry,),
+            "condition {'else': 'red'} of event warn has no True or False "
+            "key",
+            'condition 42 of event warn is neither a callback name nor '
+            'callable'])
+        FysomGlobal(initial='green', state_field='state', validate='strict',
+                    events=[{'name': 'warn', 'src': 'green', 'dst': 'yellow',
+                             'cond': is_angry},
+                            {'name': 'calm', 'src': 'yellow', 'dst': 'green',
+                             'cond': ['is_calm', {False: is_angry}]}])
+
+    @unittest.skipIf(sys.version_info < (3, 6), 'needs __init_subclass__')
+    def test_global_conditions_should_be_checked_against_callbacks(self):
+        events = [{'name': 'warn', 'src': 'green', 'dst': 'yellow',
+                   'cond': ['is_angry']}]
+        gsm = FysomGlobal(initial='green', state_field='state',
+                          events=events, validate='strict',
+                          callbacks={'is_angry': lambda e: True})
+        self.assertEqual(gsm._definition.validate, 'strict')
+
+        with self.assertRaises(InvalidDefinition) as raised:
+            class Model(FysomGlobalMixin, object):
+                GSM = FysomGlobal(initial='green', state_field='state',
+                                  events=events, validate='strict')
+        self.assertEqual(raised.exception.problems, [
+            'condition is_angry of event warn is not a callback of Model'])
+
+        class Angry(FysomGlobalMixin, object):
+            GSM = FysomGlobal(initial='green', state_field='state',
+                              events=events, validate='strict')
+
+            def __init__(self):
+                self.state = None
+                super(Angry, self).__init__()
+
+            def is_angry(self, event):
+                return True
+
+        obj = Angry()
+        obj.warn()
+        self.assertEqual(obj.current, 'yellow')